@@ -0,0 +1,106 @@
+"""
+Inference backend selection and cached model export
+"""
+import hashlib
+import importlib
+import shutil
+from pathlib import Path
+from typing import Union
+
+# Backend name -> (ultralytics export format, module that must be importable)
+BACKENDS = {
+    'torch': (None, None),
+    'onnxruntime': ('onnx', 'onnxruntime'),
+    'openvino': ('openvino', 'openvino'),
+}
+
+
+def file_hash(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's contents
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_artifact_path(model_path: Union[str, Path],
+                         backend: str,
+                         cache_dir: Union[str, Path],
+                         imgsz: int = 640) -> Path:
+    """
+    Location of the exported model for a weight file and backend
+
+    The name embeds the weights hash, so retraining invalidates the cache.
+
+    Args:
+        model_path: PyTorch weights (.pt)
+        backend: Backend name (see BACKENDS)
+        cache_dir: Directory holding exported artifacts
+        imgsz: Export input size
+
+    Returns:
+        Path of the .onnx file or OpenVINO model directory
+    """
+    model_path = Path(model_path)
+    stem = f"{model_path.stem}-{file_hash(model_path)[:16]}-{imgsz}"
+    if backend == 'openvino':
+        return Path(cache_dir) / f"{stem}_openvino_model"
+    return Path(cache_dir) / f"{stem}.onnx"
+
+
+def resolve_model(model_path: Union[str, Path],
+                  backend: str = 'torch',
+                  cache_dir: Union[str, Path] = 'app/models/.cache',
+                  imgsz: int = 640) -> str:
+    """
+    Return the model file to load for a backend, exporting it once if needed
+
+    Args:
+        model_path: Weights path; non-.pt files (already exported) are returned as is
+        backend: 'torch', 'onnxruntime' or 'openvino'
+        cache_dir: Directory holding exported artifacts
+        imgsz: Export input size
+
+    Returns:
+        Path to pass to YOLO()
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+
+    export_format, module = BACKENDS[backend]
+    if export_format is None or Path(model_path).suffix != '.pt':
+        return str(model_path)
+
+    try:
+        importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"Backend '{backend}' requires the '{module}' package: pip install {module}"
+        ) from e
+
+    target = cached_artifact_path(model_path, backend, cache_dir, imgsz)
+    if target.exists():
+        return str(target)
+
+    from ultralytics import YOLO
+
+    # dynamic=True keeps the batch dimension free for predict_batch
+    exported = Path(YOLO(str(model_path)).export(format=export_format, imgsz=imgsz, dynamic=True))
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = target.with_name(target.name + '.tmp')
+    if staging.exists():
+        shutil.rmtree(staging) if staging.is_dir() else staging.unlink()
+    shutil.move(str(exported), str(staging))
+    staging.rename(target)
+    return str(target)
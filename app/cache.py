@@ -0,0 +1,183 @@
+"""
+Content-addressed prediction cache with memory and SQLite tiers
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+from .results import DetectionBatch
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of encoded image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class PredictionCache:
+    """Cache detection results keyed by image content, model and thresholds"""
+
+    def __init__(self,
+                 model_hash: str,
+                 memory_mb: float = 64,
+                 db_path: Union[str, Path] = None,
+                 disk_mb: float = 256):
+        """
+        Args:
+            model_hash: Identity of the model (weights hash, backend, input size)
+            memory_mb: Size bound of the in-memory LRU tier
+            db_path: Optional SQLite file for the persistent tier
+            disk_mb: Size bound of the SQLite tier
+        """
+        self.model_hash = model_hash
+        self.memory_bytes = int(memory_mb * 2 ** 20)
+        self.disk_bytes = int(disk_mb * 2 ** 20)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory = OrderedDict()   # key -> (DetectionBatch, size)
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+        self._db = None
+        self._disk_size = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions (accessed)")
+            self._db.commit()
+            self._disk_size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM predictions").fetchone()[0]
+
+    def key(self, image_hash: str, conf: float, iou: float, variant: str = '') -> str:
+        """
+        Cache key of one prediction
+
+        Args:
+            image_hash: Hash of the encoded image (see content_hash)
+            conf: Confidence threshold
+            iou: NMS IoU threshold
+            variant: Kind of prediction (e.g. 'candidates' for pre-NMS output)
+
+        Returns:
+            Hex digest combining image, model, thresholds and variant
+        """
+        return hashlib.sha256(
+            f"{self.model_hash}|{image_hash}|{conf:.6g}|{iou:.6g}|{variant}".encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[DetectionBatch]:
+        """
+        Look up a prediction, memory tier first
+
+        Returns:
+            Copy of the stored DetectionBatch, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0].copy()
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE predictions SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    batch = DetectionBatch.from_bytes(row[0])
+                    self._remember(key, batch)
+                    self.disk_hits += 1
+                    return batch.copy()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, batch: DetectionBatch):
+        """Store a copy of a prediction in both tiers, evicting least recently used entries"""
+        with self._lock:
+            # Callers keep using (and may modify) their own batch
+            self._remember(key, batch.copy())
+
+            if self._db is not None:
+                value = batch.to_bytes()
+                row = self._db.execute("SELECT size FROM predictions WHERE key = ?", (key,)).fetchone()
+                self._disk_size += len(value) - (row[0] if row else 0)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value), time.time())
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def clear(self):
+        """Drop every cached prediction"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+                self._disk_size = 0
+
+    def close(self):
+        """Close the SQLite tier"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        """
+        Cache counters
+
+        Returns:
+            Dictionary with hits per tier, misses, hit rate, entries and sizes
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_size,
+            'disk_bytes': self._disk_size
+        }
+
+    def _remember(self, key: str, batch: DetectionBatch):
+        size = batch.boxes.nbytes + batch.scores.nbytes + batch.class_ids.nbytes + 256
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= old[1]
+        self._memory[key] = (batch, size)
+        self._memory_size += size
+
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_size -= evicted
+            self.evictions += 1
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM predictions ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                self._disk_size -= size
+                self.evictions += 1
+                if self._disk_size <= self.disk_bytes:
+                    break
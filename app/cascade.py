@@ -0,0 +1,287 @@
+"""
+Two-stage rider -> helmet cascade
+"""
+import time
+from functools import partial
+from pathlib import Path
+from typing import List, Union
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch
+from .utils.files import chunked
+from .video import VideoEngine
+from .writers import make_writer
+
+
+class CascadeDetector:
+    """Full-frame rider/plate pass followed by batched head-crop classification"""
+
+    def __init__(self, detector, config: dict = None):
+        """
+        Args:
+            detector: HelmetDetector providing the model, thresholds and class names
+            config: Cascade settings (default: 'cascade' section of the detector config)
+        """
+        self.detector = detector
+        cfg = config if config is not None else detector.config.get('cascade', {})
+
+        self.rider_imgsz = cfg.get('rider_imgsz', 480)
+        self.head_fraction = cfg.get('head_fraction', 0.4)
+        self.head_expand = cfg.get('head_expand', 0.15)
+        self.crop_size = cfg.get('crop_size', 160)
+        self.crop_batch = cfg.get('crop_batch', 64)
+
+        names = detector.class_names
+        self.rider_id = names.index('rider')
+        self.helmet_ids = [names.index('with helmet'), names.index('without helmet')]
+
+        # ultralytics is only imported here when a second model is configured
+        self.rider_model = detector.model
+        self.classifier = None
+        if cfg.get('rider_model'):
+            from ultralytics import YOLO
+            self.rider_model = YOLO(cfg['rider_model'])
+        if cfg.get('classifier'):
+            from ultralytics import YOLO
+            self.classifier = YOLO(cfg['classifier'], task='classify')
+
+        # A separate rider model may order its classes differently: filter on
+        # its own ids and map its results back to the main model's class ids
+        rider_names = self.rider_model.names
+        rider_ids = {name: i for i, name in rider_names.items()}
+        missing = [name for name in ('rider', 'number plate') if name not in rider_ids]
+        if missing:
+            raise ValueError(f"Rider model has no {missing} class, it has {list(rider_names.values())}")
+        self.stage1_ids = [rider_ids['rider'], rider_ids['number plate']]
+        self._stage1_classes = np.zeros(max(rider_names) + 1, dtype=np.uint8)
+        for i, name in rider_names.items():
+            if name in names:
+                self._stage1_classes[i] = names.index(name)
+
+        self.frames = 0
+        self.crops = 0
+        self.stage1_time = 0.0
+        self.stage2_time = 0.0
+
+    def predict_array(self, frame: np.ndarray) -> DetectionBatch:
+        """
+        Run the cascade on one frame
+
+        Args:
+            frame: Image array (BGR format)
+
+        Returns:
+            DetectionBatch with riders, plates and helmet classifications
+        """
+        return self.predict_arrays([frame])[0]
+
+    def predict_arrays(self, frames: List[np.ndarray], batch_size: int = None) -> List[DetectionBatch]:
+        """
+        Run the cascade on several frames, batching head crops across them
+
+        Args:
+            frames: Image arrays (BGR format)
+            batch_size: Frames per full-frame model call (default: detector setting)
+
+        Returns:
+            List of DetectionBatch, one per frame
+        """
+        batch_size = batch_size or self.detector.batch_size
+
+        start = time.perf_counter()
+        stage1 = []
+        for chunk in chunked(frames, batch_size):
+            results = self.rider_model.predict(
+                source=chunk,
+                conf=self.detector.conf_threshold,
+                iou=self.detector.iou_threshold,
+                imgsz=self.rider_imgsz,
+                classes=self.stage1_ids,
+                batch=len(chunk),
+                verbose=False
+            )
+            for r in results:
+                parsed = self.detector._parse_results(r)
+                parsed.class_ids = self._stage1_classes[parsed.class_ids]
+                stage1.append(parsed)
+        self.stage1_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        crops, regions, owners = [], [], []
+        for index, (frame, result) in enumerate(zip(frames, stage1)):
+            for box in result.boxes[result.class_ids == self.rider_id]:
+                region = self._head_region(box, frame.shape)
+                if region is None:
+                    continue
+                x0, y0, x1, y1 = region
+                crops.append(cv2.resize(frame[y0:y1, x0:x1], (self.crop_size, self.crop_size)))
+                regions.append(region)
+                owners.append(index)
+
+        heads, kept = self._classify(crops, regions)
+        self.stage2_time += time.perf_counter() - start
+        self.frames += len(frames)
+        self.crops += len(crops)
+
+        owners = np.asarray(owners, dtype=np.int64)[kept]
+        return [
+            DetectionBatch.concat([result, heads.select(owners == index)], self.detector.class_names)
+            for index, result in enumerate(stage1)
+        ]
+
+    def predict_video(self,
+                      video_path: Union[str, Path],
+                      output_path: Union[str, Path] = None,
+                      show: bool = False,
+                      batch_frames: int = 16,
+                      compare_frames: int = 0,
+                      export_path: Union[str, Path] = None) -> dict:
+        """
+        Run the cascade on a video, batching head crops across frames
+
+        Args:
+            video_path: Path to input video
+            output_path: Optional path to save output video
+            show: Whether to display video
+            batch_frames: Decoded frames gathered per cascade call
+            compare_frames: If > 0, also time the single-model path on this
+                many leading frames and report the throughput gain
+            export_path: Optional .jsonl or .parquet file receiving the
+                detections of every frame (see app.export)
+
+        Returns:
+            Dictionary with video statistics and cascade counters
+        """
+        video_cfg = self.detector.config.get('video', {})
+        engine = VideoEngine(
+            self,
+            visualizer=self.detector.visualizer,
+            queue_size=max(video_cfg.get('queue_size', 8), batch_frames),
+            batch_size=batch_frames,
+            codec=video_cfg.get('codec', 'mp4v'),
+            fps=video_cfg.get('fps', 30),
+            writer_factory=partial(make_writer, video_cfg=video_cfg)
+        )
+        stats = engine.run(video_path, output_path=output_path, show=show,
+                           sink=self.detector._exporter(export_path))
+        stats['cascade'] = self.stats()
+
+        if compare_frames > 0:
+            capture = cv2.VideoCapture(str(video_path))
+            frames = []
+            while len(frames) < compare_frames:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                frames.append(frame)
+            capture.release()
+            stats['throughput'] = self.compare_throughput(frames, batch_frames)
+
+        return stats
+
+    def compare_throughput(self, frames: List[np.ndarray], batch_size: int = 16) -> dict:
+        """
+        Time the single-model path against the cascade on the same frames
+
+        Args:
+            frames: Image arrays (BGR format)
+            batch_size: Frames per model call for both paths
+
+        Returns:
+            Dictionary with frames/sec of both paths and the speedup
+        """
+        if not frames:
+            return {}
+
+        start = time.perf_counter()
+        self.detector.predict_arrays(frames, batch_size=batch_size)
+        single_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.predict_arrays(frames, batch_size=batch_size)
+        cascade_time = time.perf_counter() - start
+
+        return {
+            'frames': len(frames),
+            'single_model_fps': len(frames) / single_time,
+            'cascade_fps': len(frames) / cascade_time,
+            'speedup': single_time / cascade_time
+        }
+
+    def stats(self) -> dict:
+        """
+        Cascade counters
+
+        Returns:
+            Dictionary with frames, classified crops and per-stage time
+        """
+        return {
+            'frames': self.frames,
+            'crops': self.crops,
+            'crops_per_frame': self.crops / self.frames if self.frames else 0.0,
+            'stage1_time': self.stage1_time,
+            'stage2_time': self.stage2_time
+        }
+
+    def _head_region(self, box: np.ndarray, shape: tuple):
+        height, width = shape[:2]
+        x0, y0, x1, y1 = box.tolist()
+        pad = (x1 - x0) * self.head_expand
+        region = (
+            int(max(x0 - pad, 0)),
+            int(max(y0 - pad, 0)),
+            int(min(x1 + pad, width)),
+            int(min(y0 + (y1 - y0) * self.head_fraction, height))
+        )
+        if region[2] - region[0] < 2 or region[3] - region[1] < 2:
+            return None
+        return region
+
+    def _classify(self, crops: List[np.ndarray], regions: List[tuple]):
+        # Returns the helmet detections and the crop index of each row
+        names = self.detector.class_names
+        boxes, scores, class_ids, kept = [], [], [], []
+        for start in range(0, len(crops), self.crop_batch):
+            batch = crops[start:start + self.crop_batch]
+            batch_regions = regions[start:start + self.crop_batch]
+
+            if self.classifier is not None:
+                results = self.classifier.predict(source=batch, imgsz=self.crop_size, verbose=False)
+                for offset, (region, result) in enumerate(zip(batch_regions, results)):
+                    label = result.names[result.probs.top1]
+                    if label not in names:
+                        continue
+                    kept.append(start + offset)
+                    boxes.append(region)
+                    scores.append(float(result.probs.top1conf))
+                    class_ids.append(names.index(label))
+                continue
+
+            # Without a dedicated classifier, detect helmets on the crops
+            # with the main model and keep the best box of each crop
+            results = self.detector.model.predict(
+                source=batch,
+                conf=self.detector.conf_threshold,
+                iou=self.detector.iou_threshold,
+                imgsz=self.crop_size,
+                classes=self.helmet_ids,
+                batch=len(batch),
+                verbose=False
+            )
+            for offset, ((x0, y0, x1, y1), result) in enumerate(zip(batch_regions, results)):
+                parsed = self.detector._parse_results(result)
+                if not len(parsed):
+                    continue
+                kept.append(start + offset)
+                best = int(parsed.scores.argmax())
+                scale = np.float32([(x1 - x0) / self.crop_size, (y1 - y0) / self.crop_size] * 2)
+                boxes.append(parsed.boxes[best] * scale + np.float32([x0, y0, x0, y0]))
+                scores.append(parsed.scores[best])
+                class_ids.append(parsed.class_ids[best])
+
+        kept = np.asarray(kept, dtype=np.int64)
+        if not boxes:
+            return DetectionBatch.empty(names), kept
+        return DetectionBatch(np.asarray(boxes), np.asarray(scores), np.asarray(class_ids), names), kept
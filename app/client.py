@@ -0,0 +1,128 @@
+"""
+Thin client of the detector daemon (standard library only)
+
+Importing this module must stay cheap: no numpy, cv2, torch or
+ultralytics, so CLIs can reach a warm daemon without paying their
+import cost.
+"""
+import json
+import os
+import socket
+import struct
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+# Length prefix of every message: 4-byte big-endian payload size
+_HEADER = struct.Struct('>I')
+
+
+def default_socket_path() -> str:
+    """Socket path from HELMET_DAEMON_SOCKET, or a per-user file in the temp directory"""
+    path = os.environ.get('HELMET_DAEMON_SOCKET')
+    if path:
+        return path
+    user = os.getuid() if hasattr(os, 'getuid') else 'user'
+    return os.path.join(tempfile.gettempdir(), f"helmet-detector-{user}.sock")
+
+
+def send_message(sock: socket.socket, payload: dict):
+    """Send one length-prefixed JSON message"""
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> dict:
+    """Receive one length-prefixed JSON message"""
+    size = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))[0]
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Daemon closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class DaemonError(RuntimeError):
+    """The daemon received the request but could not complete it"""
+
+
+class DaemonClient:
+    """Send requests to a running detector daemon over a Unix socket"""
+
+    def __init__(self, socket_path: Union[str, Path] = None, connect_timeout: float = 1.0):
+        """
+        Args:
+            socket_path: Daemon socket (default: default_socket_path())
+            connect_timeout: Seconds to wait for the connection itself;
+                requests then wait as long as the daemon needs
+        """
+        self.socket_path = str(socket_path or default_socket_path())
+        self.connect_timeout = connect_timeout
+        self.info = None
+
+    @classmethod
+    def connect(cls,
+                socket_path: Union[str, Path] = None,
+                model: Union[str, Path] = None) -> Optional['DaemonClient']:
+        """
+        Client of a running daemon, if there is a suitable one
+
+        Args:
+            socket_path: Daemon socket (default: default_socket_path())
+            model: Model the caller wants; a daemon serving other weights is not used
+
+        Returns:
+            DaemonClient, or None when no daemon answers or it serves a different model
+        """
+        client = cls(socket_path)
+        try:
+            client.info = client.request('ping')
+        except (OSError, DaemonError):
+            return None
+        if model is not None and os.path.realpath(model) != os.path.realpath(client.info['model']):
+            return None
+        return client
+
+    def request(self, op: str, **params) -> dict:
+        """
+        Run one operation on the daemon
+
+        Args:
+            op: Operation name ('ping', 'image', 'directory', 'video', 'shutdown')
+            **params: Operation parameters; paths should be absolute
+
+        Returns:
+            Response dictionary
+
+        Raises:
+            OSError: The daemon is not reachable or went away
+            DaemonError: The daemon reported an error
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.socket_path)
+            sock.settimeout(None)
+            send_message(sock, {'op': op, 'params': params})
+            response = recv_message(sock)
+        if 'error' in response:
+            raise DaemonError(response['error'])
+        return response
+
+    def try_request(self, op: str, **params) -> Optional[dict]:
+        """
+        Like request(), but returns None when the daemon is gone so the caller can run in-process
+
+        Raises:
+            DaemonError: The daemon reported an error
+        """
+        try:
+            return self.request(op, **params)
+        except OSError:
+            return None
@@ -0,0 +1,183 @@
+"""
+Long-lived local daemon holding a warm HelmetDetector behind a Unix socket
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union
+
+from .client import default_socket_path
+from .utils.files import iter_image_paths
+
+
+def _jsonable(value):
+    # numpy scalars and arrays that end up in statistics dictionaries
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class DetectorDaemon:
+    """Serve detection requests from local CLI clients (see app.client)"""
+
+    def __init__(self, detector, socket_path: Union[str, Path] = None):
+        """
+        Args:
+            detector: Loaded HelmetDetector, shared by every request
+            socket_path: Unix socket to listen on (default: default_socket_path())
+        """
+        self.detector = detector
+        self.socket_path = str(socket_path or default_socket_path())
+        self.requests = 0
+        self.errors = 0
+        self.started_at = None
+        self._server = None
+        self._stopped = None
+        # One thread: requests run one after another on the shared model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='daemon')
+        self._handlers = {
+            'ping': self._ping,
+            'image': self._image,
+            'directory': self._directory,
+            'video': self._video,
+        }
+
+    async def start(self):
+        """Start listening, replacing a stale socket file"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+
+        self._stopped = asyncio.Event()
+        # The socket is created owner-only by bind() itself, before it accepts any connection
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        finally:
+            os.umask(umask)
+        self.started_at = time.time()
+
+    async def stop(self):
+        """Stop listening and remove the socket file"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        """Start the daemon and run until a 'shutdown' request or cancellation"""
+        await self.start()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            size = int.from_bytes(await reader.readexactly(4), 'big')
+            request = json.loads((await reader.readexactly(size)).decode('utf-8'))
+            response = await self._dispatch(request.get('op'), request.get('params') or {})
+            data = json.dumps(response, default=_jsonable).encode('utf-8')
+            writer.write(len(data).to_bytes(4, 'big') + data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, op: str, params: dict) -> dict:
+        self.requests += 1
+        if op == 'shutdown':
+            self._stopped.set()
+            return {'status': 'stopping'}
+        handler = self._handlers.get(op)
+        if handler is None:
+            self.errors += 1
+            return {'error': f"Unknown operation '{op}'"}
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, handler, params)
+        except Exception as e:
+            self.errors += 1
+            return {'error': f"{type(e).__name__}: {e}"}
+
+    @contextmanager
+    def _thresholds(self, params: dict):
+        # Requests run one at a time, so per-request thresholds can be swapped in
+        conf, iou = self.detector.conf_threshold, self.detector.iou_threshold
+        if params.get('conf') is not None:
+            self.detector.conf_threshold = params['conf']
+        if params.get('iou') is not None:
+            self.detector.iou_threshold = params['iou']
+        try:
+            yield
+        finally:
+            self.detector.conf_threshold, self.detector.iou_threshold = conf, iou
+
+    def _ping(self, params: dict) -> dict:
+        return {
+            'pid': os.getpid(),
+            'model': self.detector.model_path,
+            'backend': self.detector.backend,
+            'uptime': time.time() - self.started_at,
+            'requests': self.requests,
+            'errors': self.errors,
+            'startup': self.detector.startup_stats
+        }
+
+    def _image(self, params: dict) -> dict:
+        with self._thresholds(params):
+            result = self.detector.predict_image(params['source'], save_path=params.get('save_path'))
+        return {
+            'count': result.count,
+            'detections': [
+                {'label': label, 'confidence': conf, 'box': box}
+                for label, conf, box in zip(result.labels, result.scores.tolist(), result.boxes.tolist())
+            ]
+        }
+
+    def _directory(self, params: dict) -> dict:
+        image_count = 0
+        total_detections = 0
+        with self._thresholds(params):
+            for _, result in self.detector.predict_batch_stream(
+                iter_image_paths(params['source']),
+                save_dir=params.get('save_dir'),
+                batch_size=params.get('batch_size'),
+                prefetch_workers=params.get('prefetch'),
+                workers=params.get('workers')
+            ):
+                image_count += 1
+                total_detections += result.count
+        return {
+            'images': image_count,
+            'total_detections': total_detections,
+            'pipeline': self.detector.last_pipeline_stats,
+            'shards': self.detector.last_shard_stats
+        }
+
+    def _video(self, params: dict) -> dict:
+        with self._thresholds(params):
+            return self.detector.predict_video(
+                video_path=params['source'],
+                output_path=params.get('output'),
+                detect_interval=params.get('detect_interval'),
+                motion_gate=params.get('motion_gate'),
+                writer=params.get('writer'),
+                violations_only=params.get('violations_only'),
+                export_path=params.get('export_path')
+            )
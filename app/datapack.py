@@ -0,0 +1,232 @@
+"""
+Pre-decoded, memory-mapped dataset packs for evaluation, benchmarks and calibration
+"""
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+from .cache import content_hash
+from .utils.files import iter_image_paths
+from .utils.preprocess import LetterboxMeta, decode_image, letterbox
+
+PACK_VERSION = 1
+
+# Per-image record: letterbox geometry and the slice of the packed labels
+INDEX_DTYPE = np.dtype([
+    ('orig_h', np.int32),
+    ('orig_w', np.int32),
+    ('ratio', np.float64),
+    ('pad_x', np.float32),
+    ('pad_y', np.float32),
+    ('label_offset', np.int64),
+    ('label_count', np.int32),
+])
+
+
+def _fingerprint(paths: List[Path]) -> List[list]:
+    # Cheap change detection: name, size and modification time of every file
+    fingerprint = []
+    for path in paths:
+        stat = path.stat()
+        fingerprint.append([path.name, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def _label_paths(data_dir: Path, image_paths: List[Path]) -> List[Path]:
+    return [data_dir / 'labels' / f"{path.stem}.txt" for path in image_paths]
+
+
+def _source_fingerprint(data_dir: Path, image_paths: List[Path]) -> List[list]:
+    labels = [path for path in _label_paths(data_dir, image_paths) if path.exists()]
+    return _fingerprint(image_paths) + _fingerprint(labels)
+
+
+def build_pack(data_dir: Union[str, Path], output_dir: Union[str, Path], imgsz: int = 640) -> Path:
+    """
+    Decode and letterbox a split once into a memory-mappable pack
+
+    The pack directory holds images.npy, an (N, imgsz, imgsz, 3) uint8 BGR
+    array of letterboxed images; index.npy, one INDEX_DTYPE record per
+    image; labels.npy, an (M, 5) float32 array [class, x_min, y_min, x_max,
+    y_max] in original image pixels; and pack.json with the source file
+    names, content hashes and a fingerprint used to detect stale packs.
+
+    Args:
+        data_dir: Split directory containing images/ and optionally YOLO labels/
+        output_dir: Pack directory to (re)create
+        imgsz: Square letterbox size, the model input size
+
+    Returns:
+        Path of the pack directory
+    """
+    from .evaluation import load_labels
+
+    data_dir, output_dir = Path(data_dir), Path(output_dir)
+    image_paths = sorted(iter_image_paths(data_dir / 'images'))
+    if not image_paths:
+        raise ValueError(f"No images found in {data_dir / 'images'}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Written under a temporary name so a crash never leaves a half-filled pack behind
+    images_tmp = output_dir / 'images.npy.tmp'
+    images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=np.uint8,
+                                       shape=(len(image_paths), imgsz, imgsz, 3))
+    index = np.zeros(len(image_paths), dtype=INDEX_DTYPE)
+    labels, names, hashes, kept = [], [], [], []
+    offset = 0
+    for path, label_path in zip(image_paths, _label_paths(data_dir, image_paths)):
+        data = path.read_bytes()
+        try:
+            image = decode_image(data)
+        except ValueError:
+            continue
+        row = len(kept)
+        images[row], meta = letterbox(image, imgsz)
+
+        boxes, classes = load_labels(label_path, meta.orig_shape[1], meta.orig_shape[0])
+        labels.append(np.concatenate([classes[:, None].astype(np.float32), boxes], axis=1))
+        index[row] = (meta.orig_shape[0], meta.orig_shape[1], meta.ratio, meta.pad[0], meta.pad[1],
+                      offset, len(boxes))
+        offset += len(boxes)
+        names.append(path.name)
+        hashes.append(content_hash(data))
+        kept.append(path)
+
+    images.flush()
+    del images
+    if len(kept) < len(image_paths):
+        # Drop the rows reserved for unreadable images
+        full = np.load(images_tmp, mmap_mode='r')
+        trimmed = np.lib.format.open_memmap(output_dir / 'images.npy.trim', mode='w+', dtype=np.uint8,
+                                            shape=(len(kept), imgsz, imgsz, 3))
+        trimmed[:] = full[:len(kept)]
+        trimmed.flush()
+        del full, trimmed
+        os.replace(output_dir / 'images.npy.trim', images_tmp)
+
+    np.save(output_dir / 'index.npy', index[:len(kept)])
+    np.save(output_dir / 'labels.npy',
+            np.concatenate(labels) if labels else np.empty((0, 5), dtype=np.float32))
+    os.replace(images_tmp, output_dir / 'images.npy')
+    with open(output_dir / 'pack.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': PACK_VERSION,
+            'source': str(data_dir),
+            'imgsz': imgsz,
+            'files': names,
+            'hashes': hashes,
+            'fingerprint': _source_fingerprint(data_dir, image_paths)
+        }, f)
+    return output_dir
+
+
+class DatasetPack:
+    """Read-only view of a pack written by build_pack()"""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Pack directory
+        """
+        self.path = Path(path)
+        with open(self.path / 'pack.json', 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        if self.info.get('version') != PACK_VERSION:
+            raise ValueError(f"Unsupported pack version in {self.path}, rebuild it")
+
+        self.imgsz: int = self.info['imgsz']
+        self.source_dir = Path(self.info['source'])
+        self.hashes: List[str] = self.info['hashes']
+        self.image_paths: List[Path] = [self.source_dir / 'images' / name for name in self.info['files']]
+
+        # Pages are only read when a slice is touched
+        self.images: np.ndarray = np.load(self.path / 'images.npy', mmap_mode='r')
+        self.index: np.ndarray = np.load(self.path / 'index.npy')
+        self.labels: np.ndarray = np.load(self.path / 'labels.npy')
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def meta(self, i: int) -> LetterboxMeta:
+        """Letterbox geometry of image i"""
+        record = self.index[i]
+        return LetterboxMeta(
+            (int(record['orig_h']), int(record['orig_w'])),
+            float(record['ratio']),
+            (float(record['pad_x']), float(record['pad_y']))
+        )
+
+    def targets(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ground truth of image i
+
+        Returns:
+            (N, 4) boxes [x_min, y_min, x_max, y_max] in original pixels and (N,) class ids
+        """
+        record = self.index[i]
+        rows = self.labels[record['label_offset']:record['label_offset'] + record['label_count']]
+        return rows[:, 1:], rows[:, 0].astype(np.int64)
+
+    def batches(self, batch_size: int, limit: int = None) -> Iterator[Tuple[range, np.ndarray]]:
+        """
+        Consecutive image batches as views into the memory map (no copy)
+
+        Args:
+            batch_size: Images per batch
+            limit: Maximum number of images (default: all)
+
+        Returns:
+            Iterator of (image indices, (B, imgsz, imgsz, 3) uint8 BGR array)
+        """
+        end = len(self) if limit is None else min(limit, len(self))
+        for start in range(0, end, batch_size):
+            stop = min(start + batch_size, end)
+            yield range(start, stop), self.images[start:stop]
+
+    def is_stale(self) -> bool:
+        """Whether the source images or labels changed since the pack was built"""
+        image_dir = self.source_dir / 'images'
+        if not image_dir.is_dir():
+            return True
+        image_paths = sorted(iter_image_paths(image_dir))
+        return _source_fingerprint(self.source_dir, image_paths) != self.info['fingerprint']
+
+
+def open_pack(data_dir: Union[str, Path],
+              imgsz: int = 640,
+              pack_dir: Union[str, Path] = 'data/.packs',
+              rebuild: bool = True) -> DatasetPack:
+    """
+    Open the pack of a split, building it when missing or out of date
+
+    Args:
+        data_dir: Split directory containing images/ and labels/
+        imgsz: Letterbox size
+        pack_dir: Directory holding packs, one '<split>_<imgsz>' subdirectory each
+        rebuild: Build missing or stale packs (otherwise raise FileNotFoundError)
+
+    Returns:
+        DatasetPack
+    """
+    data_dir = Path(data_dir)
+    path = Path(pack_dir) / f"{data_dir.name}_{imgsz}"
+
+    pack = None
+    if (path / 'pack.json').exists():
+        try:
+            pack = DatasetPack(path)
+        except ValueError:
+            pack = None
+        if pack is not None and (pack.imgsz != imgsz or pack.source_dir.resolve() != data_dir.resolve()
+                                 or pack.is_stale()):
+            pack = None
+
+    if pack is None:
+        if not rebuild:
+            raise FileNotFoundError(f"No up-to-date pack for {data_dir} at {path}")
+        build_pack(data_dir, path, imgsz)
+        pack = DatasetPack(path)
+    return pack
@@ -1,11 +1,32 @@
 """
 Main detector class for helmet detection
 """
-from ultralytics import YOLO
+import threading
+import time
+from collections import deque
+from functools import partial
 from pathlib import Path
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Iterable, Iterator
 import numpy as np
+import cv2
+from .results import DetectionBatch
+from .backends import file_hash, resolve_model
+from .cache import PredictionCache, content_hash
+from .pipeline import PrefetchPipeline
+from .profiling import Profiler
+from .sharding import ShardedPredictor
+from .video import VideoEngine
+from .writers import make_writer
+from .export import make_exporter
+from .tracking import TrackingScheduler
+from .motion import MotionGate
+from .streams import MultiStreamScheduler
+from .tiling import select_tiles, tile_grid
+from .utils.boxes import batched_nms
+from .utils.visualizer import Visualizer
 from .utils.config_loader import load_config
+from .utils.files import chunked
+from .utils.preprocess import decode_image, scale_boxes
 
 
 class HelmetDetector:
@@ -20,24 +41,159 @@ class HelmetDetector:
             config_path: Path to configuration file
         """
         self.config = load_config(config_path)
+        self.config_path = str(config_path)
         
-        # Load model
-        model_path = model_path or self.config['model']['path']
+        model_cfg = self.config['model']
+        inference_cfg = self.config.get('inference', {})
+        self.imgsz = inference_cfg.get('imgsz', 640)
+        
+        # Load model, exporting it once for non-torch backends
+        model_path = model_path or model_cfg['path']
         if not Path(model_path).exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
         
-        self.model = YOLO(model_path)
-        self.conf_threshold = self.config['model']['conf_threshold']
-        self.iou_threshold = self.config['model']['iou_threshold']
+        self.model_path = str(model_path)
+        self.backend = model_cfg.get('backend', 'torch')
+        self.model_cache_dir = model_cfg.get('cache_dir', 'app/models/.cache')
+        # torch/ultralytics are only imported when the model is first needed
+        self._model = None
+        self._model_lock = threading.Lock()
+        # Set while predict_candidates_batch runs, see _keep_unclipped_boxes
+        self._unclipped = threading.local()
+        # Model import/load, warm-up and first real prediction times in seconds
+        self.startup_stats = {
+            'import_s': None,
+            'load_s': None,
+            'warmup_s': None,
+            'first_predict_s': None
+        }
+        self.warmup_config = self.config.get('warmup', {})
+        self.conf_threshold = model_cfg['conf_threshold']
+        self.iou_threshold = model_cfg['iou_threshold']
+        self.batch_size = inference_cfg.get('batch_size', 16)
+        self.prefetch_workers = inference_cfg.get('prefetch_workers', 0)
+        self.prefetch_queue_size = inference_cfg.get('prefetch_queue_size', 4)
+        self.candidate_conf = inference_cfg.get('candidate_conf', 0.01)
+        self.max_candidates = inference_cfg.get('max_candidates', 3000)
+        self.workers = inference_cfg.get('workers', 0)
+        self.threads_per_worker = inference_cfg.get('threads_per_worker', 0)
+        
+        self.tiling_config = self.config.get('tiling', {})
+        
+        # Statistics of the last prefetch pipeline / worker pool run by predict_batch_stream
+        self.last_pipeline_stats = None
+        self.last_shard_stats = None
         
         # Class mapping
-        self.class_names = self.config['classes']['names']
+        self.class_names = tuple(self.config['classes']['names'])
         self.id2class = {i: name for i, name in enumerate(self.class_names)}
+        
+        # Per-stage timing histograms, shared with the visualizer
+        self.profiler = Profiler(enabled=self.config.get('profiling', {}).get('enabled', False))
+        self.visualizer = Visualizer.from_config(self.config, profiler=self.profiler)
+        
+        # Prediction cache keyed on image content, weights and thresholds
+        cache_cfg = self.config.get('cache', {})
+        self.cache = None
+        if cache_cfg.get('enabled', False):
+            self.cache = PredictionCache(
+                f"{file_hash(self.model_path)}|{self.backend}|{self.imgsz}",
+                memory_mb=cache_cfg.get('memory_mb', 64),
+                db_path=cache_cfg.get('db_path'),
+                disk_mb=cache_cfg.get('disk_mb', 256)
+            )
+        
+        if self.warmup_config.get('on_init', False):
+            self.warmup()
+    
+    @property
+    def model(self):
+        """Ultralytics YOLO model, loaded on first access (see load_model)"""
+        if self._model is None:
+            self.load_model()
+        return self._model
+    
+    def load_model(self):
+        """
+        Import ultralytics and load the weights, exporting them once for non-torch backends
+        
+        Called implicitly by the first prediction; call it (or warmup())
+        up front to pay the cost before serving. Safe to call repeatedly.
+        
+        Returns:
+            Ultralytics YOLO model
+        """
+        with self._model_lock:
+            if self._model is None:
+                start = time.perf_counter()
+                from ultralytics import YOLO
+                imported = time.perf_counter()
+                
+                self._model = YOLO(
+                    resolve_model(
+                        self.model_path,
+                        backend=self.backend,
+                        cache_dir=self.model_cache_dir,
+                        imgsz=self.imgsz
+                    ),
+                    task='detect'
+                )
+                self._model.add_callback('on_predict_start', self._keep_unclipped_boxes)
+                self.startup_stats['import_s'] = imported - start
+                self.startup_stats['load_s'] = time.perf_counter() - imported
+        return self._model
+    
+    def warmup(self,
+               shapes: List[Tuple[int, int]] = None,
+               batch_sizes: List[int] = None,
+               runs: int = None) -> dict:
+        """
+        Load the model and run dummy batches so real calls start at steady-state speed
+        
+        The first model call builds the graph (layer fusion, backend
+        session) and grows the allocators, and every new input shape or
+        batch size adds a smaller one-off cost, so warm the shapes the
+        caller will actually send (e.g. camera resolution).
+        
+        Args:
+            shapes: (height, width) of the dummy frames (default: warmup.shapes, else imgsz square)
+            batch_sizes: Frames per dummy call (default: warmup.batch_sizes, else [1])
+            runs: Calls per shape and batch size (default: warmup.runs, else 1)
+        
+        Returns:
+            Dictionary with total_s and the duration of every call, keyed 'HxWxB'
+        """
+        shapes = shapes or self.warmup_config.get('shapes') or [(self.imgsz, self.imgsz)]
+        batch_sizes = batch_sizes or self.warmup_config.get('batch_sizes') or [1]
+        runs = runs or self.warmup_config.get('runs', 1)
+        
+        model = self.load_model()
+        start = time.perf_counter()
+        calls = {}
+        for height, width in shapes:
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+            for batch_size in batch_sizes:
+                durations = []
+                for _ in range(runs):
+                    call_start = time.perf_counter()
+                    # Straight to the model: dummy frames stay out of the profiler and cache
+                    model.predict(
+                        source=[frame] * batch_size,
+                        conf=self.conf_threshold,
+                        iou=self.iou_threshold,
+                        batch=batch_size,
+                        verbose=False
+                    )
+                    durations.append(time.perf_counter() - call_start)
+                calls[f"{height}x{width}x{batch_size}"] = durations
+        
+        self.startup_stats['warmup_s'] = time.perf_counter() - start
+        return {'total_s': self.startup_stats['warmup_s'], 'calls': calls}
     
     def predict_image(self, 
                      image_path: Union[str, Path],
                      save_path: Union[str, Path] = None,
-                     show: bool = False) -> dict:
+                     show: bool = False) -> DetectionBatch:
         """
         Predict on single image
         
@@ -47,9 +203,17 @@ class HelmetDetector:
             show: Whether to display result
         
         Returns:
-            Dictionary with predictions
+            DetectionBatch with predictions
         """
-        results = self.model.predict(
+        # Saving or showing needs the model output, so only plain calls are cached
+        key = None
+        if self.cache is not None and save_path is None and not show:
+            key = self._cache_key(Path(image_path).read_bytes())
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        results = self._predict(
             source=str(image_path),
             conf=self.conf_threshold,
             iou=self.iou_threshold,
@@ -59,97 +223,716 @@ class HelmetDetector:
             show=show
         )
         
-        return self._parse_results(results[0])
+        result = self._parse_results(results[0])
+        if key is not None:
+            self.cache.put(key, result)
+        return result
     
     def predict_batch(self, 
-                     image_paths: List[Union[str, Path]],
-                     save_dir: Union[str, Path] = None) -> List[dict]:
+                     image_paths: Iterable[Union[str, Path]],
+                     save_dir: Union[str, Path] = None,
+                     batch_size: int = None) -> List[DetectionBatch]:
         """
         Predict on multiple images
         
+        With the prediction cache enabled (and no save_dir), each image is
+        hashed as the stream reaches it and only cache misses go to the model.
+        
         Args:
-            image_paths: List of image paths
+            image_paths: Image paths
             save_dir: Optional directory to save results
+            batch_size: Images per model call (default: from config)
         
         Returns:
-            List of prediction dictionaries
+            List of DetectionBatch, one per input path; unreadable images
+            get an empty batch so results line up with the inputs
         """
-        results = self.model.predict(
-            source=[str(p) for p in image_paths],
-            conf=self.conf_threshold,
-            iou=self.iou_threshold,
-            save=save_dir is not None,
-            project=str(save_dir) if save_dir else None
+        use_cache = self.cache is not None and save_dir is None
+        results: List[DetectionBatch] = []
+        pending = deque()   # (result index, path, cache key) handed to the model, in order
+        
+        def misses():
+            for path in image_paths:
+                path = Path(path)
+                index = len(results)
+                results.append(None)
+                key = None
+                if use_cache:
+                    try:
+                        key = self._cache_key(path.read_bytes())
+                    except OSError:
+                        key = None
+                    cached = self.cache.get(key) if key is not None else None
+                    if cached is not None:
+                        results[index] = cached
+                        continue
+                pending.append((index, path, key))
+                yield path
+        
+        for path, result in self.predict_batch_stream(misses(), save_dir, batch_size):
+            # The stream yields every path it was given, in order
+            index, expected, key = pending.popleft()
+            if path != expected:
+                raise RuntimeError(f"Prediction for {path} arrived in place of {expected}")
+            results[index] = result
+            if key is not None:
+                self.cache.put(key, result)
+        
+        return results
+    
+    def predict_batch_stream(self,
+                             image_paths: Iterable[Union[str, Path]],
+                             save_dir: Union[str, Path] = None,
+                             batch_size: int = None,
+                             prefetch_workers: int = None,
+                             workers: int = None) -> Iterator[Tuple[Path, DetectionBatch]]:
+        """
+        Predict on a stream of images in fixed-size chunks
+        
+        Paths are consumed lazily and results are yielded as soon as their
+        chunk finishes, so memory stays flat regardless of the input size.
+        Every path is yielded; unreadable images get an empty batch instead
+        of failing their chunk.
+        
+        Args:
+            image_paths: Any iterable of image paths (list, generator, ...)
+            save_dir: Optional directory to save results
+            batch_size: Images per model call (default: from config)
+            prefetch_workers: Decode threads running ahead of the model
+                (default: from config, 0 disables prefetching)
+            workers: Worker processes, each loading its own model (default:
+                from config, 0 or 1 runs in this process). Chunks of
+                batch_size images are spread over the workers.
+        
+        Returns:
+            Iterator of (image path, DetectionBatch) in input order
+        """
+        batch_size = batch_size or self.batch_size
+        prefetch_workers = self.prefetch_workers if prefetch_workers is None else prefetch_workers
+        workers = self.workers if workers is None else workers
+        
+        if workers > 1:
+            with ShardedPredictor(
+                self.model_path,
+                config_path=self.config_path,
+                workers=workers,
+                threads_per_worker=self.threads_per_worker,
+                chunk_size=batch_size,
+                conf=self.conf_threshold,
+                iou=self.iou_threshold
+            ) as sharded:
+                try:
+                    yield from sharded.predict_stream(image_paths, save_dir=save_dir)
+                finally:
+                    self.last_shard_stats = sharded.stats()
+            return
+        
+        if prefetch_workers:
+            pipeline = PrefetchPipeline(
+                image_paths,
+                batch_size=batch_size,
+                workers=prefetch_workers,
+                queue_size=self.prefetch_queue_size,
+                imgsz=self.imgsz,
+                keep_originals=save_dir is not None
+            )
+            try:
+                yield from self.predict_pipeline(pipeline, save_dir=save_dir)
+            finally:
+                self.last_pipeline_stats = pipeline.stats()
+            return
+        
+        for chunk in chunked(image_paths, batch_size):
+            # Decoded here rather than by ultralytics, which fails the whole chunk on one bad file
+            paths = [Path(p) for p in chunk]
+            images = [self._read(path) for path in paths]
+            decoded = [image for image in images if image is not None]
+            results = iter(self._predict(
+                source=decoded,
+                conf=self.conf_threshold,
+                iou=self.iou_threshold,
+                batch=len(decoded),
+                verbose=False
+            ) if decoded else ())
+            
+            for path, image in zip(paths, images):
+                if image is None:
+                    yield path, DetectionBatch.empty(self.class_names)
+                    continue
+                parsed = self._parse_results(next(results))
+                if save_dir is not None:
+                    self._save_prediction(save_dir, path, image, parsed)
+                yield path, parsed
+    
+    def predict_pipeline(self,
+                         pipeline: PrefetchPipeline,
+                         save_dir: Union[str, Path] = None) -> Iterator[Tuple[Path, DetectionBatch]]:
+        """
+        Predict on batches prepared by a PrefetchPipeline
+        
+        Images arrive decoded and letterboxed, so the model call only runs
+        the forward pass and NMS; boxes are mapped back to the original
+        image size afterwards. Images the pipeline could not decode are
+        yielded in their place with an empty batch.
+        
+        Args:
+            pipeline: Prefetch pipeline producing PreparedBatch items
+            save_dir: Optional directory to save annotated images to, under
+                predict/ like the non-prefetch path; needs a pipeline
+                created with keep_originals=True
+        
+        Returns:
+            Iterator of (image path, DetectionBatch) in input order
+        """
+        for batch in pipeline:
+            results = self._predict(
+                source=batch.images,
+                conf=self.conf_threshold,
+                iou=self.iou_threshold,
+                imgsz=self.imgsz,
+                batch=len(batch.images),
+                verbose=False
+            ) if batch.images else []
+            
+            unreadable = dict(batch.unreadable)
+            i = 0
+            for position in range(len(batch.paths) + len(unreadable)):
+                if position in unreadable:
+                    yield unreadable[position], DetectionBatch.empty(self.class_names)
+                    continue
+                path = batch.paths[i]
+                parsed = self._parse_results(results[i])
+                scale_boxes(parsed.boxes, batch.metas[i])
+                if save_dir is not None:
+                    self._save_prediction(save_dir, path, batch.originals[i], parsed)
+                i += 1
+                yield path, parsed
+    
+    def predict_array(self,
+                      image: np.ndarray,
+                      conf: float = None,
+                      iou: float = None) -> DetectionBatch:
+        """
+        Predict on a decoded image held in memory
+        
+        Args:
+            image: Image array (BGR format, HxWx3)
+            conf: Confidence threshold for this call (default: detector setting)
+            iou: NMS IoU threshold for this call (default: detector setting)
+        
+        Returns:
+            DetectionBatch with predictions
+        """
+        return self.predict_arrays([image], conf=conf, iou=iou)[0]
+    
+    def predict_arrays(self,
+                       images: List[np.ndarray],
+                       conf: float = None,
+                       iou: float = None,
+                       batch_size: int = None) -> List[DetectionBatch]:
+        """
+        Predict on several decoded images held in memory
+        
+        Args:
+            images: Image arrays (BGR format, HxWx3)
+            conf: Confidence threshold for this call (default: detector setting)
+            iou: NMS IoU threshold for this call (default: detector setting)
+            batch_size: Images per model call (default: from config)
+        
+        Returns:
+            List of DetectionBatch, one per image
+        """
+        batch_size = batch_size or self.batch_size
+        conf = self.conf_threshold if conf is None else conf
+        iou = self.iou_threshold if iou is None else iou
+        
+        parsed = []
+        for chunk in chunked(images, batch_size):
+            results = self._predict(
+                source=chunk,
+                conf=conf,
+                iou=iou,
+                batch=len(chunk),
+                verbose=False
+            )
+            parsed.extend(self._parse_results(r) for r in results)
+        return parsed
+    
+    def predict_bytes(self,
+                      data: bytes,
+                      conf: float = None,
+                      iou: float = None) -> DetectionBatch:
+        """
+        Predict on an encoded image (JPEG, PNG, ...) without touching disk
+        
+        Args:
+            data: Encoded image bytes
+            conf: Confidence threshold for this call (default: detector setting)
+            iou: NMS IoU threshold for this call (default: detector setting)
+        
+        Returns:
+            DetectionBatch with predictions
+        """
+        if self.cache is None:
+            return self.predict_array(self._decode(data), conf=conf, iou=iou)
+        
+        conf = self.conf_threshold if conf is None else conf
+        iou = self.iou_threshold if iou is None else iou
+        key = self._cache_key(data, conf, iou)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.predict_array(self._decode(data), conf=conf, iou=iou)
+            self.cache.put(key, result)
+        return result
+    
+    def predict_bytes_batch(self,
+                            data: List[bytes],
+                            conf: float = None,
+                            iou: float = None,
+                            batch_size: int = None) -> List[DetectionBatch]:
+        """
+        Predict on several encoded images without touching disk
+        
+        Args:
+            data: Encoded image bytes, one item per image
+            conf: Confidence threshold for this call (default: detector setting)
+            iou: NMS IoU threshold for this call (default: detector setting)
+            batch_size: Images per model call (default: from config)
+        
+        Returns:
+            List of DetectionBatch, one per image
+        """
+        return self.predict_arrays(
+            [self._decode(d) for d in data],
+            conf=conf,
+            iou=iou,
+            batch_size=batch_size
         )
+    
+    def predict_candidates(self,
+                           image: Union[np.ndarray, bytes],
+                           conf: float = None) -> DetectionBatch:
+        """
+        Predict raw candidates before NMS at a floor confidence
+        
+        The result can be re-filtered for any conf >= the floor and any IoU
+        with refilter(), without running the model again. Boxes are not
+        clipped to the image: ultralytics clips after its NMS, so refilter()
+        does too.
+        
+        Args:
+            image: Image array (BGR format) or encoded image bytes (cached)
+            conf: Floor confidence (default: inference.candidate_conf)
+        
+        Returns:
+            DetectionBatch with the candidates above the floor, at most
+            inference.max_candidates of them (the highest-scoring)
+        """
+        conf = self.candidate_conf if conf is None else conf
+        
+        key = None
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            data = bytes(image)
+            if self.cache is not None:
+                key = self.cache.key(content_hash(data), conf, 1.0, variant='raw-candidates')
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+            image = self._decode(data)
+        
+        candidates = self.predict_candidates_batch([image], conf=conf)[0]
+        if key is not None:
+            self.cache.put(key, candidates)
+        return candidates
+    
+    def predict_candidates_batch(self,
+                                 images: List[np.ndarray],
+                                 conf: float = None,
+                                 batch_size: int = None) -> List[DetectionBatch]:
+        """
+        Predict raw pre-NMS candidates on several decoded images
+        
+        Args:
+            images: Image arrays (BGR format, HxWx3), e.g. views into a DatasetPack
+            conf: Floor confidence (default: inference.candidate_conf)
+            batch_size: Images per model call (default: from config)
+        
+        Returns:
+            List of DetectionBatch, one per image, for refilter()
+        """
+        conf = self.candidate_conf if conf is None else conf
+        batch_size = batch_size or self.batch_size
+        
+        parsed = []
+        self._unclipped.active = True
+        try:
+            for chunk in chunked(images, batch_size):
+                # iou=1.0 disables suppression; only exact duplicates could collapse
+                results = self._predict(
+                    source=list(chunk),
+                    conf=conf,
+                    iou=1.0,
+                    max_det=self.max_candidates,
+                    batch=len(chunk),
+                    verbose=False
+                )
+                parsed.extend(self._parse_results(r) for r in results)
+        finally:
+            self._unclipped.active = False
+        return parsed
+    
+    def refilter(self,
+                 candidates: DetectionBatch,
+                 conf: float = None,
+                 iou: float = None,
+                 max_det: int = 300,
+                 image_shape: Tuple[int, int] = None) -> DetectionBatch:
+        """
+        Apply confidence filtering and class-aware NMS to raw candidates
+        
+        Candidates are capped at inference.max_candidates per image. When an
+        image reaches the cap, boxes scoring below the lowest kept candidate
+        are missing, and the result can differ from a direct prediction for
+        any conf below that score (see refilter_exact()).
+        
+        Args:
+            candidates: Output of predict_candidates()
+            conf: Confidence threshold (default: detector setting)
+            iou: NMS IoU threshold (default: detector setting)
+            max_det: Maximum detections kept
+            image_shape: (height, width) to clip the kept boxes to after NMS,
+                as a direct prediction does (default: no clipping)
+        
+        Returns:
+            DetectionBatch equivalent to a prediction at these thresholds,
+            as long as refilter_exact(candidates, conf) holds
+        """
+        conf = self.conf_threshold if conf is None else conf
+        iou = self.iou_threshold if iou is None else iou
+        
+        with self.profiler.stage('refilter'):
+            index = np.flatnonzero(candidates.scores >= conf)
+            keep = batched_nms(candidates.boxes[index], candidates.scores[index], candidates.class_ids[index], iou)
+            result = candidates.select(index[keep[:max_det]])
+            if image_shape is not None:
+                height, width = image_shape[:2]
+                result.boxes[:, [0, 2]] = result.boxes[:, [0, 2]].clip(0, width)
+                result.boxes[:, [1, 3]] = result.boxes[:, [1, 3]].clip(0, height)
+            return result
+    
+    def predict_tiled(self,
+                      image: Union[str, Path, np.ndarray],
+                      tile_size: int = None,
+                      overlap: float = None,
+                      coarse: bool = None,
+                      conf: float = None,
+                      iou: float = None) -> DetectionBatch:
+        """
+        Predict on a high-resolution image by slicing it into overlapping tiles
+        
+        Tiles are run through the model as one batch, shifted back into
+        frame coordinates and merged with class-aware NMS. In coarse mode
+        a full-frame pass runs first and only tiles around its
+        tiling.focus_classes detections (riders by default) are processed.
+        
+        Args:
+            image: Image path or array (BGR format)
+            tile_size: Tile side in pixels (default: from config)
+            overlap: Fraction of overlap between neighbouring tiles (default: from config)
+            coarse: Only tile regions found by a full-frame pass (default: from config)
+            conf: Confidence threshold for this call (default: detector setting)
+            iou: NMS IoU threshold for this call (default: detector setting)
+        
+        Returns:
+            DetectionBatch in original image coordinates
+        """
+        cfg = self.tiling_config
+        tile_size = tile_size or cfg.get('tile_size', 640)
+        overlap = cfg.get('overlap', 0.2) if overlap is None else overlap
+        coarse = cfg.get('coarse', False) if coarse is None else coarse
+        iou = self.iou_threshold if iou is None else iou
+        
+        if not isinstance(image, np.ndarray):
+            image_path = image
+            image = cv2.imread(str(image_path))
+            if image is None:
+                raise FileNotFoundError(f"Cannot read image: {image_path}")
+        
+        height, width = image.shape[:2]
+        tiles = tile_grid(height, width, tile_size, overlap)
+        
+        parts = []
+        if coarse or cfg.get('include_full_frame', True):
+            full = self.predict_array(image, conf=conf, iou=iou)
+            parts.append(full)
+            
+            if coarse:
+                focus = [self.class_names.index(name) for name in cfg.get('focus_classes', ['rider'])]
+                regions = full.boxes[np.isin(full.class_ids, focus)]
+                tiles = select_tiles(tiles, regions, height, width, cfg.get('region_margin', 0.25))
         
-        return [self._parse_results(r) for r in results]
+        if len(tiles):
+            # Crops are views into the frame, batched into a single model call
+            crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles.tolist()]
+            results = self.predict_arrays(crops, conf=conf, iou=iou, batch_size=len(crops))
+            
+            for (x0, y0, _, _), result in zip(tiles.tolist(), results):
+                result.boxes += np.float32([x0, y0, x0, y0])
+                parts.append(result)
+        
+        merged = DetectionBatch.concat(parts, self.class_names)
+        keep = batched_nms(merged.boxes, merged.scores, merged.class_ids, iou)
+        return merged.select(keep)
     
     def predict_video(self,
                      video_path: Union[str, Path],
                      output_path: Union[str, Path] = None,
-                     show: bool = False) -> dict:
+                     show: bool = False,
+                     detect_interval: int = None,
+                     motion_gate: bool = None,
+                     writer: str = None,
+                     violations_only: bool = None,
+                     export_path: Union[str, Path] = None) -> dict:
         """
         Predict on video
         
+        Decoding, inference and annotation/encoding run as separate
+        pipeline stages (see VideoEngine).
+        
         Args:
             video_path: Path to input video
             output_path: Optional path to save output video
             show: Whether to display video
+            detect_interval: Run the detector every N frames and track boxes
+                in between (default: from config, 1 = every frame)
+            motion_gate: Skip inference on static frames (default: from config)
+            writer: 'opencv' or 'ffmpeg' output encoder (default: from config)
+            violations_only: Only write segments around violations (default: from config)
+            export_path: Optional .jsonl or .parquet file receiving the
+                detections of every frame (see app.export)
         
         Returns:
-            Dictionary with video statistics
+            Dictionary with video statistics and per-stage throughput
         """
-        results = self.model.predict(
-            source=str(video_path),
-            conf=self.conf_threshold,
-            iou=self.iou_threshold,
-            save=output_path is not None,
-            project=str(Path(output_path).parent) if output_path else None,
-            name=Path(output_path).stem if output_path else None,
-            show=show,
-            stream=True
-        )
-        
-        # Process all frames
-        frame_count = 0
-        total_detections = 0
-        
-        for result in results:
-            frame_count += 1
-            parsed = self._parse_results(result)
-            total_detections += len(parsed['boxes'])
-        
-        return {
-            'frames': frame_count,
-            'total_detections': total_detections,
-            'avg_detections_per_frame': total_detections / frame_count if frame_count > 0 else 0
-        }
+        engine = self._video_engine(detect_interval, motion_gate, writer=writer, violations_only=violations_only)
+        return engine.run(video_path, output_path=output_path, show=show, sink=self._exporter(export_path))
     
-    def predict_webcam(self, camera_id: int = 0, show: bool = True):
+    def predict_webcam(self,
+                       camera_id: int = 0,
+                       show: bool = True,
+                       detect_interval: int = None,
+                       motion_gate: bool = None,
+                       export_path: Union[str, Path] = None) -> dict:
         """
         Predict on webcam stream
         
         Args:
             camera_id: Camera device ID
             show: Whether to display stream
+            detect_interval: Run the detector every N frames and track boxes
+                in between (default: from config, 1 = every frame)
+            motion_gate: Skip inference on static frames (default: from config)
+            export_path: Optional .jsonl or .parquet file receiving the
+                detections of every frame, timestamped with Unix time
+        
+        Returns:
+            Dictionary with stream statistics
         """
-        results = self.model.predict(
-            source=camera_id,
-            conf=self.conf_threshold,
-            iou=self.iou_threshold,
-            show=show,
-            stream=True
-        )
+        # Small queues keep display latency low on live streams
+        engine = self._video_engine(detect_interval, motion_gate, queue_size=2)
         
-        # Lặp qua stream để giữ webcam chạy
-        # YOLOv8 tự động xử lý hiển thị khi show=True
+        # Ctrl+C is the usual way to stop a webcam, the statistics are still returned
+        stats = engine.run(camera_id, show=show, sink=self._exporter(export_path), stop_on_interrupt=True)
+        if stats['interrupted']:
+            print("\nWebcam stream stopped")
+        return stats
+    
+    def predict_streams(self,
+                        sources: Union[dict, List[Union[str, int]]],
+                        fps: Union[float, dict] = None,
+                        duration: float = None,
+                        on_result=None) -> dict:
+        """
+        Predict on several cameras/videos with one shared model
+        
+        The latest frame of every source that is due (per-source FPS
+        target) is packed into a single batched model call, and results
+        are routed back per source (see MultiStreamScheduler).
+        
+        Args:
+            sources: Mapping name -> source, or list of video files, device IDs or URLs
+            fps: Target rate for every source, or per-source mapping (default: from config)
+            duration: Stop after this many seconds (default: until all sources end)
+            on_result: Optional callback called with (source name, frame index, frame, result)
+        
+        Returns:
+            Dictionary with batching and per-source statistics
+        """
+        streams_cfg = self.config.get('streams', {})
+        scheduler = MultiStreamScheduler(
+            self,
+            sources,
+            fps=fps if fps is not None else streams_cfg.get('fps', 5),
+            max_batch=streams_cfg.get('max_batch', self.batch_size),
+            realtime=streams_cfg.get('realtime', True),
+            loop=streams_cfg.get('loop', False),
+            default_fps=streams_cfg.get('fps')
+        )
         try:
-            for _ in results:
-                pass
+            return scheduler.run(duration=duration, on_result=on_result)
         except KeyboardInterrupt:
-            print("\nWebcam stream stopped")
+            print("\nStreams stopped")
+            return scheduler.stats()
+    
+    def _video_engine(self,
+                      detect_interval: int = None,
+                      motion_gate: bool = None,
+                      queue_size: int = None,
+                      writer: str = None,
+                      violations_only: bool = None) -> VideoEngine:
+        """Create a video engine configured from the 'video' config section"""
+        video_cfg = dict(self.config.get('video', {}))
+        if writer is not None:
+            video_cfg['writer'] = writer
+        if violations_only is not None:
+            video_cfg['violations_only'] = {**video_cfg.get('violations_only', {}), 'enabled': violations_only}
+        return VideoEngine(
+            self,
+            visualizer=self.visualizer,
+            queue_size=queue_size or video_cfg.get('queue_size', 8),
+            batch_size=video_cfg.get('batch_size', 1),
+            codec=video_cfg.get('codec', 'mp4v'),
+            fps=video_cfg.get('fps', 30),
+            scheduler=self._frame_scheduler(detect_interval, motion_gate),
+            writer_factory=partial(make_writer, video_cfg=video_cfg)
+        )
+    
+    def _exporter(self, export_path: Union[str, Path] = None):
+        """Create the per-frame exporter from the 'video.export' config section, if a path is given"""
+        if export_path is None:
+            return None
+        return make_exporter(export_path, self.class_names, self.config.get('video', {}).get('export', {}))
+    
+    def _frame_scheduler(self, detect_interval: int = None, motion_gate: bool = None):
+        """Create the per-frame scheduler from the 'video.tracking' and 'video.motion_gate' config sections"""
+        video_cfg = self.config.get('video', {})
+        tracking_cfg = video_cfg.get('tracking', {})
+        motion_cfg = video_cfg.get('motion_gate', {})
+        
+        if detect_interval is None:
+            detect_interval = tracking_cfg.get('interval', 3) if tracking_cfg.get('enabled', False) else 1
+        if motion_gate is None:
+            motion_gate = motion_cfg.get('enabled', False)
+        
+        scheduler = None
+        if detect_interval > 1:
+            # Above conf_threshold, freshly detected tracks scored in between
+            # would force a detection on every frame
+            min_track_score = tracking_cfg.get('min_track_score')
+            if min_track_score is None or min_track_score > self.conf_threshold:
+                min_track_score = self.conf_threshold
+            scheduler = TrackingScheduler(
+                self.class_names,
+                interval=detect_interval,
+                adaptive=tracking_cfg.get('adaptive', True),
+                min_track_score=min_track_score,
+                max_motion=tracking_cfg.get('max_motion', 0.02),
+                score_decay=tracking_cfg.get('score_decay', 0.9),
+                decay_after=tracking_cfg.get('decay_after', 2),
+                audit_interval=tracking_cfg.get('audit_interval', 0)
+            )
+        
+        if motion_gate:
+            scheduler = MotionGate(
+                downscale_width=motion_cfg.get('downscale_width', 160),
+                pixel_threshold=motion_cfg.get('pixel_threshold', 25),
+                sensitivity=motion_cfg.get('sensitivity', 0.005),
+                max_skip=motion_cfg.get('max_skip', 150),
+                skip_only_empty=motion_cfg.get('skip_only_empty', True),
+                roi=motion_cfg.get('roi'),
+                inner=scheduler
+            )
+        
+        return scheduler
     
-    def _parse_results(self, result) -> dict:
+    def _predict(self, **kwargs):
+        """Run the model, recording the latency of the first real call in startup_stats"""
+        model = self.model
+        if self.startup_stats['first_predict_s'] is not None:
+            return model.predict(**kwargs)
+        start = time.perf_counter()
+        results = model.predict(**kwargs)
+        self.startup_stats['first_predict_s'] = time.perf_counter() - start
+        return results
+    
+    def refilter_exact(self, candidates: DetectionBatch, conf: float = None) -> bool:
+        """
+        Whether refilter() at conf sees every box a direct prediction would
+        
+        Args:
+            candidates: Output of predict_candidates()
+            conf: Confidence threshold (default: detector setting)
+        
+        Returns:
+            False if the candidates were cut at max_candidates above conf
+        """
+        conf = self.conf_threshold if conf is None else conf
+        return len(candidates) < self.max_candidates or conf >= float(candidates.scores.min())
+    
+    def _keep_unclipped_boxes(self, predictor):
+        """
+        'on_predict_start' callback: candidate calls skip the border clip
+        
+        Ultralytics runs NMS on unclipped boxes and only clips them while
+        mapping back to the original image. Candidates are re-suppressed by
+        refilter(), so they must keep the unclipped boxes for its NMS to match.
+        Ultralytics versions without construct_result keep clipped candidates.
+        """
+        construct_result = getattr(predictor, 'construct_result', None)
+        if construct_result is None or getattr(construct_result, 'keeps_unclipped', False):
+            return
+        from ultralytics.engine.results import Results
+        from ultralytics.utils import ops
+        
+        def construct(pred, img, orig_img, img_path):
+            if not getattr(self._unclipped, 'active', False):
+                return construct_result(pred, img, orig_img, img_path)
+            # scale_boxes clips xyxy boxes but only rescales the center/size form
+            boxes = ops.xyxy2xywh(pred[:, :4])
+            ops.scale_boxes(img.shape[2:], boxes, orig_img.shape, xywh=True)
+            pred[:, :4] = ops.xywh2xyxy(boxes)
+            return Results(orig_img, path=img_path, names=predictor.model.names, boxes=pred[:, :6])
+        
+        construct.keeps_unclipped = True
+        predictor.construct_result = construct
+    
+    def _cache_key(self, data: bytes, conf: float = None, iou: float = None) -> str:
+        """Prediction cache key of encoded image bytes at the given (or current) thresholds"""
+        return self.cache.key(
+            content_hash(data),
+            self.conf_threshold if conf is None else conf,
+            self.iou_threshold if iou is None else iou
+        )
+    
+    def _decode(self, data: bytes) -> np.ndarray:
+        """Decode encoded image bytes, timed as the 'decode' stage"""
+        with self.profiler.stage('decode'):
+            return decode_image(data)
+    
+    def _read(self, path: Path) -> Union[np.ndarray, None]:
+        """Read and decode an image file, None if it is missing or unreadable"""
+        try:
+            return self._decode(path.read_bytes())
+        except (OSError, ValueError, cv2.error):
+            return None
+    
+    def _save_prediction(self, save_dir: Union[str, Path], path: Path, image: np.ndarray, result: DetectionBatch):
+        """Draw a prediction on its decoded image (in place) and save it under save_dir/predict/"""
+        save_path = Path(save_dir) / 'predict' / path.name
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(save_path), self.visualizer.draw_detections(image, result, inplace=True))
+    
+    def _parse_results(self, result) -> DetectionBatch:
         """
         Parse YOLO results to structured format
         
@@ -157,16 +940,19 @@ class HelmetDetector:
             result: YOLO result object
         
         Returns:
-            Dictionary with boxes, labels, confidences
+            DetectionBatch with boxes, scores, class ids
         """
-        boxes = result.boxes.xyxy.cpu().numpy().tolist() if result.boxes is not None else []
-        labels = [self.id2class[int(cls)] for cls in result.boxes.cls.cpu().numpy()] if result.boxes is not None else []
-        confidences = result.boxes.conf.cpu().numpy().tolist() if result.boxes is not None else []
+        if self.profiler.enabled:
+            # Ultralytics times its own stages per image, in milliseconds
+            speed = getattr(result, 'speed', None) or {}
+            for stage, name in (('preprocess', 'preprocess'), ('inference', 'forward'), ('postprocess', 'nms')):
+                if speed.get(stage) is not None:
+                    self.profiler.observe(name, speed[stage] / 1000)
         
-        return {
-            'boxes': boxes,
-            'labels': labels,
-            'confidences': confidences,
-            'count': len(boxes)
-        }
+        with self.profiler.stage('parse'):
+            if result.boxes is None or len(result.boxes) == 0:
+                return DetectionBatch.empty(self.class_names)
+            
+            # Single device transfer: [x_min, y_min, x_max, y_max, conf, cls]
+            return DetectionBatch.from_array(result.boxes.data.cpu().numpy(), self.class_names)
 
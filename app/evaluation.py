@@ -0,0 +1,435 @@
+"""
+Detection accuracy (mAP) on a labelled YOLO-format split
+"""
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .datapack import DatasetPack
+from .results import DetectionBatch
+from .utils.boxes import box_iou
+from .utils.files import iter_image_paths
+from .utils.preprocess import scale_boxes
+
+# COCO IoU thresholds 0.50:0.05:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def load_labels(label_path: Union[str, Path], width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read a YOLO label file (class x_center y_center width height, normalized)
+
+    Args:
+        label_path: Label file; a missing file means no objects
+        width: Image width in pixels
+        height: Image height in pixels
+
+    Returns:
+        (N, 4) boxes [x_min, y_min, x_max, y_max] in pixels and (N,) class ids
+    """
+    label_path = Path(label_path)
+    if not label_path.exists() or label_path.stat().st_size == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    data = np.loadtxt(label_path, dtype=np.float32, ndmin=2)[:, :5]
+    xy, wh = data[:, 1:3], data[:, 3:5]
+    boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1) * np.array([width, height, width, height],
+                                                                          dtype=np.float32)
+    return boxes, data[:, 0].astype(np.int64)
+
+
+def match_predictions(pred_boxes: np.ndarray,
+                      pred_classes: np.ndarray,
+                      gt_boxes: np.ndarray,
+                      gt_classes: np.ndarray,
+                      iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    Mark predictions matching a same-class ground truth box at each IoU threshold
+
+    One IoU matrix is computed per image; each threshold then matches pairs
+    one-to-one in descending IoU order without a Python loop over boxes.
+
+    Args:
+        pred_boxes: (N, 4) predicted boxes
+        pred_classes: (N,) predicted class ids
+        gt_boxes: (M, 4) ground truth boxes
+        gt_classes: (M,) ground truth class ids
+        iou_thresholds: (T,) IoU thresholds
+
+    Returns:
+        (N, T) boolean array, True where the prediction is a true positive
+    """
+    correct = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return correct
+
+    iou = box_iou(gt_boxes, pred_boxes)
+    iou[np.asarray(gt_classes)[:, None] != np.asarray(pred_classes)[None, :]] = 0
+
+    for t, threshold in enumerate(iou_thresholds):
+        gt_index, pred_index = np.nonzero(iou >= threshold)
+        if not len(gt_index):
+            continue
+        order = np.argsort(-iou[gt_index, pred_index], kind='stable')
+        gt_index, pred_index = gt_index[order], pred_index[order]
+        # First (highest IoU) pair of each prediction, then of each ground truth box
+        first = np.sort(np.unique(pred_index, return_index=True)[1])
+        gt_index, pred_index = gt_index[first], pred_index[first]
+        first = np.unique(gt_index, return_index=True)[1]
+        correct[pred_index[first], t] = True
+    return correct
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> np.ndarray:
+    """
+    COCO-style 101-point interpolated AP
+
+    Args:
+        recall: (N, T) cumulative recall of score-sorted predictions
+        precision: (N, T) cumulative precision of score-sorted predictions
+
+    Returns:
+        (T,) average precision per IoU threshold
+    """
+    if not len(recall):
+        return np.zeros(recall.shape[1])
+
+    # Precision envelope: best precision at any higher recall
+    envelope = np.maximum.accumulate(precision[::-1], axis=0)[::-1]
+    points = np.linspace(0, 1, 101)
+    ap = np.zeros(recall.shape[1])
+    for t in range(recall.shape[1]):
+        index = np.searchsorted(recall[:, t], points, side='left')
+        valid = index < len(recall)
+        ap[t] = envelope[index[valid], t].sum() / len(points)
+    return ap
+
+
+def class_metrics(correct: np.ndarray,
+                  scores: np.ndarray,
+                  pred_classes: np.ndarray,
+                  gt_classes: np.ndarray,
+                  num_classes: int) -> Dict[str, np.ndarray]:
+    """
+    Per-class AP, precision and recall over a whole split
+
+    Args:
+        correct: (N, T) true-positive flags from match_predictions()
+        scores: (N,) prediction confidences
+        pred_classes: (N,) predicted class ids
+        gt_classes: (M,) class ids of every ground truth box
+        num_classes: Number of classes
+
+    Returns:
+        Dictionary with 'ap' (C, T), 'precision' (C,), 'recall' (C,) at the
+        first IoU threshold and 'instances' (C,); classes without ground
+        truth have NaN AP
+    """
+    order = np.argsort(-scores, kind='stable')
+    correct, pred_classes = correct[order], pred_classes[order]
+    instances = np.bincount(gt_classes, minlength=num_classes)[:num_classes]
+
+    ap = np.full((num_classes, correct.shape[1]), np.nan)
+    precision = np.zeros(num_classes)
+    recall = np.zeros(num_classes)
+    for c in range(num_classes):
+        tp = np.cumsum(correct[pred_classes == c], axis=0)
+        predicted = np.arange(1, len(tp) + 1)[:, None]
+        if len(tp):
+            precision[c] = tp[-1, 0] / len(tp)
+        if instances[c]:
+            recall[c] = tp[-1, 0] / instances[c] if len(tp) else 0.0
+            ap[c] = average_precision(tp / instances[c], tp / predicted)
+    return {'ap': ap, 'precision': precision, 'recall': recall, 'instances': instances}
+
+
+class Evaluator:
+    """Evaluate a HelmetDetector on a labelled split"""
+
+    def __init__(self,
+                 detector,
+                 data_dir: Union[str, Path] = 'data/val',
+                 conf_floor: float = None,
+                 pack: DatasetPack = None):
+        """
+        Args:
+            detector: HelmetDetector under test
+            data_dir: Split directory containing images/ and labels/
+            conf_floor: Lowest confidence that will be evaluated (default:
+                inference.candidate_conf); predictions are made once at this
+                floor and re-filtered for every threshold pair
+            pack: Optional DatasetPack of the split (see app.datapack); images
+                and labels are then read from its memory map instead of being
+                decoded and parsed again
+        """
+        self.detector = detector
+        self.data_dir = Path(data_dir)
+        self.conf_floor = detector.candidate_conf if conf_floor is None else conf_floor
+        self.pack = pack
+
+        if pack is not None:
+            if pack.imgsz != detector.imgsz:
+                raise ValueError(f"Pack letterboxed at {pack.imgsz}, detector runs at {detector.imgsz}")
+            self.image_paths: List[Path] = list(pack.image_paths)
+        else:
+            self.image_paths = sorted(iter_image_paths(self.data_dir / 'images'))
+        if not self.image_paths:
+            raise ValueError(f"No images found in {self.data_dir / 'images'}")
+
+        self._targets: Dict[Path, Tuple[np.ndarray, np.ndarray]] = {}
+        # (height, width) per image, refilter() clips to it after NMS
+        self._shapes: Dict[Path, Tuple[int, int]] = {}
+        self._candidates: Dict[Path, DetectionBatch] = {}
+        self.inference = {'predicted': 0, 'reused': 0, 'time_s': 0.0, 'images_per_sec': None}
+
+    def predict(self, force: bool = False) -> dict:
+        """
+        Predict candidates for every image, reusing earlier predictions
+
+        Candidates come from the detector's prediction cache when it is
+        enabled (including its persistent tier), so repeated runs with the
+        same weights only re-run matching.
+
+        Args:
+            force: Re-run the model even for images predicted before
+
+        Returns:
+            Inference statistics: images predicted, reused, time and images/sec
+            (including decoding unless a pack is used)
+        """
+        cache = None if force else self.detector.cache
+        if self.pack is not None:
+            predicted, reused, elapsed = self._predict_pack(cache, force)
+        else:
+            predicted, reused, elapsed = self._predict_files(cache, force)
+
+        # images_per_sec stays None when every prediction was reused
+        self.inference = {
+            'predicted': predicted,
+            'reused': reused,
+            'time_s': elapsed,
+            'images_per_sec': predicted / elapsed if elapsed > 0 else None
+        }
+        return self.inference
+
+    def evaluate(self, conf: float = None, iou: float = None, max_det: int = 300) -> dict:
+        """
+        Accuracy at one confidence / NMS IoU pair
+
+        Args:
+            conf: Confidence threshold (default: detector setting), not below conf_floor
+            iou: NMS IoU threshold (default: detector setting)
+            max_det: Maximum detections per image
+
+        Returns:
+            Dictionary with mAP50, mAP50-95, precision and recall overall and
+            per class, and the number of images whose candidates were cut at
+            inference.max_candidates above conf ('truncated')
+        """
+        conf = self.detector.conf_threshold if conf is None else conf
+        iou = self.detector.iou_threshold if iou is None else iou
+        if conf < self.conf_floor:
+            raise ValueError(f"conf {conf} is below the candidate floor {self.conf_floor}")
+        if len(self._candidates) < len(self.image_paths):
+            self.predict()
+
+        start = time.perf_counter()
+        correct, scores, pred_classes, gt_classes = [], [], [], []
+        truncated = 0
+        for path in self.image_paths:
+            truncated += not self.detector.refilter_exact(self._candidates[path], conf)
+            result = self.detector.refilter(self._candidates[path], conf=conf, iou=iou, max_det=max_det,
+                                            image_shape=self._shapes[path])
+            boxes, classes = self._targets[path]
+            correct.append(match_predictions(result.boxes, result.class_ids, boxes, classes))
+            scores.append(result.scores)
+            pred_classes.append(result.class_ids)
+            gt_classes.append(classes)
+
+        names = self.detector.class_names
+        metrics = class_metrics(
+            np.concatenate(correct),
+            np.concatenate(scores),
+            np.concatenate(pred_classes).astype(np.int64),
+            np.concatenate(gt_classes),
+            len(names)
+        )
+        ap, present = metrics['ap'], metrics['instances'] > 0
+
+        def value(x):
+            return None if np.isnan(x) else float(x)
+
+        return {
+            'conf': conf,
+            'iou': iou,
+            'max_det': max_det,
+            'map50': float(ap[present, 0].mean()) if present.any() else 0.0,
+            'map50_95': float(ap[present].mean()) if present.any() else 0.0,
+            'precision': float(metrics['precision'][present].mean()) if present.any() else 0.0,
+            'recall': float(metrics['recall'][present].mean()) if present.any() else 0.0,
+            'match_time_s': time.perf_counter() - start,
+            'truncated': truncated,
+            'classes': {
+                name: {
+                    'instances': int(metrics['instances'][c]),
+                    'ap50': value(ap[c, 0]),
+                    'ap50_95': value(np.nanmean(ap[c])) if present[c] else None,
+                    'precision': float(metrics['precision'][c]),
+                    'recall': float(metrics['recall'][c])
+                }
+                for c, name in enumerate(names)
+            }
+        }
+
+    def check_refilter(self, conf: float = None, iou: float = None, max_det: int = 300, limit: int = 20) -> dict:
+        """
+        Compare refilter() on fresh candidates with a direct prediction
+
+        Both run on the decoded image files, so a pack does not change the
+        outcome. Detections must agree in count, score and box. Differences
+        on images with tied candidate scores are reported apart: NMS order,
+        and so its result, is arbitrary between equal scores.
+
+        Args:
+            conf: Confidence threshold (default: detector setting), not below conf_floor
+            iou: NMS IoU threshold (default: detector setting)
+            max_det: Maximum detections per image
+            limit: Number of images checked
+
+        Returns:
+            Dictionary with the images checked, the paths that differ and
+            the paths that differ only where scores are tied ('tied')
+        """
+        conf = self.detector.conf_threshold if conf is None else conf
+        iou = self.detector.iou_threshold if iou is None else iou
+        if conf < self.conf_floor:
+            raise ValueError(f"conf {conf} is below the candidate floor {self.conf_floor}")
+
+        def ordered(result):
+            order = np.lexsort((*result.boxes.T[::-1], result.class_ids, -result.scores))
+            return result.scores[order], result.boxes[order]
+
+        checked, mismatched, tied = 0, [], []
+        for path in self.image_paths[:limit]:
+            image = self.detector._read(path)
+            if image is None:
+                continue
+            direct = self.detector.predict_array(image, conf=conf, iou=iou)
+            candidates = self.detector.predict_candidates(image, conf=self.conf_floor)
+            result = self.detector.refilter(candidates, conf=conf, iou=iou, max_det=max_det, image_shape=image.shape)
+            checked += 1
+            same = len(result) == len(direct)
+            if same:
+                (a_scores, a_boxes), (b_scores, b_boxes) = ordered(direct), ordered(result)
+                same = np.allclose(a_scores, b_scores, atol=1e-4) and np.allclose(a_boxes, b_boxes, atol=0.1)
+            if not same:
+                ties = len(np.unique(candidates.scores)) < len(candidates)
+                (tied if ties else mismatched).append(str(path))
+        return {'conf': conf, 'iou': iou, 'images': checked, 'mismatched': mismatched, 'tied': tied}
+
+    def run(self,
+            confs: Sequence[float] = (None,),
+            ious: Sequence[float] = (None,),
+            max_det: int = 300,
+            force: bool = False) -> dict:
+        """
+        Evaluate every confidence / IoU pair with a single prediction pass
+
+        Args:
+            confs: Confidence thresholds (None: detector setting)
+            ious: NMS IoU thresholds (None: detector setting)
+            max_det: Maximum detections per image
+            force: Re-run the model even when predictions are cached
+
+        Returns:
+            JSON-serialisable report with model, inference speed and one entry per threshold pair
+        """
+        self.predict(force=force)
+        instances = sum(len(classes) for _, classes in self._targets.values())
+        return {
+            'model': self.detector.model_path,
+            'backend': self.detector.backend,
+            'imgsz': self.detector.imgsz,
+            'data': str(self.data_dir),
+            'pack': str(self.pack.path) if self.pack is not None else None,
+            'images': len(self.image_paths),
+            'instances': instances,
+            'conf_floor': self.conf_floor,
+            'inference': self.inference,
+            'runs': [self.evaluate(conf, iou, max_det) for conf in confs for iou in ious]
+        }
+
+    def _predict_files(self, cache, force: bool) -> Tuple[int, int, float]:
+        from PIL import Image
+
+        predicted, reused, elapsed = 0, 0, 0.0
+        for path in self.image_paths:
+            if path not in self._targets:
+                with Image.open(path) as image:
+                    width, height = image.size
+                self._targets[path] = load_labels(self.data_dir / 'labels' / f"{path.stem}.txt", width, height)
+                self._shapes[path] = (height, width)
+            if path in self._candidates and not force:
+                reused += 1
+                continue
+
+            data = path.read_bytes()
+            misses = cache.misses if cache is not None else None
+            start = time.perf_counter()
+            if cache is None:
+                candidates = self.detector.predict_candidates(self.detector._decode(data), conf=self.conf_floor)
+            else:
+                candidates = self.detector.predict_candidates(data, conf=self.conf_floor)
+            duration = time.perf_counter() - start
+
+            self._candidates[path] = candidates
+            if cache is not None and cache.misses == misses:
+                reused += 1
+            else:
+                predicted += 1
+                elapsed += duration
+        return predicted, reused, elapsed
+
+    def _predict_pack(self, cache, force: bool) -> Tuple[int, int, float]:
+        pack = self.pack
+        predicted, reused, elapsed = 0, 0, 0.0
+        for indices, images in pack.batches(self.detector.batch_size):
+            todo = []
+            for i in indices:
+                path = self.image_paths[i]
+                if path not in self._targets:
+                    self._targets[path] = pack.targets(i)
+                    self._shapes[path] = pack.meta(i).orig_shape
+                if path in self._candidates and not force:
+                    reused += 1
+                    continue
+                # Letterboxed input can differ slightly from file input, so it has its own cache variant
+                key = cached = None
+                if cache is not None:
+                    key = cache.key(pack.hashes[i], self.conf_floor, 1.0, variant='raw-candidates-pack')
+                    cached = cache.get(key)
+                if cached is not None:
+                    self._candidates[path] = cached
+                    reused += 1
+                else:
+                    todo.append((i, key))
+            if not todo:
+                continue
+
+            start = time.perf_counter()
+            results = self.detector.predict_candidates_batch(
+                [images[i - indices.start] for i, _ in todo],
+                conf=self.conf_floor,
+                batch_size=len(todo)
+            )
+            elapsed += time.perf_counter() - start
+            predicted += len(todo)
+
+            for (i, key), candidates in zip(todo, results):
+                scale_boxes(candidates.boxes, pack.meta(i), clip=False)
+                self._candidates[self.image_paths[i]] = candidates
+                if key is not None:
+                    cache.put(key, candidates)
+        return predicted, reused, elapsed
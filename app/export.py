@@ -0,0 +1,293 @@
+"""
+Per-frame detection export (JSONL or Parquet) written by a background thread
+"""
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .results import DetectionBatch
+
+# Marks the end of the export queue
+_END = object()
+
+# File suffix -> export format
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+# (frame index, timestamp, result) as queued by FrameExporter.write()
+Record = Tuple[int, float, DetectionBatch]
+
+
+class JsonlFormat:
+    """One JSON object per line: frame, timestamp, class_ids, scores, boxes"""
+
+    def __init__(self, path: Union[str, Path], class_names: Sequence[str]):
+        """
+        Args:
+            path: Output .jsonl file
+            class_names: Class names indexed by class id (not written, ids are)
+        """
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records: List[Record]):
+        lines = [
+            json.dumps({
+                'frame': index,
+                'timestamp': timestamp,
+                'class_ids': result.class_ids.tolist(),
+                # float64 before rounding so the JSON shows short decimals
+                'scores': np.round(result.scores.astype(np.float64), 4).tolist(),
+                'boxes': np.round(result.boxes.astype(np.float64), 1).tolist()
+            })
+            for index, timestamp, result in records
+        ]
+        self._file.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetFormat:
+    """
+    One row per frame with list columns, written in row groups
+
+    Columns: frame (int64), timestamp (float64), class_ids (list<uint8>),
+    scores (list<float32>), boxes (list<fixed_size_list<float32, 4>>).
+    Frames without detections keep their row with empty lists. The class
+    names are stored in the schema metadata under 'class_names'.
+    """
+
+    def __init__(self, path: Union[str, Path], class_names: Sequence[str], row_group_size: int = 1024):
+        """
+        Args:
+            path: Output .parquet file
+            class_names: Class names indexed by class id
+            row_group_size: Frames per row group
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires the 'pyarrow' package: pip install pyarrow") from e
+
+        self._pa = pa
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([
+            ('frame', pa.int64()),
+            ('timestamp', pa.float64()),
+            ('class_ids', pa.list_(pa.uint8())),
+            ('scores', pa.list_(pa.float32())),
+            ('boxes', pa.list_(pa.list_(pa.float32(), 4))),
+        ], metadata={'class_names': json.dumps(list(class_names))})
+        self._writer = pq.ParquetWriter(str(path), self.schema)
+        self._pending: List[Record] = []
+
+    def write(self, records: List[Record]):
+        self._pending.extend(records)
+        while len(self._pending) >= self.row_group_size:
+            self._flush(self._pending[:self.row_group_size])
+            del self._pending[:self.row_group_size]
+
+    def close(self):
+        if self._pending:
+            self._flush(self._pending)
+            self._pending = []
+        self._writer.close()
+
+    def _flush(self, records: List[Record]):
+        pa = self._pa
+        # Flat value arrays plus per-frame offsets, no per-detection Python objects
+        counts = np.fromiter((len(result) for _, _, result in records), dtype=np.int32, count=len(records))
+        offsets = pa.array(np.concatenate([[0], np.cumsum(counts)]).astype(np.int32))
+        results = [result for _, _, result in records]
+        class_ids = np.concatenate([result.class_ids for result in results])
+        scores = np.concatenate([result.scores for result in results])
+        boxes = pa.FixedSizeListArray.from_arrays(
+            pa.array(np.concatenate([result.boxes for result in results]).reshape(-1), type=pa.float32()), 4
+        )
+
+        table = pa.Table.from_arrays([
+            pa.array([index for index, _, _ in records], type=pa.int64()),
+            pa.array([timestamp for _, timestamp, _ in records], type=pa.float64()),
+            pa.ListArray.from_arrays(offsets, pa.array(class_ids, type=pa.uint8())),
+            pa.ListArray.from_arrays(offsets, pa.array(scores, type=pa.float32())),
+            pa.ListArray.from_arrays(offsets, boxes),
+        ], schema=self.schema)
+        self._writer.write_table(table)
+
+
+class FrameExporter:
+    """
+    Stream per-frame results to a file from a background thread
+
+    write() only puts the result on a bounded queue; a writer thread
+    serialises queued frames in chunks. If the writer falls behind and the
+    queue is full, write() waits for a free slot so no frame is lost (the
+    wait is reported as stats()['wait_time']). With drop_when_full, frames
+    are dropped and counted instead of stalling inference, and close()
+    prints a warning if any were.
+    """
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 class_names: Sequence[str],
+                 export_format: str = None,
+                 queue_size: int = 4096,
+                 chunk_size: int = 256,
+                 row_group_size: int = 1024,
+                 drop_when_full: bool = False):
+        """
+        Args:
+            path: Output file
+            class_names: Class names indexed by class id
+            export_format: 'jsonl' or 'parquet' (default: from the file suffix)
+            queue_size: Frames buffered ahead of the writer thread
+            chunk_size: Maximum frames serialised per write
+            row_group_size: Frames per Parquet row group
+            drop_when_full: Drop frames when the queue is full instead of waiting
+        """
+        self.path = Path(path)
+        self.export_format = export_format or FORMATS.get(self.path.suffix.lower())
+        if self.export_format not in FORMATS.values():
+            raise ValueError(f"Unknown export format for {self.path}, expected one of "
+                             f"{sorted(set(FORMATS.values()))} or a {'/'.join(FORMATS)} file")
+
+        # Opened here so a missing dependency or bad path fails before the video starts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.export_format == 'parquet':
+            self._format = ParquetFormat(self.path, class_names, row_group_size=row_group_size)
+        else:
+            self._format = JsonlFormat(self.path, class_names)
+
+        self.chunk_size = chunk_size
+        self.drop_when_full = drop_when_full
+        self.frames_written = 0
+        self.dropped = 0
+        self.write_time = 0.0
+        self.wait_time = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='frame-export', daemon=True)
+        self._thread.start()
+
+    def write(self, index: int, timestamp: float, result: DetectionBatch):
+        """
+        Queue one frame result
+
+        Args:
+            index: Frame index in the stream
+            timestamp: Seconds from the start of a video file, or Unix time for live sources
+            result: Detections of the frame
+
+        Raises:
+            Exception: The writer thread failed
+        """
+        if self._error is not None:
+            raise self._error
+        item = (index, timestamp, result)
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            if self.drop_when_full:
+                self.dropped += 1
+                return
+
+        # Wait for the writer, re-checking that it is still alive to drain the queue
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    if self._error is not None:
+                        raise self._error
+        finally:
+            self.wait_time += time.perf_counter() - start
+
+    def close(self):
+        """Write the queued frames, close the file and re-raise a writer thread error"""
+        if self._closed:
+            return
+        self._closed = True
+        # The end marker must get through; only wait while the writer is still draining
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_END, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        if self.dropped:
+            print(f"Warning: {self.dropped} frames were dropped from the export {self.path} "
+                  f"because the writer fell behind")
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> dict:
+        return {
+            'path': str(self.path),
+            'format': self.export_format,
+            'frames_written': self.frames_written,
+            'dropped': self.dropped,
+            'write_time': self.write_time,
+            'wait_time': self.wait_time
+        }
+
+    def _run(self):
+        try:
+            finished = False
+            while not finished:
+                records = [self._queue.get()]
+                # Drain whatever else is already queued into the same write
+                while len(records) < self.chunk_size:
+                    try:
+                        records.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if records[-1] is _END:
+                    records.pop()
+                    finished = True
+                if records:
+                    start = time.perf_counter()
+                    self._format.write(records)
+                    self.write_time += time.perf_counter() - start
+                    self.frames_written += len(records)
+        except Exception as e:
+            self._error = e
+        finally:
+            try:
+                self._format.close()
+            except Exception as e:
+                self._error = self._error or e
+
+
+def make_exporter(path: Union[str, Path], class_names: Sequence[str], export_cfg: dict = None) -> FrameExporter:
+    """
+    Create the frame exporter described by the 'video.export' config section
+
+    Args:
+        path: Output .jsonl or .parquet file
+        class_names: Class names indexed by class id
+        export_cfg: 'video.export' config section (format, queue_size, chunk_size,
+            row_group_size, drop_when_full)
+
+    Returns:
+        FrameExporter
+    """
+    export_cfg = export_cfg or {}
+    return FrameExporter(
+        path,
+        class_names,
+        export_format=export_cfg.get('format'),
+        queue_size=export_cfg.get('queue_size', 4096),
+        chunk_size=export_cfg.get('chunk_size', 256),
+        row_group_size=export_cfg.get('row_group_size', 1024),
+        drop_when_full=export_cfg.get('drop_when_full', False)
+    )
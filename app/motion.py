@@ -0,0 +1,149 @@
+"""
+Motion-gated inference for fixed cameras
+"""
+from typing import Callable, List, Sequence
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch
+
+
+class MotionGate:
+    """Skip inference on frames where nothing in the scene changed"""
+
+    def __init__(self,
+                 downscale_width: int = 160,
+                 pixel_threshold: int = 25,
+                 sensitivity: float = 0.005,
+                 max_skip: int = 150,
+                 skip_only_empty: bool = True,
+                 roi: List[Sequence[Sequence[float]]] = None,
+                 inner=None):
+        """
+        Args:
+            downscale_width: Width of the greyscale thumbnail that is compared
+            pixel_threshold: Grey level change for a pixel to count as moving
+            sensitivity: Fraction of region-of-interest pixels that must move
+                to run the detector
+            max_skip: Force a detection after this many consecutive skips
+            skip_only_empty: Only skip while the last result had no
+                detections, so objects standing still are never frozen
+            roi: Polygons in normalised [x, y] coordinates where motion is
+                measured (default: whole frame)
+            inner: Optional scheduler (e.g. TrackingScheduler) run on the
+                frames that pass the gate
+        """
+        self.downscale_width = downscale_width
+        self.pixel_threshold = pixel_threshold
+        self.sensitivity = sensitivity
+        self.max_skip = max_skip
+        self.skip_only_empty = skip_only_empty
+        self.roi = roi or []
+        self.inner = inner
+
+        self._reference = None
+        self._mask = None
+        self._mask_shape = None
+        self._mask_pixels = 0
+        self._last_result = None
+        self._consecutive_skips = 0
+
+        self.passed_frames = 0
+        self.skipped_frames = 0
+
+    def process(self,
+                frame: np.ndarray,
+                detect: Callable[[np.ndarray], DetectionBatch]) -> DetectionBatch:
+        """
+        Produce detections for one frame
+
+        Args:
+            frame: Decoded frame (BGR format)
+            detect: Function running the full detector on a frame
+
+        Returns:
+            Fresh DetectionBatch, or the previous one when the frame is skipped
+        """
+        thumbnail = self._thumbnail(frame)
+
+        if self._can_skip(thumbnail):
+            self.skipped_frames += 1
+            self._consecutive_skips += 1
+            return self._last_result
+
+        result = self.inner.process(frame, detect) if self.inner is not None else detect(frame)
+        self._reference = thumbnail
+        self._last_result = result
+        self._consecutive_skips = 0
+        self.passed_frames += 1
+        return result
+
+    def stats(self) -> dict:
+        """
+        Gating statistics, merged with those of the inner scheduler
+
+        Returns:
+            Dictionary with passed/skipped frame counts and skip ratio
+        """
+        total = self.passed_frames + self.skipped_frames
+        stats = dict(self.inner.stats()) if self.inner is not None else {}
+        stats.update({
+            'motion_passed_frames': self.passed_frames,
+            'motion_skipped_frames': self.skipped_frames,
+            'skip_ratio': self.skipped_frames / total if total else 0.0
+        })
+        return stats
+
+    def motion_fraction(self, thumbnail: np.ndarray) -> float:
+        """
+        Fraction of region-of-interest pixels that changed since the reference
+
+        Args:
+            thumbnail: Output of the gate's downscaled greyscale conversion
+
+        Returns:
+            Changed pixel fraction (1.0 when there is no reference yet)
+        """
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            return 1.0
+
+        moving = cv2.absdiff(thumbnail, self._reference) > self.pixel_threshold
+        if self._mask is not None:
+            moving &= self._mask
+        return float(np.count_nonzero(moving)) / self._mask_pixels
+
+    def _can_skip(self, thumbnail: np.ndarray) -> bool:
+        if self._last_result is None or self._consecutive_skips >= self.max_skip:
+            return False
+        if self.skip_only_empty and len(self._last_result):
+            return False
+        return self.motion_fraction(thumbnail) < self.sensitivity
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        width = min(self.downscale_width, w)
+        height = max(int(round(h * width / w)), 1)
+
+        small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        if self._mask_shape != small.shape:
+            self._build_mask(small.shape)
+        return small
+
+    def _build_mask(self, shape: tuple):
+        h, w = shape
+        self._mask_shape = shape
+        if not self.roi:
+            self._mask = None
+            self._mask_pixels = h * w
+            return
+
+        mask = np.zeros((h, w), dtype=np.uint8)
+        for polygon in self.roi:
+            points = np.round(np.asarray(polygon, dtype=np.float32) * [w - 1, h - 1]).astype(np.int32)
+            cv2.fillPoly(mask, [points], 1)
+        self._mask = mask.astype(bool)
+        self._mask_pixels = max(int(np.count_nonzero(self._mask)), 1)
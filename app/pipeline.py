@@ -0,0 +1,177 @@
+"""
+Threaded decode/prefetch pipeline feeding fixed-size inference batches
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .utils.files import chunked
+from .utils.preprocess import LetterboxMeta, letterbox
+
+# Marks the end of the stream in the batch queue
+_END = object()
+
+
+class PreparedBatch(NamedTuple):
+    """Decoded, letterboxed images ready for the model"""
+    paths: List[Path]
+    images: List[np.ndarray]
+    metas: List[LetterboxMeta]
+    originals: Optional[List[np.ndarray]] = None   # decoded full-size images, with keep_originals
+    unreadable: Tuple[Tuple[int, Path], ...] = ()  # (position in the input chunk, path) of failed decodes
+
+
+class PrefetchPipeline:
+    """Decode and letterbox images on a thread pool ahead of inference"""
+
+    def __init__(self,
+                 image_paths: Iterable[Union[str, Path]],
+                 batch_size: int = 16,
+                 workers: int = 4,
+                 queue_size: int = 4,
+                 imgsz: int = 640,
+                 keep_originals: bool = False):
+        """
+        Args:
+            image_paths: Any iterable of image paths, consumed lazily
+            batch_size: Images per prepared batch
+            workers: Decode threads (OpenCV releases the GIL while decoding)
+            queue_size: Maximum number of prepared batches waiting for the model
+            imgsz: Letterbox size fed to the model
+            keep_originals: Also pass the decoded full-size images along
+                (PreparedBatch.originals), e.g. to draw and save results
+        """
+        self.image_paths = image_paths
+        self.batch_size = batch_size
+        self.workers = workers
+        self.imgsz = imgsz
+        self.keep_originals = keep_originals
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters; producer_stall is time spent waiting for a free queue
+        # slot (model-bound), consumer_stall time waiting for a batch
+        # (decode-bound)
+        self._batches = 0
+        self._images = 0
+        self._decode_errors = 0
+        self._decode_time = 0.0
+        self._producer_stall = 0.0
+        self._consumer_stall = 0.0
+        self._max_depth = 0
+
+    def __iter__(self) -> Iterator[PreparedBatch]:
+        """
+        Start decoding and yield prepared batches in input order
+
+        Unreadable images are left out of the model input, listed in
+        PreparedBatch.unreadable and counted in stats()['decode_errors'].
+        """
+        self.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self._queue.get()
+                self._consumer_stall += time.perf_counter() - start
+
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def start(self):
+        """Start the producer thread (called automatically by iteration)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._produce, name='prefetch', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop the producer and release queued batches"""
+        self._stop.set()
+        # Drain so a producer blocked on put() can observe the stop flag
+        while self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        self._thread = None
+
+    def stats(self) -> dict:
+        """
+        Pipeline statistics
+
+        Returns:
+            Dictionary with queue depth, stall times and a bound hint
+        """
+        return {
+            'batches': self._batches,
+            'images': self._images,
+            'decode_errors': self._decode_errors,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self._max_depth,
+            'queue_capacity': self._queue.maxsize,
+            'decode_time': self._decode_time,
+            'producer_stall_time': self._producer_stall,
+            'consumer_stall_time': self._consumer_stall,
+            'bound': 'decode' if self._consumer_stall > self._producer_stall else 'model'
+        }
+
+    def _decode(self, path: Path):
+        image = cv2.imread(str(path))
+        if image is None:
+            return None
+        letterboxed, meta = letterbox(image, self.imgsz)
+        return letterboxed, meta, image if self.keep_originals else None
+
+    def _produce(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='decode') as pool:
+                for chunk in chunked(self.image_paths, self.batch_size):
+                    if self._stop.is_set():
+                        return
+
+                    start = time.perf_counter()
+                    decoded = list(pool.map(self._decode, chunk))
+                    self._decode_time += time.perf_counter() - start
+
+                    paths, images, metas, originals, unreadable = [], [], [], [], []
+                    for position, (path, item) in enumerate(zip(chunk, decoded)):
+                        if item is None:
+                            self._decode_errors += 1
+                            unreadable.append((position, Path(path)))
+                            continue
+                        paths.append(Path(path))
+                        images.append(item[0])
+                        metas.append(item[1])
+                        originals.append(item[2])
+
+                    self._put(PreparedBatch(paths, images, metas, originals if self.keep_originals else None,
+                                            tuple(unreadable)))
+                    self._batches += 1
+                    self._images += len(paths)
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(_END)
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._producer_stall += time.perf_counter() - start
+        self._max_depth = max(self._max_depth, self._queue.qsize())
@@ -0,0 +1,173 @@
+"""
+Low-overhead per-stage timing histograms
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List
+
+# Bucket upper bounds in seconds: 10 us to ~10 s, growing by sqrt(2)
+BUCKET_BOUNDS: List[float] = [1e-5 * 2 ** (i / 2) for i in range(41)]
+
+
+class StageHistogram:
+    """Fixed-bucket histogram of durations for one stage"""
+
+    __slots__ = ('counts', 'count', 'total', 'max', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)   # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record one duration"""
+        index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile (seconds) by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.quantile(0.5) * 1000,
+            'p95_ms': self.quantile(0.95) * 1000,
+            'p99_ms': self.quantile(0.99) * 1000,
+            'max_ms': self.max * 1000
+        }
+
+
+class _NullStage:
+    # Shared no-op context manager returned while profiling is disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: StageHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Collect per-stage duration histograms"""
+
+    def __init__(self, enabled: bool = False):
+        """
+        Args:
+            enabled: Record timings; when False, stage() and observe() do nothing
+        """
+        self.enabled = enabled
+        self.histograms: Dict[str, StageHistogram] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """
+        Context manager timing one execution of a stage
+
+        Args:
+            name: Stage name (e.g. 'decode', 'forward', 'draw')
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self._histogram(name))
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration measured elsewhere"""
+        if self.enabled:
+            self._histogram(name).observe(seconds)
+
+    def reset(self):
+        """Drop every recorded timing"""
+        with self._lock:
+            self.histograms = {}
+
+    def to_dict(self) -> dict:
+        """
+        Stage summaries
+
+        Returns:
+            Dictionary stage -> count, total, mean and estimated percentiles
+        """
+        return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+    def to_prometheus(self, metric: str = 'helmet_stage_duration_seconds') -> str:
+        """
+        Export the histograms in the Prometheus text exposition format
+
+        Args:
+            metric: Metric name, stages become a 'stage' label
+
+        Returns:
+            Text with _bucket, _sum and _count samples per stage
+        """
+        lines = [f"# HELP {metric} Duration of detection pipeline stages.", f"# TYPE {metric} histogram"]
+        for name, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKET_BOUNDS + [float('inf')], histogram.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else f"{bound:.6g}"
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total:.9g}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        """Human-readable stage breakdown, sorted by total time"""
+        stages = sorted(self.to_dict().items(), key=lambda item: -item[1]['total_s'])
+        if not stages:
+            return "No stage timings recorded"
+        total = sum(stats['total_s'] for _, stats in stages) or 1.0
+        lines = [f"{'stage':<12} {'count':>7} {'total s':>9} {'share':>6} {'mean ms':>9} "
+                 f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+        for name, stats in stages:
+            lines.append(
+                f"{name:<12} {stats['count']:>7} {stats['total_s']:>9.3f} {stats['total_s'] / total:>6.1%} "
+                f"{stats['mean_ms']:>9.2f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+            )
+        return "\n".join(lines)
+
+    def _histogram(self, name: str) -> StageHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, StageHistogram())
+        return histogram
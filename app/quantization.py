@@ -0,0 +1,298 @@
+"""
+INT8 post-training quantization calibrated on the validation split
+"""
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List, Sequence, Union
+
+import cv2
+import numpy as np
+
+from .backends import resolve_model
+from .datapack import DatasetPack
+from .utils.files import iter_image_paths
+from .utils.preprocess import letterbox
+
+
+def calibration_batches(source: Union[str, Path, DatasetPack],
+                        imgsz: int = 640,
+                        limit: int = None) -> Iterator[np.ndarray]:
+    """
+    Yield model-ready calibration tensors from a directory of images or a dataset pack
+
+    Args:
+        source: Directory with calibration images, or a DatasetPack read
+            straight from its memory map
+        imgsz: Letterbox size
+        limit: Maximum number of images (default: all)
+
+    Returns:
+        Iterator of (1, 3, imgsz, imgsz) float32 arrays in [0, 1], RGB
+    """
+    if isinstance(source, DatasetPack):
+        if source.imgsz != imgsz:
+            raise ValueError(f"Pack letterboxed at {source.imgsz}, calibration needs {imgsz}")
+        for _, images in source.batches(1, limit):
+            yield np.ascontiguousarray(images[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        return
+
+    for count, path in enumerate(sorted(iter_image_paths(source))):
+        if limit is not None and count >= limit:
+            return
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        image, _ = letterbox(image, imgsz)
+        tensor = image[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        yield np.ascontiguousarray(tensor)
+
+
+def head_node_names(model) -> List[str]:
+    """
+    Names of the nodes belonging to the final detection head
+
+    The box/class decoding of the YOLOv8 head is very sensitive to
+    quantization, so it is kept in floating point.
+
+    Args:
+        model: Loaded onnx.ModelProto
+
+    Returns:
+        Node names under the highest-numbered '/model.N/' prefix
+    """
+    indices = [int(m.group(1)) for node in model.graph.node
+               for m in [re.match(r'/model\.(\d+)/', node.name)] if m]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in model.graph.node if node.name.startswith(prefix)]
+
+
+def quantize_model(model_path: Union[str, Path],
+                   output_path: Union[str, Path],
+                   calibration_dir: Union[str, Path, DatasetPack] = 'data/val/images',
+                   imgsz: int = 640,
+                   num_images: int = 100,
+                   per_channel: bool = True,
+                   calibrate_method: str = 'minmax',
+                   exclude_head: bool = True,
+                   cache_dir: Union[str, Path] = 'app/models/.cache') -> Path:
+    """
+    Produce a statically quantized INT8 ONNX model
+
+    The FP32 weights are exported to ONNX (cached, see backends), then
+    quantized with ONNX Runtime using activation ranges measured on the
+    calibration images. The ultralytics metadata is copied over so the
+    result loads with HelmetDetector(model_path=output_path).
+
+    Args:
+        model_path: FP32 weights (.pt or .onnx)
+        output_path: Destination of the INT8 .onnx model
+        calibration_dir: Directory with calibration images, or a DatasetPack
+        imgsz: Model input size
+        num_images: Maximum calibration images
+        per_channel: Per-channel weight quantization
+        calibrate_method: 'minmax', 'entropy' or 'percentile'
+        exclude_head: Keep the detection head in floating point
+        cache_dir: Directory holding exported artifacts
+
+    Returns:
+        Path of the quantized model
+    """
+    try:
+        import onnx
+        from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                              QuantType, quantize_static)
+    except ImportError as e:
+        raise ImportError("Quantization requires onnx and onnxruntime: pip install onnx onnxruntime") from e
+
+    methods = {
+        'minmax': CalibrationMethod.MinMax,
+        'entropy': CalibrationMethod.Entropy,
+        'percentile': CalibrationMethod.Percentile,
+    }
+    if calibrate_method not in methods:
+        raise ValueError(f"Unknown calibration method '{calibrate_method}', expected one of {sorted(methods)}")
+
+    fp32_path = resolve_model(model_path, backend='onnxruntime', cache_dir=cache_dir, imgsz=imgsz)
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = calibration_batches(calibration_dir, imgsz, num_images)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {input_name: batch}
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    quantize_static(
+        fp32_path,
+        str(output_path),
+        Reader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=per_channel,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=methods[calibrate_method],
+        nodes_to_exclude=head_node_names(fp32_model) if exclude_head else None
+    )
+
+    # Carry over names/stride/imgsz so ultralytics can load the model
+    quantized = onnx.load(str(output_path))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(quantized, str(output_path))
+    return output_path
+
+
+def dataset_yaml(data_dir: Union[str, Path], class_names: Sequence[str], workdir: Union[str, Path]) -> Path:
+    """
+    Write an ultralytics dataset file for a local YOLO-format split
+
+    Files are linked one by one into `workdir` so the label cache
+    ultralytics writes next to the labels never touches the repository
+    copy (directory links would be resolved back to the original).
+
+    Args:
+        data_dir: Split directory containing images/ and labels/
+        class_names: Class names indexed by class id
+        workdir: Scratch directory
+
+    Returns:
+        Path of the dataset YAML
+    """
+    import yaml
+
+    data_dir = Path(data_dir).resolve()
+    workdir = Path(workdir)
+    for sub in ('images', 'labels'):
+        target = workdir / 'val' / sub
+        target.mkdir(parents=True, exist_ok=True)
+        for source in (data_dir / sub).iterdir():
+            if source.is_file() and not (target / source.name).exists():
+                (target / source.name).symlink_to(source.resolve())
+
+    path = workdir / 'data.yaml'
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({
+            'path': str(workdir.resolve()),
+            'train': 'val/images',
+            'val': 'val/images',
+            'names': dict(enumerate(class_names))
+        }, f)
+    return path
+
+
+def measure_latency(model_path: Union[str, Path], image_dir: Union[str, Path], imgsz: int = 640,
+                    warmup: int = 3) -> dict:
+    """
+    Per-image latency of a model on a directory of images
+
+    Args:
+        model_path: Model to load with YOLO()
+        image_dir: Directory with test images
+        imgsz: Inference size
+        warmup: Untimed leading runs
+
+    Returns:
+        Dictionary with mean/p50/p95 latency in milliseconds
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(str(model_path), task='detect')
+    images = [cv2.imread(str(p)) for p in sorted(iter_image_paths(image_dir))]
+    images = [image for image in images if image is not None]
+
+    for image in images[:warmup]:
+        model.predict(image, imgsz=imgsz, verbose=False)
+
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        model.predict(image, imgsz=imgsz, verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings = np.asarray(timings)
+    return {
+        'images': len(timings),
+        'mean_ms': float(timings.mean()) if len(timings) else 0.0,
+        'p50_ms': float(np.percentile(timings, 50)) if len(timings) else 0.0,
+        'p95_ms': float(np.percentile(timings, 95)) if len(timings) else 0.0
+    }
+
+
+def compare_models(fp32_path: Union[str, Path],
+                   int8_path: Union[str, Path],
+                   data_dir: Union[str, Path],
+                   class_names: Sequence[str],
+                   imgsz: int = 640,
+                   cache_dir: Union[str, Path] = 'app/models/.cache') -> dict:
+    """
+    Compare accuracy and latency of the FP32 and INT8 models
+
+    The baseline is the FP32 ONNX export the INT8 model was quantized from,
+    so both run on ONNX Runtime with the same session options and the
+    difference is only the quantization.
+
+    Args:
+        fp32_path: FP32 weights (.pt or .onnx)
+        int8_path: Quantized model
+        data_dir: Labelled split directory containing images/ and labels/
+        class_names: Class names indexed by class id
+        imgsz: Inference size
+        cache_dir: Directory holding exported artifacts
+
+    Returns:
+        Report dictionary with mAP50, mAP50-95 and latency for both models
+    """
+    from ultralytics import YOLO
+
+    fp32_path = resolve_model(fp32_path, backend='onnxruntime', cache_dir=cache_dir, imgsz=imgsz)
+    report = {'imgsz': imgsz, 'data': str(data_dir), 'models': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        data_yaml = dataset_yaml(data_dir, class_names, workdir)
+
+        for name, path in (('fp32', fp32_path), ('int8', int8_path)):
+            metrics = YOLO(str(path), task='detect').val(
+                data=str(data_yaml),
+                imgsz=imgsz,
+                batch=1,
+                plots=False,
+                project=workdir,
+                verbose=False
+            )
+            report['models'][name] = {
+                'path': str(path),
+                'size_mb': _size_mb(path),
+                'map50': float(metrics.box.map50),
+                'map50_95': float(metrics.box.map),
+                'latency': measure_latency(path, Path(data_dir) / 'images', imgsz)
+            }
+
+    fp32, int8 = report['models']['fp32'], report['models']['int8']
+    report['delta'] = {
+        'map50': int8['map50'] - fp32['map50'],
+        'map50_95': int8['map50_95'] - fp32['map50_95'],
+        'latency_speedup': fp32['latency']['mean_ms'] / max(int8['latency']['mean_ms'], 1e-9)
+    }
+    return report
+
+
+def write_report(report: dict, path: Union[str, Path]):
+    """Write a quantization report as JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def _size_mb(path: Union[str, Path]) -> float:
+    path = Path(path)
+    files = path.rglob('*') if path.is_dir() else [path]
+    return sum(p.stat().st_size for p in files if p.is_file()) / 2 ** 20
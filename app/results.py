@@ -0,0 +1,230 @@
+"""
+Array-backed detection results
+"""
+import io
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Sequence, Union
+
+import numpy as np
+
+
+class DetectionBatch:
+    """Columnar detections for a single image or video frame"""
+
+    __slots__ = ('boxes', 'scores', 'class_ids', 'class_names', '_labels')
+
+    # Keys of the legacy dictionary view returned by to_dict()
+    DICT_KEYS = ('boxes', 'labels', 'confidences', 'count')
+
+    def __init__(self,
+                 boxes: np.ndarray,
+                 scores: np.ndarray,
+                 class_ids: np.ndarray,
+                 class_names: Sequence[str]):
+        """
+        Args:
+            boxes: (N, 4) boxes [x_min, y_min, x_max, y_max]
+            scores: (N,) confidence scores
+            class_ids: (N,) class indices into class_names
+            class_names: Class names indexed by class id
+        """
+        self.boxes = np.ascontiguousarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32).reshape(-1)
+        self.class_ids = np.ascontiguousarray(class_ids, dtype=np.uint8).reshape(-1)
+        self.class_names = tuple(class_names)
+        self._labels = None
+
+    @classmethod
+    def empty(cls, class_names: Sequence[str]) -> 'DetectionBatch':
+        """Create a batch without detections"""
+        return cls(
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.uint8),
+            class_names
+        )
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, class_names: Sequence[str]) -> 'DetectionBatch':
+        """
+        Create a batch from a YOLO boxes data array
+
+        Args:
+            data: (N, 6) array [x_min, y_min, x_max, y_max, conf, cls], or
+                (N, 7) with a track id column before conf
+            class_names: Class names indexed by class id
+
+        Returns:
+            DetectionBatch
+        """
+        if data is None or len(data) == 0:
+            return cls.empty(class_names)
+        return cls(data[:, :4], data[:, -2], data[:, -1], class_names)
+
+    @classmethod
+    def concat(cls, batches: Sequence['DetectionBatch'], class_names: Sequence[str]) -> 'DetectionBatch':
+        """
+        Concatenate several batches into one
+
+        Args:
+            batches: Batches to join
+            class_names: Class names indexed by class id
+
+        Returns:
+            DetectionBatch with all rows, in order
+        """
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty(class_names)
+        return cls(
+            np.concatenate([b.boxes for b in batches]),
+            np.concatenate([b.scores for b in batches]),
+            np.concatenate([b.class_ids for b in batches]),
+            class_names
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __repr__(self) -> str:
+        return f"DetectionBatch(count={len(self)})"
+
+    @property
+    def count(self) -> int:
+        """Number of detections"""
+        return len(self.scores)
+
+    @property
+    def labels(self) -> List[str]:
+        """Class name of every detection (built on first access)"""
+        if self._labels is None:
+            names = self.class_names
+            self._labels = [names[i] for i in self.class_ids.tolist()]
+        return self._labels
+
+    def copy(self) -> 'DetectionBatch':
+        """Copy with its own arrays, safe to modify"""
+        return DetectionBatch(self.boxes.copy(), self.scores.copy(), self.class_ids.copy(), self.class_names)
+
+    def select(self, index: Union[np.ndarray, slice]) -> 'DetectionBatch':
+        """
+        Select a subset of detections
+
+        Args:
+            index: Boolean mask, index array or slice
+
+        Returns:
+            New DetectionBatch with the selected rows
+        """
+        return DetectionBatch(
+            self.boxes[index],
+            self.scores[index],
+            self.class_ids[index],
+            self.class_names
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Convert to the legacy dictionary format
+
+        Returns:
+            Dictionary with boxes, labels, confidences, count
+        """
+        return {
+            'boxes': self.boxes.tolist(),
+            'labels': list(self.labels),
+            'confidences': self.scores.tolist(),
+            'count': self.count
+        }
+
+    def __getitem__(self, key: str):
+        """Dictionary-style access kept for code written against to_dict()"""
+        if key == 'boxes':
+            return self.boxes.tolist()
+        if key == 'labels':
+            return list(self.labels)
+        if key == 'confidences':
+            return self.scores.tolist()
+        if key == 'count':
+            return self.count
+        raise KeyError(key)
+
+    def keys(self):
+        return self.DICT_KEYS
+
+    def to_buffers(self) -> Dict[str, memoryview]:
+        """
+        Expose the underlying arrays without copying
+
+        Returns:
+            Dictionary of memoryviews over boxes, scores and class_ids
+        """
+        return {
+            'boxes': memoryview(self.boxes),
+            'scores': memoryview(self.scores),
+            'class_ids': memoryview(self.class_ids)
+        }
+
+    @classmethod
+    def from_buffers(cls,
+                     buffers: Dict[str, Union[bytes, memoryview]],
+                     class_names: Sequence[str]) -> 'DetectionBatch':
+        """
+        Rebuild a batch from buffers produced by to_buffers()
+
+        The arrays are views on the given buffers, no data is copied.
+        """
+        return cls(
+            np.frombuffer(buffers['boxes'], dtype=np.float32).reshape(-1, 4),
+            np.frombuffer(buffers['scores'], dtype=np.float32),
+            np.frombuffer(buffers['class_ids'], dtype=np.uint8),
+            class_names
+        )
+
+    def save_npz(self, file: Union[str, Path, BinaryIO]):
+        """
+        Save to an uncompressed .npz archive
+
+        Args:
+            file: Output path or binary file object
+        """
+        np.savez(
+            file,
+            boxes=self.boxes,
+            scores=self.scores,
+            class_ids=self.class_ids,
+            class_names=np.array(self.class_names)
+        )
+
+    @classmethod
+    def load_npz(cls, file: Union[str, Path, BinaryIO]) -> 'DetectionBatch':
+        """
+        Load from an archive written by save_npz()
+
+        Args:
+            file: Input path or binary file object
+
+        Returns:
+            DetectionBatch
+        """
+        with np.load(file) as data:
+            return cls(
+                data['boxes'],
+                data['scores'],
+                data['class_ids'],
+                data['class_names'].tolist()
+            )
+
+    def to_bytes(self) -> bytes:
+        """Serialize to .npz bytes"""
+        buffer = io.BytesIO()
+        self.save_npz(buffer)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DetectionBatch':
+        """Deserialize from bytes produced by to_bytes()"""
+        return cls.load_npz(io.BytesIO(data))
+
+    def __reduce__(self):
+        return (DetectionBatch, (self.boxes, self.scores, self.class_ids, self.class_names))
@@ -0,0 +1,369 @@
+"""
+Asyncio HTTP inference server with dynamic micro-batching
+"""
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .results import DetectionBatch
+
+
+class LatencyRecorder:
+    """Rolling window of request latencies"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        # Totals since start, not limited to the window
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, points=(50, 90, 95, 99)) -> Dict[str, float]:
+        """Latency percentiles in milliseconds"""
+        if not self.samples:
+            return {f"p{p}_ms": 0.0 for p in points}
+        values = np.percentile(np.fromiter(self.samples, dtype=np.float64), points) * 1000
+        return {f"p{p}_ms": float(v) for p, v in zip(points, values)}
+
+
+class MicroBatcher:
+    """Collect concurrent requests into batched model calls"""
+
+    def __init__(self, detector, max_batch: int = 16, max_wait: float = 0.01):
+        """
+        Args:
+            detector: HelmetDetector shared by all requests
+            max_batch: Maximum images per model call
+            max_wait: Seconds to wait for more requests after the first one
+        """
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self.batch_sizes = Counter()
+        self.inference_time = 0.0
+        self._queue = None
+        self._worker = None
+        # One thread: the model is shared and must not run concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+
+    def start(self):
+        """Start the batching task on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching task and the inference thread"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, image: np.ndarray, conf: float, iou: float) -> Tuple[DetectionBatch, int]:
+        """
+        Queue one image and wait for its result
+
+        Returns:
+            (DetectionBatch, size of the batch it ran in)
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, conf, iou, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes[len(items)] += 1
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self._infer, items)
+            except Exception as e:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.inference_time += time.perf_counter() - start
+
+            for (*_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result((result, len(items)))
+
+    def _infer(self, items: List[tuple]) -> List[DetectionBatch]:
+        # NMS depends on iou, so requests are grouped by iou; each group runs
+        # at its lowest conf and every result is filtered to its own conf
+        results = [None] * len(items)
+        groups = {}
+        for index, (_, _, iou, _) in enumerate(items):
+            groups.setdefault(iou, []).append(index)
+
+        for iou, indices in groups.items():
+            min_conf = min(items[i][1] for i in indices)
+            predictions = self.detector.predict_arrays(
+                [items[i][0] for i in indices],
+                conf=min_conf,
+                iou=iou,
+                batch_size=len(indices)
+            )
+            for i, result in zip(indices, predictions):
+                conf = items[i][1]
+                results[i] = result if conf <= min_conf else result.select(result.scores >= conf)
+        return results
+
+
+class InferenceServer:
+    """Minimal HTTP/1.1 server exposing the detector"""
+
+    def __init__(self,
+                 detector,
+                 host: str = '127.0.0.1',
+                 port: int = 8000,
+                 max_batch: int = 16,
+                 max_wait_ms: float = 10,
+                 max_body_mb: float = 20):
+        """
+        Args:
+            detector: HelmetDetector shared by all requests
+            host: Bind address
+            port: Bind port
+            max_batch: Maximum images per model call
+            max_wait_ms: Time to wait for more requests before running a batch
+            max_body_mb: Largest accepted request body
+        """
+        self.detector = detector
+        self.host = host
+        self.port = port
+        self.max_body = int(max_body_mb * 2 ** 20)
+        self.batcher = MicroBatcher(detector, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+
+        self.latency = LatencyRecorder()
+        self.requests = 0
+        self.errors = 0
+        self.started_at = None
+        self._server = None
+
+    async def start(self):
+        """Start listening"""
+        self.batcher.start()
+        self.started_at = time.time()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def stop(self):
+        """Stop listening and release the batcher"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        """Start the server and run until cancelled"""
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+    def metrics(self) -> dict:
+        """
+        Server metrics
+
+        Returns:
+            Dictionary with request counts, latency percentiles, the batch-size histogram
+            and the detector startup times
+        """
+        histogram = self.batcher.batch_sizes
+        batches = sum(histogram.values())
+        return {
+            'uptime': time.time() - self.started_at if self.started_at else 0.0,
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency': self.latency.percentiles(),
+            'batches': batches,
+            'mean_batch_size': sum(size * n for size, n in histogram.items()) / batches if batches else 0.0,
+            'batch_size_histogram': {str(size): histogram[size] for size in sorted(histogram)},
+            'inference_time': self.batcher.inference_time,
+            'queue_depth': self.batcher.queue_depth,
+            'stages': self.detector.profiler.to_dict(),
+            'startup': self.detector.startup_stats
+        }
+
+    def metrics_prometheus(self) -> str:
+        """
+        Server metrics in the Prometheus text exposition format
+
+        Returns:
+            Request counters, a latency summary over the rolling window, the
+            batch-size histogram, inference time and queue depth, followed by
+            the profiler stage histograms
+        """
+        latency = self.latency.percentiles()
+        lines = [
+            "# HELP helmet_requests_total Detection requests received.",
+            "# TYPE helmet_requests_total counter",
+            f"helmet_requests_total {self.requests}",
+            "# HELP helmet_request_errors_total Detection requests that failed.",
+            "# TYPE helmet_request_errors_total counter",
+            f"helmet_request_errors_total {self.errors}",
+            "# HELP helmet_request_latency_seconds Request latency, quantiles over the recent window.",
+            "# TYPE helmet_request_latency_seconds summary",
+        ]
+        for key, value in latency.items():
+            quantile = int(key[1:-3]) / 100
+            lines.append(f'helmet_request_latency_seconds{{quantile="{quantile:g}"}} {value / 1000:.9g}')
+        lines += [
+            f"helmet_request_latency_seconds_sum {self.latency.total:.9g}",
+            f"helmet_request_latency_seconds_count {self.latency.count}",
+            "# HELP helmet_batch_size Images per model call.",
+            "# TYPE helmet_batch_size histogram",
+        ]
+        histogram = self.batcher.batch_sizes
+        cumulative = 0
+        for size in range(1, self.batcher.max_batch + 1):
+            cumulative += histogram.get(size, 0)
+            lines.append(f'helmet_batch_size_bucket{{le="{size}"}} {cumulative}')
+        lines += [
+            f'helmet_batch_size_bucket{{le="+Inf"}} {sum(histogram.values())}',
+            f"helmet_batch_size_sum {sum(size * n for size, n in histogram.items())}",
+            f"helmet_batch_size_count {sum(histogram.values())}",
+            "# HELP helmet_inference_seconds_total Time spent in batched model calls.",
+            "# TYPE helmet_inference_seconds_total counter",
+            f"helmet_inference_seconds_total {self.batcher.inference_time:.9g}",
+            "# HELP helmet_queue_depth Requests waiting for a batch.",
+            "# TYPE helmet_queue_depth gauge",
+            f"helmet_queue_depth {self.batcher.queue_depth}",
+            "# HELP helmet_uptime_seconds Seconds since the server started.",
+            "# TYPE helmet_uptime_seconds gauge",
+            f"helmet_uptime_seconds {time.time() - self.started_at if self.started_at else 0.0:.3f}",
+        ]
+        return "\n".join(lines) + "\n" + self.detector.profiler.to_prometheus()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self._dispatch(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            self._write_response(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError("Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > self.max_body:
+            raise ValueError(f"Request body larger than {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Union[dict, str]]:
+        url = urlsplit(target)
+        if method == 'GET' and url.path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if method == 'GET' and url.path == '/metrics':
+            if parse_qs(url.query).get('format') == ['prometheus']:
+                return HTTPStatus.OK, self.metrics_prometheus()
+            return HTTPStatus.OK, self.metrics()
+        if url.path == '/detect':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST with the image as body'}
+            return await self._detect(body, parse_qs(url.query))
+        return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint {url.path}"}
+
+    async def _detect(self, body: bytes, query: dict) -> Tuple[HTTPStatus, dict]:
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            conf = float(query.get('conf', [self.detector.conf_threshold])[0])
+            iou = float(query.get('iou', [self.detector.iou_threshold])[0])
+            image = await asyncio.get_running_loop().run_in_executor(None, self.detector._decode, body)
+        except ValueError as e:
+            self.errors += 1
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+
+        try:
+            result, batch_size = await self.batcher.submit(image, conf, iou)
+        except Exception as e:
+            self.errors += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+        elapsed = time.perf_counter() - start
+        self.latency.add(elapsed)
+        return HTTPStatus.OK, {
+            'count': result.count,
+            'detections': [
+                {'label': label, 'confidence': conf, 'box': box}
+                for label, conf, box in zip(result.labels, result.scores.tolist(), result.boxes.tolist())
+            ],
+            'batch_size': batch_size,
+            'latency_ms': elapsed * 1000
+        }
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload, keep_alive: bool):
+        # Dictionaries are sent as JSON, strings (Prometheus metrics) as plain text
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
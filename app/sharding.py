@@ -0,0 +1,213 @@
+"""
+Process-pool sharded batch inference
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from .results import DetectionBatch
+from .utils.files import chunked
+
+# Detector owned by each worker process, created once by _init_worker
+_worker_detector = None
+
+
+def _init_worker(model_path: str, config_path: str, threads: int, conf: float, iou: float):
+    global _worker_detector
+
+    # Thread pools read these when the libraries are first imported
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads)
+
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+    from .detector import HelmetDetector
+
+    _worker_detector = HelmetDetector(model_path=model_path, config_path=config_path)
+    _worker_detector.conf_threshold = conf
+    _worker_detector.iou_threshold = iou
+
+
+def _predict_chunk(paths: List[str], save_dir: str = None) -> List[DetectionBatch]:
+    # workers=0: a worker must never start a pool of its own, whatever inference.workers says
+    def predict(chunk):
+        return [result for _, result in _worker_detector.predict_batch_stream(
+            chunk, save_dir=save_dir, batch_size=len(chunk), prefetch_workers=0, workers=0
+        )]
+
+    # Unreadable images already come back empty; if the chunk still fails,
+    # retry image by image so only the failing ones are left empty
+    try:
+        return predict(paths)
+    except Exception:
+        results = []
+        for path in paths:
+            try:
+                results.extend(predict([path]))
+            except Exception:
+                results.append(DetectionBatch.empty(_worker_detector.class_names))
+        return results
+
+
+class ShardedPredictor:
+    """Spread image chunks over worker processes, each with its own detector"""
+
+    def __init__(self,
+                 model_path: Union[str, Path],
+                 config_path: Union[str, Path] = "app/config/config.yaml",
+                 workers: int = 2,
+                 threads_per_worker: int = 0,
+                 chunk_size: int = 16,
+                 conf: float = 0.25,
+                 iou: float = 0.7,
+                 max_retries: int = 2):
+        """
+        Args:
+            model_path: Weights loaded by every worker
+            config_path: Configuration file loaded by every worker
+            workers: Number of worker processes
+            threads_per_worker: Intra-op threads per worker (0 = cores / workers)
+            chunk_size: Images per task (and per model call)
+            conf: Confidence threshold
+            iou: NMS IoU threshold
+            max_retries: Resubmissions of a chunk that crashed its worker
+        """
+        self.model_path = str(model_path)
+        self.config_path = str(config_path)
+        self.workers = max(1, workers)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.chunk_size = chunk_size
+        self.conf = conf
+        self.iou = iou
+        self.max_retries = max_retries
+
+        self.chunks = 0
+        self.images = 0
+        self.restarts = 0
+        self._executor = None
+
+    def predict_stream(self,
+                       image_paths: Iterable[Union[str, Path]],
+                       save_dir: Union[str, Path] = None) -> Iterator[Tuple[Path, DetectionBatch]]:
+        """
+        Predict on a stream of images with the worker pool
+
+        Chunks are submitted lazily (at most two per worker in flight) and
+        results are yielded in input order. If a worker dies, the pool is
+        restarted and the chunks that were in flight are run again one at a
+        time, so a chunk is only charged a retry for a crash it caused.
+
+        Args:
+            image_paths: Any iterable of image paths
+            save_dir: Optional directory to save results
+
+        Returns:
+            Iterator of (image path, DetectionBatch) in input order
+        """
+        save_dir = str(save_dir) if save_dir else None
+        chunks = chunked((str(p) for p in image_paths), self.chunk_size)
+        pending = deque()   # [paths, future, crashes] in submission order
+        isolated = 0        # chunks left to run one at a time after a crash
+
+        try:
+            while True:
+                try:
+                    while not isolated and len(pending) < self.workers * 2:
+                        paths = next(chunks, None)
+                        if paths is None:
+                            break
+                        entry = [paths, None, 0]
+                        pending.append(entry)
+                        entry[1] = self._submit(paths, save_dir)
+                    if not pending:
+                        return
+
+                    entry = pending[0]
+                    if entry[1] is None:
+                        entry[1] = self._submit(entry[0], save_dir)
+                    paths = entry[0]
+                    results = entry[1].result()
+                except BrokenProcessPool:
+                    # Every in-flight future fails; only a chunk running alone is known to be the cause
+                    if isolated or len(pending) == 1:
+                        entry = pending[0]
+                        entry[2] += 1
+                        if entry[2] > self.max_retries:
+                            raise RuntimeError(f"Worker crashed {entry[2]} times on chunk starting at {entry[0][0]}")
+                    self._restart()
+                    for entry in pending:
+                        entry[1] = None
+                    isolated = len(pending)
+                    continue
+
+                pending.popleft()
+                isolated = max(0, isolated - 1)
+                self.chunks += 1
+                self.images += len(paths)
+                for path, result in zip(paths, results):
+                    yield Path(path), result
+        finally:
+            for _, future, _ in pending:
+                if future is not None:
+                    future.cancel()
+
+    def predict(self, image_paths: Iterable[Union[str, Path]],
+                save_dir: Union[str, Path] = None) -> List[DetectionBatch]:
+        """
+        Predict on images with the worker pool
+
+        Returns:
+            List of DetectionBatch, one per image, in input order
+        """
+        return [result for _, result in self.predict_stream(image_paths, save_dir)]
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        """
+        Pool statistics
+
+        Returns:
+            Dictionary with workers, threads, processed chunks/images and restarts
+        """
+        return {
+            'workers': self.workers,
+            'threads_per_worker': self.threads_per_worker,
+            'chunks': self.chunks,
+            'images': self.images,
+            'restarts': self.restarts
+        }
+
+    def _submit(self, paths: List[str], save_dir: str):
+        if self._executor is None:
+            # spawn: forking a process that already runs torch threads can deadlock
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.config_path, self.threads_per_worker, self.conf, self.iou)
+            )
+        return self._executor.submit(_predict_chunk, paths, save_dir)
+
+    def _restart(self):
+        self.restarts += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
@@ -0,0 +1,281 @@
+"""
+Multi-source stream scheduler sharing one model across cameras
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch
+
+
+def parse_source(source: Union[str, int, Path]) -> Union[str, int]:
+    """Turn '0'-style strings into device IDs, keep paths and URLs as strings"""
+    if isinstance(source, int):
+        return source
+    source = str(source)
+    return int(source) if source.isdigit() else source
+
+
+class StreamSource:
+    """Background reader that keeps only the latest frame of one source"""
+
+    def __init__(self,
+                 name: str,
+                 source: Union[str, int, Path],
+                 fps: Optional[float] = 5,
+                 realtime: bool = True,
+                 loop: bool = False):
+        """
+        Args:
+            name: Source name used to route results
+            source: Video file, camera device ID or stream URL
+            fps: Target inference rate for this source (None: the rate
+                the source reports once opened)
+            realtime: Pace video files at their native FPS, like a live camera
+            loop: Restart video files when they end
+        """
+        self.name = name
+        self.source = parse_source(source)
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.latency_sum = 0.0
+        self.next_due = 0.0
+        self.started_at = None
+        self.finished = False
+
+        self._lock = threading.Lock()
+        self._latest = None   # (frame index, frame, capture time)
+        self._last_index = -1
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Open the source and start reading frames"""
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            raise IOError(f"Cannot open stream source '{self.name}': {self.source}")
+        if self.fps is None:
+            self.fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._read, args=(capture,), name=f"stream-{self.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def take(self) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        Take the latest frame if it has not been taken yet
+
+        Returns:
+            (frame index, frame, capture time) or None
+        """
+        with self._lock:
+            if self._latest is None or self._latest[0] == self._last_index:
+                return None
+            self._last_index = self._latest[0]
+            return self._latest
+
+    @property
+    def exhausted(self) -> bool:
+        """True once the source ended and its last frame was taken"""
+        with self._lock:
+            return self.finished and (self._latest is None or self._latest[0] == self._last_index)
+
+    def stats(self) -> dict:
+        """
+        Per-source statistics
+
+        Returns:
+            Dictionary with read/processed/dropped frames, rate and latency
+        """
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            'source': str(self.source),
+            'target_fps': self.fps,
+            'frames_read': self.frames_read,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_read - self.frames_processed,
+            'processed_fps': self.frames_processed / elapsed if elapsed > 0 else 0.0,
+            'mean_latency': self.latency_sum / self.frames_processed if self.frames_processed else 0.0
+        }
+
+    def _read(self, capture):
+        is_file = isinstance(self.source, str) and Path(self.source).exists()
+        interval = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 30) if (is_file and self.realtime) else 0.0
+        next_read = time.perf_counter()
+        index = 0
+        try:
+            while not self._stop.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    if is_file and self.loop:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+
+                with self._lock:
+                    self._latest = (index, frame, time.perf_counter())
+                self.frames_read += 1
+                index += 1
+
+                if interval:
+                    next_read += interval
+                    delay = next_read - time.perf_counter()
+                    if delay > 0:
+                        self._stop.wait(delay)
+        finally:
+            capture.release()
+            self.finished = True
+
+
+class MultiStreamScheduler:
+    """Batch the latest frames of many sources into single model calls"""
+
+    def __init__(self,
+                 detector,
+                 sources: Union[Dict[str, Union[str, int]], List[Union[str, int]]],
+                 fps: Union[float, Dict[str, float]] = 5,
+                 max_batch: int = 16,
+                 realtime: bool = True,
+                 loop: bool = False,
+                 default_fps: float = None):
+        """
+        Args:
+            detector: HelmetDetector shared by all sources
+            sources: Mapping name -> source, or a list (named by position)
+            fps: Target rate for every source, or per-source mapping
+            default_fps: Rate of sources missing from an fps mapping (None:
+                the rate each source reports)
+            max_batch: Maximum frames per model call
+            realtime: Pace video files at their native FPS
+            loop: Restart video files when they end
+        """
+        if not isinstance(sources, dict):
+            sources = {f"source{i}": source for i, source in enumerate(sources)}
+
+        self.detector = detector
+        self.max_batch = max_batch
+        self.sources = [
+            StreamSource(
+                name,
+                source,
+                fps=fps.get(name, default_fps) if isinstance(fps, dict) else fps,
+                realtime=realtime,
+                loop=loop
+            )
+            for name, source in sources.items()
+        ]
+
+        self.batches = 0
+        self.batched_frames = 0
+        self.inference_time = 0.0
+        self._cursor = 0
+
+    def stream(self, duration: float = None) -> Iterator[Tuple[str, int, np.ndarray, DetectionBatch]]:
+        """
+        Run the scheduler and yield results as they are produced
+
+        Each source contributes at most one frame per period (1 / fps); all
+        sources due at the same time share one batched inference call.
+
+        Args:
+            duration: Stop after this many seconds (default: until all sources end)
+
+        Returns:
+            Iterator of (source name, frame index, frame, DetectionBatch)
+        """
+        start = time.perf_counter()
+        try:
+            # Inside the try, so sources already started are stopped if a later one fails to open
+            for source in self.sources:
+                source.start()
+
+            while True:
+                now = time.perf_counter()
+                if duration is not None and now - start >= duration:
+                    return
+                if all(source.exhausted for source in self.sources):
+                    return
+
+                # Rotate the starting source so max_batch never starves the same ones
+                batch = []
+                order = self.sources[self._cursor:] + self.sources[:self._cursor]
+                self._cursor = (self._cursor + 1) % len(self.sources)
+                for source in order:
+                    if now < source.next_due or len(batch) >= self.max_batch:
+                        continue
+                    item = source.take()
+                    if item is None:
+                        continue
+                    batch.append((source, item))
+                    # Keep the cadence, but never try to catch up on missed periods
+                    source.next_due = max(source.next_due + 1.0 / source.fps, now)
+
+                if not batch:
+                    wake = min(source.next_due for source in self.sources)
+                    time.sleep(min(max(wake - now, 0.001), 0.01))
+                    continue
+
+                infer_start = time.perf_counter()
+                results = self.detector.predict_arrays(
+                    [frame for _, (_, frame, _) in batch],
+                    batch_size=len(batch)
+                )
+                done = time.perf_counter()
+                self.inference_time += done - infer_start
+                self.batches += 1
+                self.batched_frames += len(batch)
+
+                for (source, (index, frame, captured)), result in zip(batch, results):
+                    source.frames_processed += 1
+                    source.latency_sum += done - captured
+                    yield source.name, index, frame, result
+        finally:
+            for source in self.sources:
+                source.stop()
+
+    def run(self,
+            duration: float = None,
+            on_result: Callable[[str, int, np.ndarray, DetectionBatch], None] = None) -> dict:
+        """
+        Run the scheduler until the sources end or the duration elapses
+
+        Args:
+            duration: Stop after this many seconds (default: until all sources end)
+            on_result: Optional callback called with (source name, frame index, frame, result)
+
+        Returns:
+            Dictionary with batching and per-source statistics
+        """
+        for item in self.stream(duration):
+            if on_result is not None:
+                on_result(*item)
+        return self.stats()
+
+    def stats(self) -> dict:
+        """
+        Scheduler statistics
+
+        Returns:
+            Dictionary with batch counts, mean batch size and per-source stats
+        """
+        return {
+            'batches': self.batches,
+            'frames': self.batched_frames,
+            'mean_batch_size': self.batched_frames / self.batches if self.batches else 0.0,
+            'inference_time': self.inference_time,
+            'sources': {source.name: source.stats() for source in self.sources}
+        }
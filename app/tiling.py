@@ -0,0 +1,70 @@
+"""
+Tiled (sliced) inference helpers for high-resolution frames
+"""
+import numpy as np
+
+from .utils.boxes import box_iou
+
+
+def tile_grid(height: int, width: int, tile_size: int = 640, overlap: float = 0.2) -> np.ndarray:
+    """
+    Overlapping tiles covering a frame
+
+    The last tile of every row/column is aligned to the frame edge, so all
+    tiles have the same size whenever the frame is larger than a tile.
+
+    Args:
+        height: Frame height
+        width: Frame width
+        tile_size: Tile side in pixels
+        overlap: Fraction of a tile shared with its neighbour (0-1)
+
+    Returns:
+        (K, 4) int tiles [x_min, y_min, x_max, y_max]
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError(f"Tile overlap must be in [0, 1), got {overlap}")
+
+    def starts(size: int) -> np.ndarray:
+        tile = min(tile_size, size)
+        stride = max(int(tile * (1 - overlap)), 1)
+        positions = list(range(0, size - tile + 1, stride))
+        if positions[-1] + tile < size:
+            positions.append(size - tile)
+        return np.asarray(positions), tile
+
+    xs, tile_w = starts(width)
+    ys, tile_h = starts(height)
+    x0, y0 = np.meshgrid(xs, ys)
+    x0, y0 = x0.ravel(), y0.ravel()
+    return np.stack([x0, y0, x0 + tile_w, y0 + tile_h], axis=1).astype(np.int32)
+
+
+def select_tiles(tiles: np.ndarray,
+                 regions: np.ndarray,
+                 height: int,
+                 width: int,
+                 margin: float = 0.25) -> np.ndarray:
+    """
+    Keep only tiles overlapping regions of interest
+
+    Args:
+        tiles: (K, 4) tiles from tile_grid()
+        regions: (N, 4) boxes found by a coarse full-frame pass
+        height: Frame height
+        width: Frame width
+        margin: Grow every region by this fraction of its size on each side
+
+    Returns:
+        (M, 4) subset of tiles
+    """
+    if len(regions) == 0:
+        return tiles[:0]
+
+    regions = np.asarray(regions, dtype=np.float32).reshape(-1, 4)
+    size = regions[:, 2:] - regions[:, :2]
+    grown = np.concatenate([regions[:, :2] - size * margin, regions[:, 2:] + size * margin], axis=1)
+    grown = grown.clip(0, [width, height, width, height])
+
+    touches = box_iou(tiles, grown) > 0
+    return tiles[touches.any(axis=1)]
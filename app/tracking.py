@@ -0,0 +1,235 @@
+"""
+Detect-every-N-frames scheduling with lightweight box tracking
+"""
+from typing import Callable, Sequence
+
+import numpy as np
+
+from .results import DetectionBatch
+from .utils.boxes import match_boxes
+
+
+class BoxTracker:
+    """Constant-velocity IoU tracker used to propagate boxes between detections"""
+
+    def __init__(self,
+                 class_names: Sequence[str],
+                 match_iou: float = 0.3,
+                 score_decay: float = 0.9,
+                 smoothing: float = 0.5,
+                 decay_after: int = 0):
+        """
+        Args:
+            class_names: Class names indexed by class id
+            match_iou: Minimum IoU to associate a detection with a track
+            score_decay: Factor applied to track scores on every propagated
+                frame after the grace period
+            smoothing: Weight of the newest velocity estimate (0-1)
+            decay_after: Propagated frames that keep the detected score
+        """
+        self.class_names = tuple(class_names)
+        self.match_iou = match_iou
+        self.score_decay = score_decay
+        self.smoothing = smoothing
+        self.decay_after = decay_after
+
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocity = np.empty((0, 4), dtype=np.float32)
+        self.scores = np.empty(0, dtype=np.float32)
+        self.class_ids = np.empty(0, dtype=np.uint8)
+        self.frames_since_update = 0
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def update(self, detections: DetectionBatch):
+        """
+        Replace tracks with fresh detections, carrying velocity over matches
+
+        Args:
+            detections: Full detector output for the current frame
+        """
+        velocity = np.zeros_like(detections.boxes)
+        prev, cur, _ = match_boxes(
+            self.boxes, self.class_ids,
+            detections.boxes, detections.class_ids,
+            self.match_iou
+        )
+        if len(cur):
+            # self.boxes were propagated since the last update, so undo that
+            # to measure the displacement over the whole gap
+            gap = max(self.frames_since_update, 1)
+            origin = self.boxes[prev] - self.velocity[prev] * (gap - 1)
+            observed = (detections.boxes[cur] - origin) / gap
+            velocity[cur] = (self.smoothing * observed
+                             + (1 - self.smoothing) * self.velocity[prev])
+
+        self.boxes = detections.boxes.copy()
+        self.velocity = velocity
+        self.scores = detections.scores.copy()
+        self.class_ids = detections.class_ids.copy()
+        self.frames_since_update = 1
+
+    def predict(self) -> DetectionBatch:
+        """
+        Advance every track by one frame
+
+        Returns:
+            DetectionBatch with propagated boxes and, past the grace period,
+            decayed scores
+        """
+        self.boxes += self.velocity
+        if self.frames_since_update > self.decay_after:
+            self.scores *= self.score_decay
+        self.frames_since_update += 1
+        return DetectionBatch(self.boxes.copy(), self.scores.copy(), self.class_ids, self.class_names)
+
+    def min_score(self) -> float:
+        """Lowest track score, 1.0 when there are no tracks"""
+        return float(self.scores.min()) if len(self.scores) else 1.0
+
+    def max_speed(self) -> float:
+        """Largest per-frame box displacement in pixels"""
+        return float(np.abs(self.velocity).max()) if len(self.velocity) else 0.0
+
+
+class TrackingScheduler:
+    """Run the detector every N frames and propagate boxes in between"""
+
+    def __init__(self,
+                 class_names: Sequence[str],
+                 interval: int = 3,
+                 adaptive: bool = True,
+                 min_track_score: float = 0.25,
+                 max_motion: float = 0.02,
+                 score_decay: float = 0.9,
+                 decay_after: int = 2,
+                 audit_interval: int = 0,
+                 audit_iou: float = 0.5):
+        """
+        Args:
+            class_names: Class names indexed by class id
+            interval: Run the detector at least every `interval` frames
+            adaptive: Detect earlier when a track score drops below
+                min_track_score or boxes move faster than max_motion
+            min_track_score: Track score that triggers a new detection; keep
+                it at or below the detector's conf_threshold, otherwise
+                tracks detected between the two re-trigger every frame
+            max_motion: Per-frame displacement, as a fraction of the frame
+                diagonal, that triggers a new detection
+            score_decay: Factor applied to propagated scores every frame
+                after the grace period
+            decay_after: Propagated frames before scores start to decay, so
+                tracks detected just above min_track_score do not force a
+                detection on the very next frame
+            audit_interval: Every K propagated frames also run the detector
+                and compare, to measure the accuracy cost (0 disables)
+            audit_iou: IoU for a propagated box to count as correct
+        """
+        self.interval = max(int(interval), 1)
+        self.adaptive = adaptive
+        self.min_track_score = min_track_score
+        self.max_motion = max_motion
+        self.audit_interval = audit_interval
+        self.audit_iou = audit_iou
+        self.tracker = BoxTracker(class_names, score_decay=score_decay, decay_after=decay_after)
+
+        self.detected_frames = 0
+        self.propagated_frames = 0
+        self.adaptive_detections = 0
+        self.detector_calls = 0
+        self._since_detect = 0
+        self._audit_tp = 0
+        self._audit_fp = 0
+        self._audit_fn = 0
+        self._audit_iou_sum = 0.0
+        self._audited_frames = 0
+
+    def process(self,
+                frame: np.ndarray,
+                detect: Callable[[np.ndarray], DetectionBatch]) -> DetectionBatch:
+        """
+        Produce detections for one frame
+
+        Args:
+            frame: Decoded frame (BGR format)
+            detect: Function running the full detector on a frame
+
+        Returns:
+            Detected or propagated DetectionBatch
+        """
+        due = self.detected_frames == 0 or self._since_detect >= self.interval
+        if not due and self.adaptive and self._needs_detection(frame):
+            due = True
+            self.adaptive_detections += 1
+
+        if due:
+            self.detector_calls += 1
+            result = detect(frame)
+            self.tracker.update(result)
+            self.detected_frames += 1
+            self._since_detect = 1
+            return result
+
+        result = self.tracker.predict()
+        self.propagated_frames += 1
+        self._since_detect += 1
+
+        if self.audit_interval and self.propagated_frames % self.audit_interval == 0:
+            self.detector_calls += 1
+            self._audit(result, detect(frame))
+
+        return result
+
+    def stats(self) -> dict:
+        """
+        Scheduling statistics
+
+        Returns:
+            Dictionary with detected/propagated frame counts, detector calls
+            per frame (including audit calls) and, when auditing is enabled,
+            agreement with full detection
+        """
+        total = self.detected_frames + self.propagated_frames
+        stats = {
+            'detected_frames': self.detected_frames,
+            'propagated_frames': self.propagated_frames,
+            'adaptive_detections': self.adaptive_detections,
+            'detect_ratio': self.detected_frames / total if total else 0.0,
+            'detector_calls': self.detector_calls,
+            'detector_call_ratio': self.detector_calls / total if total else 0.0
+        }
+
+        if self._audited_frames:
+            matched = self._audit_tp
+            precision = matched / max(matched + self._audit_fp, 1)
+            recall = matched / max(matched + self._audit_fn, 1)
+            f1 = 2 * precision * recall / max(precision + recall, 1e-9)
+            stats.update({
+                'audited_frames': self._audited_frames,
+                'audit_precision': precision,
+                'audit_recall': recall,
+                'audit_f1': f1,
+                'audit_mean_iou': self._audit_iou_sum / max(matched, 1),
+                # Fraction of full-detection agreement lost by propagating
+                'accuracy_delta': 1.0 - f1
+            })
+        return stats
+
+    def _needs_detection(self, frame: np.ndarray) -> bool:
+        if self.tracker.min_score() < self.min_track_score:
+            return True
+        diagonal = float(np.hypot(frame.shape[0], frame.shape[1]))
+        return self.tracker.max_speed() > self.max_motion * diagonal
+
+    def _audit(self, propagated: DetectionBatch, full: DetectionBatch):
+        _, _, ious = match_boxes(
+            propagated.boxes, propagated.class_ids,
+            full.boxes, full.class_ids,
+            self.audit_iou
+        )
+        self._audited_frames += 1
+        self._audit_tp += len(ious)
+        self._audit_fp += len(propagated) - len(ious)
+        self._audit_fn += len(full) - len(ious)
+        self._audit_iou_sum += float(ious.sum())
@@ -0,0 +1,140 @@
+"""
+Vectorized bounding box operations
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of boxes
+
+    Args:
+        boxes1: (N, 4) boxes [x_min, y_min, x_max, y_max]
+        boxes2: (M, 4) boxes [x_min, y_min, x_max, y_max]
+
+    Returns:
+        (N, M) IoU matrix
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+
+    return inter / np.maximum(area1[:, None] + area2[None, :] - inter, 1e-9)
+
+
+def match_boxes(boxes1: np.ndarray,
+                classes1: np.ndarray,
+                boxes2: np.ndarray,
+                classes2: np.ndarray,
+                iou_threshold: float = 0.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Greedy one-to-one matching of same-class boxes by descending IoU
+
+    Args:
+        boxes1: (N, 4) first set of boxes
+        classes1: (N,) class ids of the first set
+        boxes2: (M, 4) second set of boxes
+        classes2: (M,) class ids of the second set
+        iou_threshold: Minimum IoU for a match
+
+    Returns:
+        Matched indices into the first set, into the second set, and their IoUs
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if len(boxes1) == 0 or len(boxes2) == 0:
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    iou = box_iou(boxes1, boxes2)
+    iou[np.asarray(classes1)[:, None] != np.asarray(classes2)[None, :]] = 0
+
+    rows, cols = np.nonzero(iou >= iou_threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    rows, cols = rows[order], cols[order]
+
+    # Only the candidate pairs are walked, typically a handful per box
+    used1 = np.zeros(len(boxes1), dtype=bool)
+    used2 = np.zeros(len(boxes2), dtype=bool)
+    keep = np.zeros(len(rows), dtype=bool)
+    for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if not used1[i] and not used2[j]:
+            used1[i] = used2[j] = True
+            keep[k] = True
+
+    rows, cols = rows[keep], cols[keep]
+    return rows, cols, iou[rows, cols]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy non-maximum suppression
+
+    Each iteration suppresses against all remaining boxes at once, so the
+    Python loop runs once per kept box rather than once per pair.
+
+    Args:
+        boxes: (N, 4) boxes [x_min, y_min, x_max, y_max]
+        scores: (N,) confidence scores
+        iou_threshold: Boxes overlapping a kept box above this IoU are dropped
+
+    Returns:
+        Indices of kept boxes, sorted by descending score
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    if len(order) == 0:
+        return order
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes: np.ndarray,
+                scores: np.ndarray,
+                class_ids: np.ndarray,
+                iou_threshold: float) -> np.ndarray:
+    """
+    Class-aware non-maximum suppression
+
+    Boxes of different classes are shifted apart so one NMS pass never
+    lets them suppress each other.
+
+    Args:
+        boxes: (N, 4) boxes [x_min, y_min, x_max, y_max]
+        scores: (N,) confidence scores
+        class_ids: (N,) class ids
+        iou_threshold: IoU threshold within a class
+
+    Returns:
+        Indices of kept boxes, sorted by descending score
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # The span, not the maximum: unclipped boxes can have negative coordinates
+    offset = float(boxes.max() - boxes.min()) + 1
+    shifted = boxes + np.asarray(class_ids, dtype=np.float32)[:, None] * offset
+    return nms(shifted, scores, iou_threshold)
@@ -0,0 +1,55 @@
+"""
+File discovery utilities
+"""
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, TypeVar, Union
+
+T = TypeVar('T')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+
+def iter_image_paths(directory: Union[str, Path], recursive: bool = False) -> Iterator[Path]:
+    """
+    Lazily yield image files in a directory
+    
+    Entries are read with os.scandir so very large directories are never
+    materialised as a list.
+    
+    Args:
+        directory: Directory to scan
+        recursive: Whether to descend into subdirectories
+    
+    Returns:
+        Iterator over image paths
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                yield Path(entry.path)
+            elif recursive and entry.is_dir():
+                yield from iter_image_paths(entry.path, recursive=True)
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Split an iterable into lists of at most `size` items
+    
+    Args:
+        items: Any iterable, consumed lazily
+        size: Maximum chunk size
+    
+    Returns:
+        Iterator over chunks
+    """
+    if size < 1:
+        raise ValueError(f"Chunk size must be positive, got {size}")
+    
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,94 @@
+"""
+Image preprocessing utilities shared by the inference pipelines
+"""
+from typing import NamedTuple, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class LetterboxMeta(NamedTuple):
+    """Geometry needed to map letterboxed boxes back to the original image"""
+    orig_shape: Tuple[int, int]   # (height, width) of the original image
+    ratio: float                  # scale applied to the original image
+    pad: Tuple[float, float]      # (left, top) padding in pixels
+
+
+def decode_image(data: Union[bytes, bytearray, memoryview, np.ndarray]) -> np.ndarray:
+    """
+    Decode an encoded image (JPEG, PNG, ...) from memory
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        Decoded image (BGR format)
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image from buffer")
+    return image
+
+
+def letterbox(image: np.ndarray,
+              new_shape: Union[int, Tuple[int, int]] = 640,
+              color: Tuple[int, int, int] = (114, 114, 114)) -> Tuple[np.ndarray, LetterboxMeta]:
+    """
+    Resize and pad an image to a fixed shape, keeping its aspect ratio
+
+    Matches the YOLOv8 letterbox so the model sees the same input it
+    would after its own preprocessing.
+
+    Args:
+        image: Input image (BGR format)
+        new_shape: Output size, int for square or (height, width)
+        color: Padding color
+
+    Returns:
+        Letterboxed image and the LetterboxMeta to undo it
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+
+    h, w = image.shape[:2]
+    ratio = min(new_shape[0] / h, new_shape[1] / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    dw = (new_shape[1] - new_w) / 2
+    dh = (new_shape[0] - new_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, LetterboxMeta((h, w), ratio, (left, top))
+
+
+def scale_boxes(boxes: np.ndarray, meta: LetterboxMeta, clip: bool = True) -> np.ndarray:
+    """
+    Map boxes from letterboxed coordinates back to the original image (in place)
+
+    Args:
+        boxes: (N, 4) float boxes [x_min, y_min, x_max, y_max]
+        meta: Geometry returned by letterbox()
+        clip: Clip to the original image (raw candidates are clipped after NMS instead)
+
+    Returns:
+        The same array, rescaled and optionally clipped
+    """
+    if len(boxes) == 0:
+        return boxes
+
+    boxes[:, [0, 2]] -= meta.pad[0]
+    boxes[:, [1, 3]] -= meta.pad[1]
+    boxes /= meta.ratio
+    if not clip:
+        return boxes
+
+    h, w = meta.orig_shape
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+    return boxes
@@ -3,79 +3,158 @@ Utility functions for visualization
 """
 import cv2
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, List, Sequence, Union
+
+from .config_loader import load_config
+from ..profiling import Profiler
 
 
 class Visualizer:
     """Class for drawing bounding boxes and labels on images"""
-    
-    def __init__(self, class_colors: dict = None):
+
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+    FONT_SCALE = 0.6
+    THICKNESS = 2
+    DEFAULT_COLOR = (255, 255, 255)
+
+    def __init__(self,
+                 class_colors: dict = None,
+                 config_path: str = "app/config/config.yaml",
+                 inplace: bool = False,
+                 profiler: Profiler = None):
         """
         Args:
-            class_colors: Dictionary mapping class names to RGB colors
+            class_colors: Dictionary mapping class names to colors, in the
+                channel order of the images drawn on (default: classes.colors
+                from the config file)
+            config_path: Configuration file read when class_colors is None
+            inplace: Draw on the given images instead of copies by default
+            profiler: Optional Profiler recording the 'draw' stage
         """
-        self.class_colors = class_colors or {
-            "with helmet": (0, 255, 128),
-            "without helmet": (255, 51, 51),
-            "rider": (51, 255, 255),
-            "number plate": (224, 102, 255)
-        }
-    
-    def draw_boxes(self, 
-                   image: np.ndarray, 
-                   boxes: List[List[float]], 
-                   labels: List[str],
-                   confidences: List[float] = None) -> np.ndarray:
+        if class_colors is None:
+            try:
+                class_colors = load_config(config_path)['classes'].get('colors', {})
+            except FileNotFoundError:
+                class_colors = {}
+        self.class_colors = {name: tuple(int(c) for c in color) for name, color in class_colors.items()}
+        self.inplace = inplace
+        self.profiler = profiler or Profiler(enabled=False)
+
+        # (label, confidence in hundredths or None, color) -> pre-rendered label patch
+        self._sprites: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def from_config(cls, config: dict, inplace: bool = False, profiler: Profiler = None) -> 'Visualizer':
+        """Create a visualizer using the classes.colors section of a loaded config"""
+        return cls(config['classes'].get('colors', {}), inplace=inplace, profiler=profiler)
+
+    def draw_boxes(self,
+                   image: np.ndarray,
+                   boxes,
+                   labels: List[str] = None,
+                   confidences: Sequence[float] = None,
+                   inplace: bool = None) -> np.ndarray:
         """
         Draw bounding boxes and labels on image
-        
+
         Args:
             image: Input image (BGR format)
-            boxes: List of bounding boxes [x_min, y_min, x_max, y_max]
+            boxes: (N, 4) array or list of boxes [x_min, y_min, x_max, y_max],
+                or a DetectionBatch (labels and confidences are then taken from it)
             labels: List of class labels
-            confidences: Optional list of confidence scores
-        
+            confidences: Optional confidence scores (list or array)
+            inplace: Draw on `image` itself (default: visualizer setting)
+
+        Returns:
+            Image with drawn boxes and labels
+        """
+        if hasattr(boxes, 'class_ids'):
+            return self.draw_detections(image, boxes, inplace=inplace)
+
+        inplace = self.inplace if inplace is None else inplace
+        with self.profiler.stage('draw'):
+            img = image if inplace else image.copy()
+
+            boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4).astype(np.int32).tolist()
+            buckets = None
+            if confidences is not None and len(confidences):
+                buckets = np.rint(np.asarray(confidences, dtype=np.float64) * 100).astype(np.int64).tolist()
+
+            for i, (box, label) in enumerate(zip(boxes, labels)):
+                color = self.class_colors.get(label, self.DEFAULT_COLOR)
+                bucket = buckets[i] if buckets is not None and i < len(buckets) else None
+                self._draw(img, box, color, self._sprite(label, bucket, color))
+
+        return img
+
+    def draw_detections(self, image: np.ndarray, detections, inplace: bool = None) -> np.ndarray:
+        """
+        Draw a DetectionBatch without building per-box Python lists of labels
+
+        Args:
+            image: Input image (BGR format)
+            detections: DetectionBatch
+            inplace: Draw on `image` itself (default: visualizer setting)
+
         Returns:
             Image with drawn boxes and labels
         """
-        img = image.copy()
-        
-        for i, (box, label) in enumerate(zip(boxes, labels)):
-            x_min, y_min, x_max, y_max = [int(coord) for coord in box]
-            
-            # Get color for this class
-            color = self.class_colors.get(label, (255, 255, 255))
-            
-            # Draw bounding box
-            cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, 2)
-            
-            # Prepare label text
-            label_text = label
-            if confidences and i < len(confidences):
-                label_text += f" {confidences[i]:.2f}"
-            
-            # Draw label background
-            (text_width, text_height), _ = cv2.getTextSize(
-                label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
-            )
-            cv2.rectangle(
-                img,
-                (x_min, y_min - text_height - 10),
-                (x_min + text_width, y_min),
-                color,
-                -1
-            )
-            
-            # Draw label text
-            cv2.putText(
-                img,
-                label_text,
-                (x_min, y_min - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (0, 0, 0),
-                2
-            )
-        
+        inplace = self.inplace if inplace is None else inplace
+        with self.profiler.stage('draw'):
+            img = image if inplace else image.copy()
+            if not len(detections):
+                return img
+
+            names = detections.class_names
+            colors = [self.class_colors.get(name, self.DEFAULT_COLOR) for name in names]
+            boxes = detections.boxes.astype(np.int32).tolist()
+            buckets = np.rint(detections.scores.astype(np.float64) * 100).astype(np.int64).tolist()
+
+            for box, class_id, bucket in zip(boxes, detections.class_ids.tolist(), buckets):
+                color = colors[class_id]
+                self._draw(img, box, color, self._sprite(names[class_id], bucket, color))
+
         return img
 
+    def draw_batch(self,
+                   images: Sequence[np.ndarray],
+                   detections: Sequence,
+                   inplace: bool = None) -> List[np.ndarray]:
+        """
+        Annotate many frames, sharing the label sprite cache
+
+        Args:
+            images: Input images (BGR format)
+            detections: One DetectionBatch per image
+            inplace: Draw on the given images themselves (default: visualizer setting)
+
+        Returns:
+            List of annotated images
+        """
+        return [self.draw_detections(image, result, inplace=inplace) for image, result in zip(images, detections)]
+
+    def _sprite(self, label: str, bucket: Union[int, None], color: tuple) -> np.ndarray:
+        # Label background with the text rendered once per (label, confidence bucket)
+        key = (label, bucket, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            text = label if bucket is None else f"{label} {bucket / 100:.2f}"
+            (width, height), _ = cv2.getTextSize(text, self.FONT, self.FONT_SCALE, self.THICKNESS)
+            # Same extent as a filled cv2.rectangle from (0, 0) to (width, height + 10)
+            sprite = np.empty((height + 11, width + 1, 3), dtype=np.uint8)
+            sprite[:] = color
+            cv2.putText(sprite, text, (0, height + 5), self.FONT, self.FONT_SCALE, (0, 0, 0), self.THICKNESS)
+            self._sprites[key] = sprite
+        return sprite
+
+    def _draw(self, img: np.ndarray, box: List[int], color: tuple, sprite: np.ndarray):
+        x_min, y_min, x_max, y_max = box
+        cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, self.THICKNESS)
+
+        # Paste the label above the box, clipped to the image
+        height, width = sprite.shape[:2]
+        top, left = y_min - height + 1, x_min
+        y0, x0 = max(top, 0), max(left, 0)
+        y1, x1 = min(top + height, img.shape[0]), min(left + width, img.shape[1])
+        if y1 > y0 and x1 > x0:
+            img[y0:y1, x0:x1] = sprite[y0 - top:y1 - top, x0 - left:x1 - left]
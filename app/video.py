@@ -0,0 +1,323 @@
+"""
+Pipelined video processing: decode -> inference -> annotate/encode
+"""
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch
+from .utils.visualizer import Visualizer
+from .writers import CvVideoWriter
+
+# Marks the end of the stream in the stage queues
+_END = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    __slots__ = ('frames', 'busy_time', 'wait_time')
+
+    def __init__(self):
+        self.frames = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'frames': self.frames,
+            'busy_time': self.busy_time,
+            'wait_time': self.wait_time,
+            'fps': self.frames / self.busy_time if self.busy_time > 0 else 0.0
+        }
+
+
+class VideoEngine:
+    """Three-stage video pipeline connected by bounded queues"""
+
+    def __init__(self,
+                 detector,
+                 visualizer: Visualizer = None,
+                 queue_size: int = 8,
+                 batch_size: int = 1,
+                 codec: str = 'mp4v',
+                 fps: float = 30,
+                 scheduler=None,
+                 writer_factory: Callable = None):
+        """
+        Args:
+            detector: HelmetDetector used for inference
+            visualizer: Visualizer used to annotate output frames
+            queue_size: Frames buffered between two stages
+            batch_size: Maximum frames per model call
+            codec: FourCC of the output video
+            fps: Output FPS used when the source does not report one
+            scheduler: Optional frame scheduler (e.g. TrackingScheduler)
+                deciding per frame whether to run the detector; it must
+                provide process(frame, detect) and stats()
+            writer_factory: Optional callable (output_path, fps, render) -> writer
+                creating the output writer (default: cv2.VideoWriter with
+                `codec`, see app.writers)
+        """
+        self.detector = detector
+        self.visualizer = visualizer or Visualizer()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.codec = codec
+        self.fps = fps
+        self.scheduler = scheduler
+        self.writer_factory = writer_factory or (
+            lambda path, fps, render: CvVideoWriter(path, fps, render, codec=self.codec)
+        )
+
+    def run(self,
+            source: Union[str, Path, int],
+            output_path: Union[str, Path] = None,
+            show: bool = False,
+            on_frame: Callable[[int, DetectionBatch], None] = None,
+            sink=None,
+            stop_on_interrupt: bool = False) -> dict:
+        """
+        Process a video source
+
+        A decode thread reads frames, the calling thread runs inference and
+        an encode thread draws boxes and writes the output, so decoding and
+        encoding overlap with the model. Each stage is single-threaded and
+        the queues are FIFO, which keeps frames in their original order.
+
+        Args:
+            source: Video file path or camera device ID
+            output_path: Optional path of the annotated output video
+            show: Whether to display annotated frames ('q' stops)
+            on_frame: Optional callback called with (frame index, result)
+            sink: Optional frame exporter (see app.export) receiving
+                (frame index, timestamp, result); timestamps are seconds
+                into the file, or Unix time for camera devices. It is
+                closed when the run ends.
+            stop_on_interrupt: Treat Ctrl+C like 'q': finish the frames
+                already inferred and return the statistics instead of raising
+
+        Returns:
+            Dictionary with video statistics and per-stage throughput
+            ('interrupted' tells whether the run ended on Ctrl+C)
+        """
+        capture = cv2.VideoCapture(source if isinstance(source, int) else str(source))
+        if not capture.isOpened():
+            raise IOError(f"Cannot open video source: {source}")
+
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or self.fps
+        live = isinstance(source, int)
+        decoded = queue.Queue(maxsize=self.queue_size)
+        inferred = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        outputs = {}
+        stages = {'decode': StageStats(), 'inference': StageStats(), 'encode': StageStats()}
+
+        decoder = threading.Thread(
+            target=self._guard,
+            args=(self._decode, errors, stop, capture, decoded, stop, stages['decode']),
+            name='video-decode',
+            daemon=True
+        )
+        encoder = threading.Thread(
+            target=self._guard,
+            args=(self._encode, errors, stop, inferred, output_path, source_fps, show, stop,
+                  stages['encode'], outputs),
+            name='video-encode',
+            daemon=True
+        )
+
+        start = time.perf_counter()
+        decoder.start()
+        encoder.start()
+
+        frame_count = 0
+        total_detections = 0
+        interrupted = False
+        try:
+            for index, frame, result in self._infer(decoded, stop, stages['inference']):
+                frame_count += 1
+                total_detections += len(result)
+                if on_frame is not None:
+                    on_frame(index, result)
+                if sink is not None:
+                    sink.write(index, time.time() if live else index / source_fps, result)
+                self._put(inferred, (index, frame, result), stop)
+        except KeyboardInterrupt:
+            if not stop_on_interrupt:
+                stop.set()
+                raise
+            interrupted = True
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            self._put(inferred, _END, stop)
+            encoder.join()
+            stop.set()
+            decoder.join()
+            capture.release()
+            if sink is not None:
+                sink.close()
+
+        if errors:
+            raise errors[0]
+
+        wall_time = time.perf_counter() - start
+        stats = {
+            'frames': frame_count,
+            'total_detections': total_detections,
+            'avg_detections_per_frame': total_detections / frame_count if frame_count > 0 else 0,
+            'wall_time': wall_time,
+            'fps': frame_count / wall_time if wall_time > 0 else 0.0,
+            'stages': {name: s.to_dict() for name, s in stages.items()},
+            'interrupted': interrupted
+        }
+        if 'writer' in outputs:
+            stats['writer'] = outputs['writer']
+        if sink is not None:
+            stats['export'] = sink.stats()
+        if self.scheduler is not None:
+            stats.update(self.scheduler.stats())
+        return stats
+
+    def infer_frames(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        """
+        Run the detector on a batch of frames
+
+        Args:
+            frames: Decoded frames (BGR format)
+
+        Returns:
+            List of DetectionBatch, one per frame
+        """
+        if self.scheduler is not None:
+            return [self.scheduler.process(frame, self.detector.predict_array) for frame in frames]
+        return self.detector.predict_arrays(frames, batch_size=len(frames))
+
+    def _infer(self, decoded: queue.Queue, stop: threading.Event, stats: StageStats):
+        finished = False
+        while not finished and not stop.is_set():
+            start = time.perf_counter()
+            item = decoded.get()
+            stats.wait_time += time.perf_counter() - start
+            if item is _END:
+                break
+
+            # Opportunistically batch frames that are already decoded
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = decoded.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            results = self.infer_frames([frame for _, frame in batch])
+            stats.busy_time += time.perf_counter() - start
+            stats.frames += len(batch)
+
+            for (index, frame), result in zip(batch, results):
+                yield index, frame, result
+
+    def _decode(self, capture, decoded: queue.Queue, stop: threading.Event, stats: StageStats):
+        index = 0
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                ok, frame = capture.read()
+                stats.busy_time += time.perf_counter() - start
+                if not ok:
+                    break
+                stats.frames += 1
+
+                start = time.perf_counter()
+                self._put(decoded, (index, frame), stop)
+                stats.wait_time += time.perf_counter() - start
+                index += 1
+        finally:
+            self._put(decoded, _END, stop)
+
+    def _encode(self,
+                inferred: queue.Queue,
+                output_path: Optional[Union[str, Path]],
+                fps: float,
+                show: bool,
+                stop: threading.Event,
+                stats: StageStats,
+                outputs: dict):
+        writer = None
+        try:
+            while True:
+                start = time.perf_counter()
+                item = inferred.get()
+                stats.wait_time += time.perf_counter() - start
+                if item is _END:
+                    break
+                if output_path is None and not show:
+                    continue
+
+                start = time.perf_counter()
+                index, frame, result = item
+                annotated = None
+                if output_path is not None:
+                    if writer is None:
+                        writer = self.writer_factory(output_path, fps, self._render)
+                    # None when the writer buffers or drops the frame
+                    annotated = writer.write(index, frame, result)
+
+                if show:
+                    if annotated is None:
+                        # The writer may still hold this frame, draw on a copy
+                        annotated = self.visualizer.draw_detections(frame, result)
+                    cv2.imshow('Helmet Detection', annotated)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        stop.set()
+
+                stats.busy_time += time.perf_counter() - start
+                stats.frames += 1
+        finally:
+            if writer is not None:
+                writer.close()
+                outputs['writer'] = writer.stats()
+            if show:
+                cv2.destroyAllWindows()
+
+    def _render(self, frame: np.ndarray, result: DetectionBatch) -> np.ndarray:
+        # Decoded frames are not used after the encode stage, draw on them directly
+        return self.visualizer.draw_detections(frame, result, inplace=True)
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stop: threading.Event):
+        # End markers must always get through, even after a stop request
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set() and item is not _END:
+                    return
+                if stop.is_set():
+                    # Make room for the end marker
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    @staticmethod
+    def _guard(target, errors: list, stop: threading.Event, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
@@ -0,0 +1,256 @@
+"""
+Annotated video output: OpenCV or piped ffmpeg encoding, optional violation-only segments
+"""
+import shutil
+import subprocess
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Callable, List, Sequence, Union
+
+import cv2
+import numpy as np
+
+from .results import DetectionBatch
+
+# render(frame, result) -> annotated frame
+Renderer = Callable[[np.ndarray, DetectionBatch], np.ndarray]
+
+
+class CvVideoWriter:
+    """Write annotated frames with cv2.VideoWriter"""
+
+    def __init__(self, output_path: Union[str, Path], fps: float, render: Renderer, codec: str = 'mp4v'):
+        """
+        Args:
+            output_path: Output video file
+            fps: Output frame rate
+            render: Draws a result on its frame
+            codec: FourCC code
+        """
+        self.output_path = Path(output_path)
+        self.fps = fps
+        self.render = render
+        self.codec = codec
+        self.frames_written = 0
+        self._writer = None
+
+    def write(self, index: int, frame: np.ndarray, result: DetectionBatch) -> np.ndarray:
+        """
+        Annotate and write one frame
+
+        Returns:
+            The annotated frame
+        """
+        annotated = self.render(frame, result)
+        self._write(annotated)
+        return annotated
+
+    def close(self):
+        """Finish the output file"""
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def stats(self) -> dict:
+        return {'encoder': 'opencv', 'codec': self.codec, 'frames_written': self.frames_written}
+
+    def _write(self, frame: np.ndarray):
+        if self._writer is None:
+            self._writer = self._open(frame.shape)
+        self._writer.write(frame)
+        self.frames_written += 1
+
+    def _open(self, shape: tuple):
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        writer = cv2.VideoWriter(
+            str(self.output_path),
+            cv2.VideoWriter_fourcc(*self.codec),
+            self.fps,
+            (shape[1], shape[0])
+        )
+        if not writer.isOpened():
+            raise IOError(f"Cannot open video writer: {self.output_path}")
+        return writer
+
+
+class FfmpegWriter(CvVideoWriter):
+    """Pipe raw BGR frames to a local ffmpeg process"""
+
+    def __init__(self,
+                 output_path: Union[str, Path],
+                 fps: float,
+                 render: Renderer,
+                 codec: str = 'libx264',
+                 preset: str = 'veryfast',
+                 crf: int = 23,
+                 binary: str = 'ffmpeg'):
+        """
+        Args:
+            output_path: Output video file
+            fps: Output frame rate
+            render: Draws a result on its frame
+            codec: ffmpeg video encoder (libx264, libx265, ...)
+            preset: Encoder speed/size trade-off (ultrafast ... veryslow)
+            crf: Constant rate factor, lower is higher quality
+            binary: ffmpeg executable name or path
+        """
+        super().__init__(output_path, fps, render, codec)
+        self.preset = preset
+        self.crf = crf
+        self.binary = shutil.which(binary)
+        if self.binary is None:
+            raise IOError(f"ffmpeg executable not found: {binary}")
+        self._stderr = None
+
+    def close(self):
+        """Flush the pipe and wait for ffmpeg to finish the file"""
+        process, self._writer = self._writer, None
+        if process is None:
+            return
+        process.stdin.close()
+        returncode = process.wait()
+        stderr, self._stderr = self._stderr, None
+        with stderr:
+            if returncode != 0:
+                stderr.seek(0)
+                error = stderr.read().decode(errors='replace').strip().splitlines()[-5:]
+                raise IOError(f"ffmpeg failed writing {self.output_path}: " + " | ".join(error))
+
+    def stats(self) -> dict:
+        return {
+            'encoder': 'ffmpeg',
+            'codec': self.codec,
+            'preset': self.preset,
+            'crf': self.crf,
+            'frames_written': self.frames_written
+        }
+
+    def _write(self, frame: np.ndarray):
+        if self._writer is None:
+            self._writer = self._open(frame.shape)
+        try:
+            self._writer.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.close()
+            raise
+        self.frames_written += 1
+
+    def _open(self, shape: tuple):
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        command = [
+            self.binary, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{shape[1]}x{shape[0]}", '-r', str(self.fps),
+            '-i', '-',
+            '-an', '-c:v', self.codec, '-preset', self.preset, '-crf', str(self.crf),
+            # yuv420p needs even dimensions, pad odd ones by a pixel
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-pix_fmt', 'yuv420p',
+            str(self.output_path)
+        ]
+        # A file rather than a pipe: an unread pipe would fill up and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        return subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self._stderr)
+
+
+class ViolationSegmentWriter:
+    """Only write the parts of a video around frames with violations"""
+
+    def __init__(self,
+                 writer: CvVideoWriter,
+                 violation_classes: Sequence[str] = ('without helmet',),
+                 pre_roll: int = 30,
+                 post_roll: int = 60):
+        """
+        Args:
+            writer: Underlying writer receiving the kept frames
+            violation_classes: Class names that start or extend a segment
+            pre_roll: Frames kept before the first violation of a segment
+            post_roll: Frames kept after the last violation of a segment
+        """
+        self.writer = writer
+        self.violation_classes = tuple(violation_classes)
+        self.post_roll = post_roll
+        self.segments: List[List[int]] = []   # [first frame, last frame] per segment
+
+        # Frames are only rendered once they are known to be written
+        self._pending = deque(maxlen=pre_roll) if pre_roll > 0 else None
+        self._remaining = 0
+        self._violation_ids = None
+
+    def write(self, index: int, frame: np.ndarray, result: DetectionBatch):
+        """
+        Buffer or write one frame
+
+        Returns:
+            The annotated frame if it was written now, otherwise None
+        """
+        if self._is_violation(result):
+            if self._remaining == 0:
+                start = self._pending[0][0] if self._pending else index
+                self.segments.append([start, index])
+            while self._pending:
+                self.writer.write(*self._pending.popleft())
+            self._remaining = self.post_roll + 1
+
+        if self._remaining > 0:
+            self._remaining -= 1
+            self.segments[-1][1] = index
+            return self.writer.write(index, frame, result)
+
+        if self._pending is not None:
+            self._pending.append((index, frame, result))
+        return None
+
+    def close(self):
+        self.writer.close()
+
+    def stats(self) -> dict:
+        stats = self.writer.stats()
+        stats['segments'] = [tuple(segment) for segment in self.segments]
+        return stats
+
+    def _is_violation(self, result: DetectionBatch) -> bool:
+        if self._violation_ids is None:
+            ids = [i for i, name in enumerate(result.class_names) if name in self.violation_classes]
+            self._violation_ids = np.asarray(ids, dtype=np.uint8)
+        return bool(len(result)) and bool(np.isin(result.class_ids, self._violation_ids).any())
+
+
+def make_writer(output_path: Union[str, Path], fps: float, render: Renderer, video_cfg: dict = None):
+    """
+    Create the output writer described by the 'video' config section
+
+    Args:
+        output_path: Output video file
+        fps: Output frame rate
+        render: Draws a result on its frame
+        video_cfg: 'video' config section (writer, codec, ffmpeg, violations_only)
+
+    Returns:
+        Writer with write(index, frame, result), close() and stats()
+    """
+    video_cfg = video_cfg or {}
+    if video_cfg.get('writer', 'opencv') == 'ffmpeg':
+        ffmpeg_cfg = video_cfg.get('ffmpeg', {})
+        writer = FfmpegWriter(
+            output_path,
+            fps,
+            render,
+            codec=ffmpeg_cfg.get('codec', 'libx264'),
+            preset=ffmpeg_cfg.get('preset', 'veryfast'),
+            crf=ffmpeg_cfg.get('crf', 23),
+            binary=ffmpeg_cfg.get('binary', 'ffmpeg')
+        )
+    else:
+        writer = CvVideoWriter(output_path, fps, render, codec=video_cfg.get('codec', 'mp4v'))
+
+    segments_cfg = video_cfg.get('violations_only', {})
+    if segments_cfg.get('enabled', False):
+        writer = ViolationSegmentWriter(
+            writer,
+            violation_classes=segments_cfg.get('classes', ['without helmet']),
+            pre_roll=int(segments_cfg.get('pre_roll', 1.0) * fps),
+            post_roll=int(segments_cfg.get('post_roll', 2.0) * fps)
+        )
+    return writer
@@ -0,0 +1,53 @@
+"""
+Cold start measurement, run in a fresh interpreter by the suite
+
+    python -m benchmarks.cold_start --model app/models/best.pt --image data/val/images/x.jpg [--warmup]
+"""
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import, model load and first prediction time')
+    parser.add_argument('--model', type=str, default=None)
+    parser.add_argument('--config', type=str, default='app/config/config.yaml')
+    parser.add_argument('--image', type=str, required=True)
+    parser.add_argument('--warmup', action='store_true', help='Run HelmetDetector.warmup() before the first prediction')
+    args = parser.parse_args()
+
+    from app.detector import HelmetDetector
+    imported = time.perf_counter()
+
+    detector = HelmetDetector(model_path=args.model, config_path=args.config)
+    detector.cache = None
+    detector.load_model()
+    loaded = time.perf_counter()
+
+    if args.warmup:
+        detector.warmup()
+    warmed = time.perf_counter()
+
+    detector.predict_image(args.image)
+    predicted = time.perf_counter()
+
+    # Second call as the steady-state reference for the first one
+    detector.predict_image(args.image)
+    second = time.perf_counter()
+
+    print(json.dumps({
+        'import_s': imported - _start,
+        'load_s': loaded - imported,
+        'model_import_s': detector.startup_stats['import_s'],
+        'warmup_s': warmed - loaded,
+        'first_predict_s': predicted - warmed,
+        'second_predict_s': second - predicted,
+        'total_s': predicted - _start
+    }))
+
+
+if __name__ == '__main__':
+    main()
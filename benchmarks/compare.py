@@ -0,0 +1,82 @@
+"""
+Compare benchmark results against a saved baseline
+"""
+from typing import Dict, List
+
+# Report fields that must be equal for two runs to be comparable, with the
+# value assumed for reports written before the field existed
+SETUP_FIELDS = {'model': None, 'backend': None, 'images': None, 'source': 'files'}
+
+
+def _metrics(report: dict) -> Dict[str, tuple]:
+    # Flatten a report into name -> (value, higher_is_better)
+    results = report.get('results', {})
+    metrics = {}
+    for section in ('cold_start', 'cold_start_warmup'):
+        for name, value in results.get(section, {}).items():
+            metrics[f"{section}.{name}"] = (value, False)
+    for name in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'):
+        if name in results.get('latency', {}):
+            metrics[f"latency.{name}"] = (results['latency'][name], False)
+    for batch_size, values in results.get('batch_throughput', {}).items():
+        metrics[f"batch_throughput.{batch_size}.images_per_sec"] = (values['images_per_sec'], True)
+    if 'video' in results:
+        metrics['video.fps'] = (results['video']['fps'], True)
+    return metrics
+
+
+def setup_differences(current: dict, baseline: dict) -> Dict[str, tuple]:
+    """
+    Setup fields (model, backend, image count, image source) that differ
+
+    Returns:
+        Mapping field -> (baseline value, current value), empty when comparable
+    """
+    differences = {}
+    for field, default in SETUP_FIELDS.items():
+        before, after = baseline.get(field, default), current.get(field, default)
+        if before != after:
+            differences[field] = (before, after)
+    return differences
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float = 0.1) -> List[dict]:
+    """
+    Compare every metric present in both reports
+
+    Args:
+        current: Report from run_suite()
+        baseline: Previously saved report
+        tolerance: Relative change in the bad direction that counts as a regression
+
+    Returns:
+        One entry per metric with baseline, current, relative change and regression flag
+
+    Raises:
+        ValueError: The reports were measured with a different model, backend,
+            number of images or image source
+    """
+    differences = setup_differences(current, baseline)
+    if differences:
+        raise ValueError("Reports are not comparable: " + ", ".join(
+            f"{field} {before!r} vs {after!r}" for field, (before, after) in differences.items()
+        ))
+
+    current_metrics = _metrics(current)
+    baseline_metrics = _metrics(baseline)
+
+    rows = []
+    for name, (value, higher_is_better) in current_metrics.items():
+        if name not in baseline_metrics:
+            continue
+        reference = baseline_metrics[name][0]
+        change = (value - reference) / reference if reference else 0.0
+        worse = -change if higher_is_better else change
+        rows.append({
+            'metric': name,
+            'baseline': reference,
+            'current': value,
+            'change': change,
+            'regression': worse > tolerance
+        })
+    return rows
@@ -0,0 +1,252 @@
+"""
+Latency, throughput and video FPS measurements for HelmetDetector
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import cv2
+import numpy as np
+
+from app.utils.files import iter_image_paths
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentiles(samples: Sequence[float]) -> dict:
+    """
+    Summary of latency samples
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Dictionary with mean/p50/p95/p99/min/max in milliseconds
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    if not len(values):
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max()),
+        'samples': len(values)
+    }
+
+
+def synthetic_video(image_paths: Sequence[Path],
+                    output_path: Union[str, Path],
+                    frames: int = 300,
+                    size: tuple = (1280, 720),
+                    fps: float = 30) -> Path:
+    """
+    Assemble a video from still images, each held for several frames
+
+    Args:
+        image_paths: Source images, used in a loop
+        output_path: Output video file
+        frames: Total frame count
+        size: Frame (width, height); images are letterboxed into it
+        fps: Frame rate
+
+    Returns:
+        Path of the video
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    if not writer.isOpened():
+        raise IOError(f"Cannot open video writer: {output_path}")
+
+    width, height = size
+    hold = max(1, frames // max(len(image_paths), 1))
+    canvases = []
+    for path in image_paths[:max(1, frames // hold)]:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        ratio = min(width / image.shape[1], height / image.shape[0])
+        resized = cv2.resize(image, (int(image.shape[1] * ratio), int(image.shape[0] * ratio)))
+        canvas = np.full((height, width, 3), 114, dtype=np.uint8)
+        top, left = (height - resized.shape[0]) // 2, (width - resized.shape[1]) // 2
+        canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+        canvases.append(canvas)
+    if not canvases:
+        raise ValueError("No readable images for the synthetic video")
+
+    for index in range(frames):
+        writer.write(canvases[(index // hold) % len(canvases)])
+    writer.release()
+    return output_path
+
+
+def measure_cold_start(model_path: str, config_path: str, image_path: Path, warmup: bool = False) -> dict:
+    """
+    Import, load and first-prediction time in a fresh interpreter
+
+    Args:
+        model_path: Weights to load
+        config_path: Configuration file
+        image_path: Image of the first predictions
+        warmup: Run HelmetDetector.warmup() before the first prediction
+
+    Returns:
+        Dictionary with import_s (app.detector), load_s (model, including the
+        torch/ultralytics import given separately as model_import_s),
+        warmup_s, first_predict_s, second_predict_s and total_s
+    """
+    command = [sys.executable, '-m', 'benchmarks.cold_start', '--config', str(config_path),
+               '--image', str(image_path)]
+    if model_path:
+        command += ['--model', str(model_path)]
+    if warmup:
+        command.append('--warmup')
+    output = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    # Only the last line is ours, ultralytics may print before it
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _is_array(images) -> bool:
+    return isinstance(images, np.ndarray) or (len(images) > 0 and isinstance(images[0], np.ndarray))
+
+
+def measure_latency(detector, images: Sequence, warmup: int = 3, repeats: int = 1) -> dict:
+    """
+    Per-image latency of predict_image, or predict_array for pre-decoded images
+
+    Args:
+        images: Image paths, or decoded images (e.g. a DatasetPack memory map)
+
+    Returns:
+        Latency percentiles over every image and repeat
+    """
+    predict = detector.predict_array if _is_array(images) else detector.predict_image
+    for image in images[:warmup]:
+        predict(image)
+
+    samples = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            predict(image)
+            samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def measure_batch_throughput(detector, images: Sequence, batch_sizes: Sequence[int]) -> dict:
+    """
+    Images per second of predict_batch (or predict_arrays for pre-decoded images) for several batch sizes
+
+    Args:
+        images: Image paths, or decoded images (e.g. a DatasetPack memory map)
+
+    Returns:
+        Dictionary keyed by batch size with images/sec and total time
+    """
+    if _is_array(images):
+        # Views into the array, nothing is copied before the model
+        predict, images = detector.predict_arrays, [image for image in images]
+    else:
+        predict = detector.predict_batch
+
+    results = {}
+    for batch_size in batch_sizes:
+        predict(images[:batch_size], batch_size=batch_size)   # warm-up
+        start = time.perf_counter()
+        predict(images, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = {
+            'images_per_sec': len(images) / elapsed,
+            'total_s': elapsed
+        }
+    return results
+
+
+def measure_video(detector, video_path: Path) -> dict:
+    """
+    End-to-end predict_video throughput without writing output
+
+    Returns:
+        Dictionary with frames, fps, wall time and per-stage fps
+    """
+    stats = detector.predict_video(video_path)
+    return {
+        'frames': stats['frames'],
+        'fps': stats['fps'],
+        'wall_time_s': stats['wall_time'],
+        'stages': {name: stage['fps'] for name, stage in stats['stages'].items()}
+    }
+
+
+def run_suite(detector,
+              image_dir: Union[str, Path] = 'data/val/images',
+              batch_sizes: Sequence[int] = (1, 4, 8, 16),
+              repeats: int = 1,
+              video_frames: int = 300,
+              workdir: Union[str, Path] = 'results/benchmarks',
+              cold_start: bool = True,
+              pack=None) -> dict:
+    """
+    Run every benchmark and collect the results
+
+    The prediction cache is disabled so repeated images are really inferred.
+    When the detector profiler is enabled its stage summary is added to the report.
+
+    Args:
+        detector: HelmetDetector under test
+        image_dir: Directory with benchmark images
+        batch_sizes: Batch sizes for the throughput benchmark
+        repeats: Passes over the images for the latency benchmark
+        video_frames: Length of the synthetic video (0 skips the video benchmark)
+        workdir: Where the synthetic video is written
+        cold_start: Also measure cold start in a fresh interpreter, without
+            and with warmup()
+        pack: Optional DatasetPack of the images; latency and throughput
+            then read pre-letterboxed images from its memory map, so image
+            decoding is not part of the measurement
+
+    Returns:
+        JSON-serialisable result dictionary
+    """
+    image_paths: List[Path] = list(pack.image_paths) if pack is not None else sorted(iter_image_paths(image_dir))
+    if not image_paths:
+        raise ValueError(f"No images found in {image_dir}")
+    detector.cache = None
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'system': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'model': detector.model_path,
+        'backend': detector.backend,
+        'images': len(image_paths),
+        'source': 'pack' if pack is not None else 'files',
+        'results': {}
+    }
+    results = report['results']
+
+    if cold_start:
+        results['cold_start'] = measure_cold_start(detector.model_path, detector.config_path, image_paths[0])
+        results['cold_start_warmup'] = measure_cold_start(detector.model_path, detector.config_path,
+                                                          image_paths[0], warmup=True)
+    images = pack.images if pack is not None else image_paths
+    results['latency'] = measure_latency(detector, images, repeats=repeats)
+    results['batch_throughput'] = measure_batch_throughput(detector, images, batch_sizes)
+    if video_frames > 0:
+        video_path = synthetic_video(image_paths, Path(workdir) / 'synthetic.mp4', frames=video_frames)
+        results['video'] = measure_video(detector, video_path)
+    if detector.profiler.enabled:
+        report['stages'] = detector.profiler.to_dict()
+    return report
@@ -21,8 +21,8 @@ def main():
                 image_path=image_file,
                 save_path=Path("output/images") / f"{image_file.stem}_result{image_file.suffix}"
             )
-            print(f"Phát hiện {result['count']} đối tượng:")
-            for box, label, conf in zip(result['boxes'], result['labels'], result['confidences']):
+            print(f"Phát hiện {result.count} đối tượng:")
+            for box, label, conf in zip(result.boxes, result.labels, result.scores):
                 print(f"  - {label}: {conf:.2f}")
         else:
             print("Không tìm thấy ảnh trong input/images/")
@@ -0,0 +1,115 @@
+"""
+Script to benchmark detection latency and throughput, optionally against a baseline
+"""
+import argparse
+import atexit
+import json
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.datapack import open_pack
+from app.detector import HelmetDetector
+from benchmarks.compare import compare_reports
+from benchmarks.suite import run_suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark predict_image, predict_batch and predict_video')
+    parser.add_argument('--model', type=str, default=None, help='Model path (default: from config)')
+    parser.add_argument('--config', type=str, default='app/config/config.yaml', help='Config file')
+    parser.add_argument('--data', type=str, default='data/val/images', help='Benchmark images')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16],
+                        help='Batch sizes for the throughput benchmark')
+    parser.add_argument('--repeats', type=int, default=1, help='Passes over the images for latency')
+    parser.add_argument('--video-frames', type=int, default=300,
+                        help='Frames of the synthetic video (0 skips the video benchmark)')
+    parser.add_argument('--no-cold-start', action='store_true', help='Skip the fresh-interpreter cold start')
+    parser.add_argument('--output', type=str, default='results/benchmarks/latest.json', help='JSON report path')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Saved report to compare against; exits with status 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Relative slowdown counted as a regression (default: 0.1 = 10%%)')
+    parser.add_argument('--pack', action='store_true',
+                        help='Benchmark on pre-letterboxed images from the dataset pack (built if missing)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-stage timings into the report and print them at exit')
+    
+    args = parser.parse_args()
+    
+    detector = HelmetDetector(model_path=args.model, config_path=args.config)
+    if args.profile:
+        # Print the stage breakdown however the script exits
+        detector.profiler.enabled = True
+        atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
+    output_path = Path(args.output)
+    
+    pack = None
+    if args.pack:
+        # The pack covers a whole split: accept either data/val or data/val/images
+        data_path = Path(args.data)
+        split_dir = data_path.parent if data_path.name == 'images' else data_path
+        pack = open_pack(split_dir, detector.imgsz, detector.config.get('datapack', {}).get('dir', 'data/.packs'))
+    
+    print(f"Benchmarking {detector.model_path} ({detector.backend}) on {pack.path if pack else args.data}")
+    report = run_suite(
+        detector,
+        image_dir=args.data,
+        batch_sizes=args.batch_sizes,
+        repeats=args.repeats,
+        video_frames=args.video_frames,
+        workdir=output_path.parent,
+        cold_start=not args.no_cold_start,
+        pack=pack
+    )
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    results = report['results']
+    print("\nResults:")
+    if 'cold_start' in results:
+        cold, warm = results['cold_start'], results['cold_start_warmup']
+        print(f"  Cold start: {cold['total_s']:.2f}s "
+              f"(import {cold['import_s']:.2f}s, "
+              f"load {cold['load_s']:.2f}s, "
+              f"first predict {cold['first_predict_s']:.2f}s, "
+              f"second {cold['second_predict_s']:.2f}s)")
+        print(f"  With warmup: {warm['warmup_s']:.2f}s warm-up, "
+              f"first predict {warm['first_predict_s']:.2f}s")
+    latency = results['latency']
+    print(f"  Latency: p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+          f"p99 {latency['p99_ms']:.1f} ms")
+    for batch_size, values in results['batch_throughput'].items():
+        print(f"  Batch {batch_size}: {values['images_per_sec']:.1f} images/s")
+    if 'video' in results:
+        print(f"  Video: {results['video']['fps']:.1f} fps over {results['video']['frames']} frames")
+    print(f"Report saved to: {output_path}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        try:
+            rows = compare_reports(report, baseline, tolerance=args.tolerance)
+        except ValueError as e:
+            print(f"\nError: {e} (baseline {args.baseline})")
+            sys.exit(2)
+        
+        print(f"\nComparison with {args.baseline}:")
+        for row in rows:
+            flag = "REGRESSION" if row['regression'] else "ok"
+            print(f"  {row['metric']:<40} {row['baseline']:>10.3f} -> {row['current']:>10.3f} "
+                  f"({row['change']:+.1%}) {flag}")
+        
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Script to run (or stop) the local detector daemon used by the CLI client mode
+"""
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.client import DaemonClient, default_socket_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep a warm detector loaded for detect_image/detect_video/run_detection')
+    parser.add_argument('--model', type=str, default=None, help='Path to model weights (default: from config)')
+    parser.add_argument('--config', type=str, default='app/config/config.yaml', help='Config file')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Unix socket path (default: $HELMET_DAEMON_SOCKET or a per-user temp file)')
+    parser.add_argument('--status', action='store_true', help='Report whether a daemon is running and exit')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon and exit')
+    
+    args = parser.parse_args()
+    socket_path = args.socket or default_socket_path()
+    
+    if args.status or args.stop:
+        client = DaemonClient.connect(socket_path)
+        if client is None:
+            print(f"No daemon running on {socket_path}")
+            sys.exit(1)
+        if args.stop:
+            client.request('shutdown')
+            print(f"Daemon {client.info['pid']} stopping")
+        else:
+            info = client.info
+            print(f"Daemon {info['pid']} on {socket_path}: {info['model']} ({info['backend']}), "
+                  f"up {info['uptime']:.0f}s, {info['requests']} requests, {info['errors']} errors")
+        return
+    
+    from app.daemon import DetectorDaemon
+    from app.detector import HelmetDetector
+    
+    print("Loading model...")
+    detector = HelmetDetector(model_path=args.model, config_path=args.config)
+    # Dummy batches so the first real request does not pay for initialisation
+    warmup = detector.warmup()
+    print(f"Model ready in {detector.startup_stats['import_s'] + detector.startup_stats['load_s']:.2f}s, "
+          f"warmed up in {warmup['total_s']:.2f}s")
+    
+    daemon = DetectorDaemon(detector, socket_path)
+    print(f"Daemon listening on {socket_path}")
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    print("Daemon stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,15 @@
 Script to detect helmets on single image or batch of images
 """
 import argparse
+import atexit
 from pathlib import Path
 import sys
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.detector import HelmetDetector
+from app.client import DaemonClient
+from app.utils.files import iter_image_paths
 
 
 def main():
@@ -37,19 +39,54 @@ def main():
         default=None,
         help='Confidence threshold (default: from config)'
     )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=None,
+        help='Images per inference batch for directories (default: from config)'
+    )
+    parser.add_argument(
+        '--prefetch',
+        type=int,
+        default=None,
+        help='Decode threads running ahead of the model (default: from config)'
+    )
     parser.add_argument(
         '--show',
         action='store_true',
         help='Display results'
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown at exit'
+    )
+    parser.add_argument(
+        '--socket',
+        type=str,
+        default=None,
+        help='Detector daemon socket (default: $HELMET_DAEMON_SOCKET or a per-user temp file)'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Always load the model in this process instead of using a running daemon'
+    )
     
     args = parser.parse_args()
     
-    # Initialize detector
-    detector = HelmetDetector(model_path=args.model)
-    
-    if args.conf:
-        detector.conf_threshold = args.conf
+    def load_detector():
+        # Heavy imports (torch, ultralytics) only happen on the in-process path
+        from app.detector import HelmetDetector
+        
+        detector = HelmetDetector(model_path=args.model)
+        if args.profile:
+            # Print the stage breakdown however the script exits
+            detector.profiler.enabled = True
+            atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
+        if args.conf:
+            detector.conf_threshold = args.conf
+        return detector
     
     # Set output directory
     if args.output:
@@ -60,37 +97,63 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
     
     source_path = Path(args.source)
+    if not source_path.is_file() and not source_path.is_dir():
+        print(f"Error: {args.source} is not a valid file or directory")
+        sys.exit(1)
+    
+    # Forward to a warm daemon when one is running; display and profiling stay in-process
+    client = None
+    if not (args.no_daemon or args.show or args.profile):
+        client = DaemonClient.connect(args.socket, model=args.model)
     
     # Process single image or directory
     if source_path.is_file():
         print(f"Processing image: {source_path}")
-        result = detector.predict_image(
-            image_path=source_path,
-            save_path=output_dir / f"{source_path.stem}_result{source_path.suffix}",
-            show=args.show
-        )
-        print(f"Detected {result['count']} objects")
-        for box, label, conf in zip(result['boxes'], result['labels'], result['confidences']):
+        save_path = output_dir / f"{source_path.stem}_result{source_path.suffix}"
+        response = None
+        if client is not None:
+            response = client.try_request('image', source=str(source_path.resolve()),
+                                          save_path=str(save_path.resolve()), conf=args.conf)
+        if response is not None:
+            detections = [(d['label'], d['confidence']) for d in response['detections']]
+        else:
+            result = load_detector().predict_image(
+                image_path=source_path,
+                save_path=save_path,
+                show=args.show
+            )
+            detections = list(zip(result.labels, result.scores.tolist()))
+        print(f"Detected {len(detections)} objects")
+        for label, conf in detections:
             print(f"  - {label}: {conf:.2f}")
     
-    elif source_path.is_dir():
+    else:
         print(f"Processing directory: {source_path}")
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        image_paths = [
-            p for p in source_path.iterdir()
-            if p.suffix.lower() in image_extensions
-        ]
         
-        print(f"Found {len(image_paths)} images")
-        results = detector.predict_batch(image_paths, save_dir=output_dir)
+        response = None
+        if client is not None:
+            response = client.try_request('directory', source=str(source_path.resolve()),
+                                          save_dir=str(output_dir.resolve()), batch_size=args.batch_size,
+                                          prefetch=args.prefetch, conf=args.conf)
+        if response is not None:
+            image_count, total_detections = response['images'], response['total_detections']
+        else:
+            # Stream paths and results so memory stays flat on huge directories
+            image_count = 0
+            total_detections = 0
+            for image_path, result in load_detector().predict_batch_stream(
+                iter_image_paths(source_path),
+                save_dir=output_dir,
+                batch_size=args.batch_size,
+                prefetch_workers=args.prefetch
+            ):
+                image_count += 1
+                total_detections += result.count
         
-        total_detections = sum(r['count'] for r in results)
+        print(f"Processed {image_count} images")
         print(f"\nTotal detections: {total_detections}")
-        print(f"Average detections per image: {total_detections / len(image_paths):.2f}")
-    
-    else:
-        print(f"Error: {args.source} is not a valid file or directory")
-        sys.exit(1)
+        if image_count:
+            print(f"Average detections per image: {total_detections / image_count:.2f}")
 
 
 if __name__ == '__main__':
@@ -2,13 +2,14 @@
 Script to detect helmets in video
 """
 import argparse
+import atexit
 from pathlib import Path
 import sys
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.detector import HelmetDetector
+from app.client import DaemonClient
 
 
 def main():
@@ -37,20 +38,60 @@ def main():
         default=None,
         help='Confidence threshold (default: from config)'
     )
+    parser.add_argument(
+        '--detect-interval',
+        type=int,
+        default=None,
+        help='Run the detector every N frames and track boxes in between (default: from config)'
+    )
+    parser.add_argument(
+        '--motion-gate',
+        action='store_true',
+        default=None,
+        help='Skip inference on frames without motion (default: from config)'
+    )
+    parser.add_argument(
+        '--writer',
+        choices=['opencv', 'ffmpeg'],
+        default=None,
+        help='Output encoder: cv2.VideoWriter or a piped ffmpeg process (default: from config)'
+    )
+    parser.add_argument(
+        '--violations-only',
+        action='store_true',
+        default=None,
+        help='Only write the segments around frames with violations (default: from config)'
+    )
+    parser.add_argument(
+        '--export',
+        type=str,
+        default=None,
+        help='Write per-frame detections to a .jsonl or .parquet file'
+    )
     parser.add_argument(
         '--show',
         action='store_true',
         help='Display video while processing'
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown at exit'
+    )
+    parser.add_argument(
+        '--socket',
+        type=str,
+        default=None,
+        help='Detector daemon socket (default: $HELMET_DAEMON_SOCKET or a per-user temp file)'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Always load the model in this process instead of using a running daemon'
+    )
     
     args = parser.parse_args()
     
-    # Initialize detector
-    detector = HelmetDetector(model_path=args.model)
-    
-    if args.conf:
-        detector.conf_threshold = args.conf
-    
     # Set output path
     if args.output:
         output_path = Path(args.output)
@@ -63,16 +104,71 @@ def main():
     print(f"Processing video: {args.source}")
     print(f"Output will be saved to: {output_path}")
     
-    stats = detector.predict_video(
-        video_path=args.source,
-        output_path=output_path,
-        show=args.show
-    )
+    # Forward to a warm daemon when one is running; display and profiling stay in-process
+    stats = None
+    if not (args.no_daemon or args.show or args.profile):
+        client = DaemonClient.connect(args.socket, model=args.model)
+        if client is not None:
+            stats = client.try_request(
+                'video',
+                source=str(Path(args.source).resolve()),
+                output=str(output_path.resolve()),
+                conf=args.conf,
+                detect_interval=args.detect_interval,
+                motion_gate=args.motion_gate,
+                writer=args.writer,
+                violations_only=args.violations_only,
+                export_path=str(Path(args.export).resolve()) if args.export else None
+            )
+    
+    if stats is None:
+        # Heavy imports (torch, ultralytics) only happen on the in-process path
+        from app.detector import HelmetDetector
+        
+        detector = HelmetDetector(model_path=args.model)
+        if args.profile:
+            # Print the stage breakdown however the script exits
+            detector.profiler.enabled = True
+            atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
+        
+        if args.conf:
+            detector.conf_threshold = args.conf
+        
+        stats = detector.predict_video(
+            video_path=args.source,
+            output_path=output_path,
+            show=args.show,
+            detect_interval=args.detect_interval,
+            motion_gate=args.motion_gate,
+            writer=args.writer,
+            violations_only=args.violations_only,
+            export_path=args.export
+        )
     
     print("\nProcessing complete!")
     print(f"Frames processed: {stats['frames']}")
     print(f"Total detections: {stats['total_detections']}")
     print(f"Average detections per frame: {stats['avg_detections_per_frame']:.2f}")
+    print("Stage throughput: " + ", ".join(
+        f"{name} {stage['fps']:.1f} fps" for name, stage in stats['stages'].items()
+    ))
+    if 'detected_frames' in stats:
+        print(f"Detected frames: {stats['detected_frames']}, "
+              f"propagated frames: {stats['propagated_frames']}, "
+              f"detector calls per frame: {stats['detector_call_ratio']:.2f}")
+    if 'accuracy_delta' in stats:
+        print(f"Tracking accuracy delta vs full detection: {stats['accuracy_delta']:.2%}")
+    if 'skip_ratio' in stats:
+        print(f"Frames skipped by motion gate: {stats['skip_ratio']:.1%}")
+    if 'writer' in stats:
+        writer = stats['writer']
+        print(f"Frames written: {writer['frames_written']} ({writer['encoder']})")
+        if 'segments' in writer:
+            print(f"Violation segments: {len(writer['segments'])}")
+    if 'export' in stats:
+        export = stats['export']
+        print(f"Exported {export['frames_written']} frames to {export['path']}"
+              + (f" ({export['dropped']} dropped)" if export['dropped'] else ""))
 
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@
 Script to detect helmets using webcam
 """
 import argparse
+import atexit
 from pathlib import Path
 import sys
 
@@ -31,11 +32,38 @@ def main():
         default=None,
         help='Confidence threshold (default: from config)'
     )
+    parser.add_argument(
+        '--detect-interval',
+        type=int,
+        default=None,
+        help='Run the detector every N frames and track boxes in between (default: from config)'
+    )
+    parser.add_argument(
+        '--motion-gate',
+        action='store_true',
+        default=None,
+        help='Skip inference on frames without motion (default: from config)'
+    )
+    parser.add_argument(
+        '--export',
+        type=str,
+        default=None,
+        help='Write per-frame detections to a .jsonl or .parquet file'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown at exit'
+    )
     
     args = parser.parse_args()
     
     # Initialize detector
     detector = HelmetDetector(model_path=args.model)
+    if args.profile:
+        # Print the stage breakdown however the script exits
+        detector.profiler.enabled = True
+        atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
     
     if args.conf:
         detector.conf_threshold = args.conf
@@ -44,7 +72,11 @@ def main():
     print("Press 'q' to quit")
     
     try:
-        detector.predict_webcam(camera_id=args.camera, show=True)
+        stats = detector.predict_webcam(camera_id=args.camera, show=True,
+                                        detect_interval=args.detect_interval, motion_gate=args.motion_gate,
+                                        export_path=args.export)
+        if stats and 'export' in stats:
+            print(f"Exported {stats['export']['frames_written']} frames to {stats['export']['path']}")
     except KeyboardInterrupt:
         print("\nStopped by user")
     except Exception as e:
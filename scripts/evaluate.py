@@ -0,0 +1,92 @@
+"""
+Script to measure mAP and speed of a detector configuration on data/val
+"""
+import argparse
+import json
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.datapack import open_pack
+from app.detector import HelmetDetector
+from app.evaluation import Evaluator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate mAP and images/sec on a labelled split')
+    parser.add_argument('--model', type=str, default=None, help='Model path (default: from config)')
+    parser.add_argument('--config', type=str, default='app/config/config.yaml', help='Config file')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Labelled split with images/ and labels/ (default: from config)')
+    parser.add_argument('--conf', type=float, nargs='+', default=None,
+                        help='Confidence thresholds to evaluate (default: from config)')
+    parser.add_argument('--iou', type=float, nargs='+', default=None,
+                        help='NMS IoU thresholds to evaluate (default: from config)')
+    parser.add_argument('--max-det', type=int, default=None, help='Maximum detections per image')
+    parser.add_argument('--no-cache', action='store_true', help='Re-run the model even if predictions are cached')
+    parser.add_argument('--pack', action='store_true',
+                        help='Read pre-letterboxed images and labels from the dataset pack (built if missing)')
+    parser.add_argument('--output', type=str, default=None, help='JSON report path (default: from config)')
+    parser.add_argument('--check-refilter', type=int, default=0, metavar='N',
+                        help='Check on N images that re-filtered candidates match a direct prediction')
+    
+    args = parser.parse_args()
+    
+    detector = HelmetDetector(model_path=args.model, config_path=args.config)
+    eval_cfg = detector.config.get('evaluation', {})
+    confs = args.conf or eval_cfg.get('conf', [0.001])
+    ious = args.iou or eval_cfg.get('iou', [0.7])
+    output_path = Path(args.output or eval_cfg.get('report', 'results/evaluation/report.json'))
+    
+    data_dir = args.data or eval_cfg.get('data', 'data/val')
+    pack = None
+    if args.pack:
+        pack = open_pack(data_dir, detector.imgsz, detector.config.get('datapack', {}).get('dir', 'data/.packs'))
+        print(f"Using dataset pack {pack.path}")
+    
+    evaluator = Evaluator(detector, data_dir, conf_floor=min(confs), pack=pack)
+    print(f"Evaluating {detector.model_path} ({detector.backend}, imgsz {detector.imgsz}) "
+          f"on {len(evaluator.image_paths)} images")
+    max_det = args.max_det or eval_cfg.get('max_det', 300)
+    report = evaluator.run(confs, ious, max_det=max_det, force=args.no_cache)
+    if args.check_refilter:
+        report['refilter_check'] = [
+            evaluator.check_refilter(conf, iou, max_det=max_det, limit=args.check_refilter)
+            for conf in confs for iou in ious
+        ]
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    inference = report['inference']
+    if inference['images_per_sec'] is not None:
+        print(f"\nInference: {inference['images_per_sec']:.1f} images/s "
+              f"({inference['predicted']} predicted, {inference['reused']} reused)")
+    else:
+        print(f"\nInference: all {inference['reused']} predictions reused from the cache")
+    
+    for run in report['runs']:
+        print(f"\nconf {run['conf']}, iou {run['iou']}: mAP50 {run['map50']:.4f}, mAP50-95 {run['map50_95']:.4f}, "
+              f"P {run['precision']:.3f}, R {run['recall']:.3f}")
+        if run['truncated']:
+            print(f"  Warning: {run['truncated']} images hit inference.max_candidates above this conf, "
+                  f"their results may miss low-score boxes")
+        print(f"  {'class':<16}{'instances':>10}{'AP50':>8}{'AP50-95':>9}{'P':>7}{'R':>7}")
+        for name, values in run['classes'].items():
+            ap50 = f"{values['ap50']:.4f}" if values['ap50'] is not None else '-'
+            ap = f"{values['ap50_95']:.4f}" if values['ap50_95'] is not None else '-'
+            print(f"  {name:<16}{values['instances']:>10}{ap50:>8}{ap:>9}"
+                  f"{values['precision']:>7.3f}{values['recall']:>7.3f}")
+    for check in report.get('refilter_check', []):
+        print(f"\nRefilter check at conf {check['conf']}, iou {check['iou']}: "
+              f"{len(check['mismatched'])} of {check['images']} images differ from a direct prediction")
+        if check['tied']:
+            print(f"  {len(check['tied'])} more differ between tied scores, where NMS order is arbitrary")
+    print(f"\nReport saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
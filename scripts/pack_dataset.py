@@ -0,0 +1,40 @@
+"""
+Script to letterbox dataset splits once into memory-mapped packs
+"""
+import argparse
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.datapack import DatasetPack, build_pack
+from app.utils.config_loader import load_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build pre-decoded dataset packs for evaluation and benchmarks')
+    parser.add_argument('--data', type=str, nargs='+', default=['data/val', 'data/train'],
+                        help='Split directories with images/ and labels/')
+    parser.add_argument('--config', type=str, default='app/config/config.yaml', help='Config file')
+    parser.add_argument('--imgsz', type=int, default=None, help='Letterbox size (default: inference.imgsz)')
+    parser.add_argument('--output-dir', type=str, default=None, help='Pack directory (default: from config)')
+    
+    args = parser.parse_args()
+    
+    config = load_config(args.config)
+    imgsz = args.imgsz or config.get('inference', {}).get('imgsz', 640)
+    output_dir = Path(args.output_dir or config.get('datapack', {}).get('dir', 'data/.packs'))
+    
+    for data_dir in map(Path, args.data):
+        if not (data_dir / 'images').is_dir():
+            print(f"Skipping {data_dir}: no images/ directory")
+            continue
+        path = build_pack(data_dir, output_dir / f"{data_dir.name}_{imgsz}", imgsz)
+        pack = DatasetPack(path)
+        size_mb = (path / 'images.npy').stat().st_size / 2 ** 20
+        print(f"{data_dir}: {len(pack)} images, {len(pack.labels)} labels -> {path} ({size_mb:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Script to build an INT8 model calibrated on data/val and compare it with FP32
+"""
+import argparse
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.datapack import open_pack
+from app.quantization import compare_models, quantize_model, write_report
+from app.utils.config_loader import load_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='INT8 post-training quantization')
+    parser.add_argument('--model', type=str, default=None, help='FP32 weights (default: from config)')
+    parser.add_argument('--config', type=str, default='app/config/config.yaml', help='Config file')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Labelled split with images/ and labels/ (default: from config)')
+    parser.add_argument('--output', type=str, default=None, help='INT8 model path (default: from config)')
+    parser.add_argument('--report', type=str, default=None, help='JSON report path (default: from config)')
+    parser.add_argument('--num-images', type=int, default=None, help='Maximum calibration images')
+    parser.add_argument('--skip-eval', action='store_true', help='Only quantize, do not compare')
+    parser.add_argument('--pack', action='store_true',
+                        help='Calibrate on pre-letterboxed images from the dataset pack (built if missing)')
+    
+    args = parser.parse_args()
+    
+    config = load_config(args.config)
+    quant_cfg = config.get('quantization', {})
+    imgsz = config.get('inference', {}).get('imgsz', 640)
+    
+    model_path = args.model or config['model']['path']
+    data_dir = Path(args.data or quant_cfg.get('data', 'data/val'))
+    output_path = args.output or quant_cfg.get('output', 'app/models/best_int8.onnx')
+    report_path = args.report or quant_cfg.get('report', 'results/quantization/report.json')
+    
+    if not Path(model_path).exists():
+        print(f"Error: Model not found: {model_path}")
+        sys.exit(1)
+    
+    calibration = data_dir / 'images'
+    if args.pack:
+        calibration = open_pack(data_dir, imgsz, config.get('datapack', {}).get('dir', 'data/.packs'))
+    
+    print(f"Calibrating on {calibration.path if args.pack else calibration}")
+    quantize_model(
+        model_path,
+        output_path,
+        calibration_dir=calibration,
+        imgsz=imgsz,
+        num_images=args.num_images or quant_cfg.get('num_images', 100),
+        per_channel=quant_cfg.get('per_channel', True),
+        calibrate_method=quant_cfg.get('calibrate_method', 'minmax'),
+        exclude_head=quant_cfg.get('exclude_head', True),
+        cache_dir=config['model'].get('cache_dir', 'app/models/.cache')
+    )
+    print(f"INT8 model saved to: {output_path}")
+    
+    if args.skip_eval:
+        return
+    
+    print("Evaluating FP32 and INT8 ONNX models...")
+    report = compare_models(model_path, output_path, data_dir, config['classes']['names'], imgsz,
+                            cache_dir=config['model'].get('cache_dir', 'app/models/.cache'))
+    write_report(report, report_path)
+    
+    fp32, int8 = report['models']['fp32'], report['models']['int8']
+    print(f"\n{'':8}{'mAP50':>10}{'mAP50-95':>10}{'ms/img':>10}{'MB':>8}")
+    for name, model in (('FP32', fp32), ('INT8', int8)):
+        print(f"{name:8}{model['map50']:>10.4f}{model['map50_95']:>10.4f}"
+              f"{model['latency']['mean_ms']:>10.1f}{model['size_mb']:>8.1f}")
+    print(f"\nmAP50-95 change: {report['delta']['map50_95']:+.4f}, "
+          f"speedup: {report['delta']['latency_speedup']:.2f}x")
+    print(f"Report saved to: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
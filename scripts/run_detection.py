@@ -2,13 +2,15 @@
 Script tổng hợp để chạy detection với nhiều tùy chọn
 """
 import argparse
+import atexit
 from pathlib import Path
 import sys
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.detector import HelmetDetector
+from app.client import DaemonClient
+from app.utils.files import iter_image_paths
 
 
 def main():
@@ -28,6 +30,9 @@ Examples:
   
   # Detect using webcam
   python scripts/run_detection.py webcam
+  
+  # Share one model across several cameras (video files act as fake cameras)
+  python scripts/run_detection.py multistream --sources cam1=input/videos/a.mp4 cam2=input/videos/b.mp4 0
         """
     )
     
@@ -39,6 +44,14 @@ Examples:
     img_parser.add_argument('--output', type=str, default=None, help='Output directory')
     img_parser.add_argument('--model', type=str, default=None, help='Model path')
     img_parser.add_argument('--conf', type=float, default=None, help='Confidence threshold')
+    img_parser.add_argument('--batch-size', type=int, default=None, help='Images per inference batch')
+    img_parser.add_argument('--prefetch', type=int, default=None, help='Decode threads running ahead of the model')
+    img_parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes, each loading its own model (directories only)')
+    img_parser.add_argument('--threads-per-worker', type=int, default=None,
+                            help='Intra-op threads per worker process (default: CPU cores / workers)')
+    img_parser.add_argument('--tiled', action='store_true',
+                            help='Slice large images into overlapping tiles (single image only)')
     img_parser.add_argument('--show', action='store_true', help='Show results')
     
     # Video detection parser
@@ -48,12 +61,53 @@ Examples:
     vid_parser.add_argument('--model', type=str, default=None, help='Model path')
     vid_parser.add_argument('--conf', type=float, default=None, help='Confidence threshold')
     vid_parser.add_argument('--show', action='store_true', help='Show video while processing')
+    vid_parser.add_argument('--detect-interval', type=int, default=None,
+                            help='Run the detector every N frames and track in between')
+    vid_parser.add_argument('--motion-gate', action='store_true', default=None,
+                            help='Skip inference on frames without motion')
+    vid_parser.add_argument('--writer', choices=['opencv', 'ffmpeg'], default=None,
+                            help='Output encoder: cv2.VideoWriter or a piped ffmpeg process')
+    vid_parser.add_argument('--violations-only', action='store_true', default=None,
+                            help='Only write the segments around frames with violations')
+    vid_parser.add_argument('--export', type=str, default=None,
+                            help='Write per-frame detections to a .jsonl or .parquet file')
+    vid_parser.add_argument('--cascade', action='store_true',
+                            help='Two-stage mode: rider/plate pass, then batched head-crop classification')
+    vid_parser.add_argument('--compare-frames', type=int, default=0,
+                            help='With --cascade, time the single-model path on N frames for comparison')
     
     # Webcam detection parser
     webcam_parser = subparsers.add_parser('webcam', help='Detect using webcam')
     webcam_parser.add_argument('--camera', type=int, default=0, help='Camera ID')
     webcam_parser.add_argument('--model', type=str, default=None, help='Model path')
     webcam_parser.add_argument('--conf', type=float, default=None, help='Confidence threshold')
+    webcam_parser.add_argument('--detect-interval', type=int, default=None,
+                               help='Run the detector every N frames and track in between')
+    webcam_parser.add_argument('--motion-gate', action='store_true', default=None,
+                               help='Skip inference on frames without motion')
+    webcam_parser.add_argument('--export', type=str, default=None,
+                               help='Write per-frame detections to a .jsonl or .parquet file')
+    
+    # Multi-stream detection parser
+    multi_parser = subparsers.add_parser('multistream', help='Detect on several sources with one model')
+    multi_parser.add_argument('--sources', type=str, nargs='+', required=True,
+                              help='Video files, camera IDs or stream URLs, optionally named as name=source')
+    multi_parser.add_argument('--fps', type=float, default=None, help='Target inference rate per source')
+    multi_parser.add_argument('--source-fps', type=str, nargs='*', default=[],
+                              help='Per-source rate overrides as name=fps')
+    multi_parser.add_argument('--duration', type=float, default=None,
+                              help='Stop after N seconds (default: until all sources end)')
+    multi_parser.add_argument('--model', type=str, default=None, help='Model path')
+    multi_parser.add_argument('--conf', type=float, default=None, help='Confidence threshold')
+    multi_parser.add_argument('--show', action='store_true', help='Show one window per source')
+    
+    for mode_parser in (img_parser, vid_parser, webcam_parser, multi_parser):
+        mode_parser.add_argument('--profile', action='store_true', help='Print a per-stage timing breakdown at exit')
+    for mode_parser in (img_parser, vid_parser):
+        mode_parser.add_argument('--socket', type=str, default=None,
+                                 help='Detector daemon socket (default: $HELMET_DAEMON_SOCKET or a per-user temp file)')
+        mode_parser.add_argument('--no-daemon', action='store_true',
+                                 help='Always load the model in this process instead of using a running daemon')
     
     args = parser.parse_args()
     
@@ -61,14 +115,34 @@ Examples:
         parser.print_help()
         sys.exit(1)
     
-    # Initialize detector
-    try:
-        detector = HelmetDetector(model_path=args.model)
-        if args.conf:
-            detector.conf_threshold = args.conf
-    except Exception as e:
-        print(f"Error initializing detector: {e}")
-        sys.exit(1)
+    def load_detector():
+        # Heavy imports (torch, ultralytics) only happen on the in-process path
+        from app.detector import HelmetDetector
+        
+        try:
+            detector = HelmetDetector(model_path=args.model)
+            if args.conf:
+                detector.conf_threshold = args.conf
+            if getattr(args, 'threads_per_worker', None):
+                detector.threads_per_worker = args.threads_per_worker
+            if args.profile:
+                # Print the stage breakdown however the script exits
+                detector.profiler.enabled = True
+                atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
+        except Exception as e:
+            print(f"Error initializing detector: {e}")
+            sys.exit(1)
+        return detector
+    
+    # Image and video jobs go to a warm daemon when one is running; display,
+    # profiling, tiling, the cascade and per-process thread settings stay in-process
+    client = None
+    if args.mode in ('image', 'video') and not (
+        args.no_daemon or args.show or args.profile
+        or getattr(args, 'tiled', False) or getattr(args, 'cascade', False)
+        or getattr(args, 'threads_per_worker', None)
+    ):
+        client = DaemonClient.connect(args.socket, model=args.model)
     
     # Execute based on mode
     if args.mode == 'image':
@@ -78,30 +152,77 @@ Examples:
         
         if source_path.is_file():
             print(f"Processing image: {source_path}")
-            result = detector.predict_image(
-                image_path=source_path,
-                save_path=output_dir / f"{source_path.stem}_result{source_path.suffix}",
-                show=args.show
-            )
-            print(f"\nDetected {result['count']} objects:")
-            for box, label, conf in zip(result['boxes'], result['labels'], result['confidences']):
+            save_path = output_dir / f"{source_path.stem}_result{source_path.suffix}"
+            response = None
+            if client is not None:
+                response = client.try_request('image', source=str(source_path.resolve()),
+                                              save_path=str(save_path.resolve()), conf=args.conf)
+            if response is not None:
+                detections = [(d['label'], d['confidence']) for d in response['detections']]
+            else:
+                detector = load_detector()
+                if args.tiled:
+                    import cv2
+                    
+                    image = cv2.imread(str(source_path))
+                    result = detector.predict_tiled(image)
+                    cv2.imwrite(str(save_path), detector.visualizer.draw_detections(image, result, inplace=True))
+                else:
+                    result = detector.predict_image(
+                        image_path=source_path,
+                        save_path=save_path,
+                        show=args.show
+                    )
+                detections = list(zip(result.labels, result.scores.tolist()))
+            print(f"\nDetected {len(detections)} objects:")
+            for label, conf in detections:
                 print(f"  - {label}: {conf:.2f}")
         
         elif source_path.is_dir():
             print(f"Processing directory: {source_path}")
-            image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-            image_paths = [p for p in source_path.iterdir() if p.suffix.lower() in image_extensions]
             
-            if not image_paths:
+            response = None
+            if client is not None:
+                response = client.try_request('directory', source=str(source_path.resolve()),
+                                              save_dir=str(output_dir.resolve()), batch_size=args.batch_size,
+                                              prefetch=args.prefetch, workers=args.workers, conf=args.conf)
+            if response is not None:
+                image_count, total_detections = response['images'], response['total_detections']
+                pipeline_stats, shard_stats = response['pipeline'], response['shards']
+            else:
+                detector = load_detector()
+                # Stream paths and results so memory stays flat on huge directories
+                image_count = 0
+                total_detections = 0
+                for image_path, result in detector.predict_batch_stream(
+                    iter_image_paths(source_path),
+                    save_dir=output_dir,
+                    batch_size=args.batch_size,
+                    prefetch_workers=args.prefetch,
+                    workers=args.workers
+                ):
+                    image_count += 1
+                    total_detections += result.count
+                pipeline_stats, shard_stats = detector.last_pipeline_stats, detector.last_shard_stats
+            
+            if pipeline_stats:
+                stats = pipeline_stats
+                print(f"Prefetch: {stats['bound']}-bound "
+                      f"(decode wait {stats['consumer_stall_time']:.2f}s, "
+                      f"model wait {stats['producer_stall_time']:.2f}s, "
+                      f"max queue {stats['max_queue_depth']}/{stats['queue_capacity']})")
+            if shard_stats:
+                stats = shard_stats
+                print(f"Workers: {stats['workers']} x {stats['threads_per_worker']} threads, "
+                      f"{stats['chunks']} chunks, {stats['restarts']} pool restarts")
+            
+            if image_count == 0:
                 print(f"No images found in {source_path}")
                 sys.exit(1)
             
-            print(f"Found {len(image_paths)} images")
-            results = detector.predict_batch(image_paths, save_dir=output_dir)
-            
-            total_detections = sum(r['count'] for r in results)
+            print(f"Processed {image_count} images")
             print(f"\nTotal detections: {total_detections}")
-            print(f"Average detections per image: {total_detections / len(image_paths):.2f}")
+            print(f"Average detections per image: {total_detections / image_count:.2f}")
         else:
             print(f"Error: {args.source} is not a valid file or directory")
             sys.exit(1)
@@ -122,28 +243,138 @@ Examples:
         print(f"Processing video: {args.source}")
         print(f"Output will be saved to: {output_path}")
         
-        stats = detector.predict_video(
-            video_path=args.source,
-            output_path=output_path,
-            show=args.show
-        )
+        stats = None
+        if client is not None:
+            stats = client.try_request(
+                'video',
+                source=str(Path(args.source).resolve()),
+                output=str(output_path.resolve()),
+                conf=args.conf,
+                detect_interval=args.detect_interval,
+                motion_gate=args.motion_gate,
+                writer=args.writer,
+                violations_only=args.violations_only,
+                export_path=str(Path(args.export).resolve()) if args.export else None
+            )
+        if stats is None and args.cascade:
+            from app.cascade import CascadeDetector
+            
+            stats = CascadeDetector(load_detector()).predict_video(
+                video_path=args.source,
+                output_path=output_path,
+                show=args.show,
+                compare_frames=args.compare_frames,
+                export_path=args.export
+            )
+        elif stats is None:
+            stats = load_detector().predict_video(
+                video_path=args.source,
+                output_path=output_path,
+                show=args.show,
+                detect_interval=args.detect_interval,
+                motion_gate=args.motion_gate,
+                writer=args.writer,
+                violations_only=args.violations_only,
+                export_path=args.export
+            )
         
         print("\nProcessing complete!")
         print(f"Frames processed: {stats['frames']}")
         print(f"Total detections: {stats['total_detections']}")
         print(f"Average detections per frame: {stats['avg_detections_per_frame']:.2f}")
+        print("Stage throughput: " + ", ".join(
+            f"{name} {stage['fps']:.1f} fps" for name, stage in stats['stages'].items()
+        ))
+        if 'detected_frames' in stats:
+            print(f"Detected frames: {stats['detected_frames']}, "
+                  f"propagated frames: {stats['propagated_frames']}")
+        if 'accuracy_delta' in stats:
+            print(f"Tracking accuracy delta vs full detection: {stats['accuracy_delta']:.2%}")
+        if 'skip_ratio' in stats:
+            print(f"Frames skipped by motion gate: {stats['skip_ratio']:.1%}")
+        if 'writer' in stats:
+            writer = stats['writer']
+            print(f"Frames written: {writer['frames_written']} ({writer['encoder']})")
+            if 'segments' in writer:
+                print(f"Violation segments: {len(writer['segments'])}")
+        if 'export' in stats:
+            export = stats['export']
+            print(f"Exported {export['frames_written']} frames to {export['path']}"
+                  + (f" ({export['dropped']} dropped)" if export['dropped'] else ""))
+        if 'cascade' in stats:
+            print(f"Head crops classified: {stats['cascade']['crops']}")
+        if stats.get('throughput'):
+            throughput = stats['throughput']
+            print(f"Single model: {throughput['single_model_fps']:.1f} fps, "
+                  f"cascade: {throughput['cascade_fps']:.1f} fps "
+                  f"({throughput['speedup']:.2f}x)")
     
     elif args.mode == 'webcam':
         print(f"Starting webcam detection (Camera ID: {args.camera})")
         print("Press 'q' to quit")
         
+        detector = load_detector()
         try:
-            detector.predict_webcam(camera_id=args.camera, show=True)
+            stats = detector.predict_webcam(camera_id=args.camera, show=True,
+                                            detect_interval=args.detect_interval, motion_gate=args.motion_gate,
+                                            export_path=args.export)
+            if stats and 'export' in stats:
+                print(f"Exported {stats['export']['frames_written']} frames to {stats['export']['path']}")
         except KeyboardInterrupt:
             print("\nStopped by user")
         except Exception as e:
             print(f"Error: {e}")
             sys.exit(1)
+    
+    elif args.mode == 'multistream':
+        import cv2
+        
+        detector = load_detector()
+        sources = {}
+        for index, spec in enumerate(args.sources):
+            name, sep, source = spec.partition('=')
+            # Only treat the prefix as a name when it is not part of a URL
+            if not sep or '/' in name or ':' in name:
+                name, source = f"source{index}", spec
+            sources[name] = source
+        
+        fps = args.fps if args.fps is not None else detector.config.get('streams', {}).get('fps', 5)
+        if args.source_fps:
+            overrides = dict(spec.split('=', 1) for spec in args.source_fps)
+            fps = {name: float(overrides.get(name, fps)) for name in sources}
+        
+        def show_result(name, index, frame, result):
+            annotated = detector.visualizer.draw_detections(frame, result, inplace=True)
+            cv2.imshow(f"Helmet Detection - {name}", annotated)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                raise KeyboardInterrupt
+        
+        print(f"Processing {len(sources)} sources: " + ", ".join(
+            f"{name}={source}" for name, source in sources.items()
+        ))
+        try:
+            stats = detector.predict_streams(
+                sources,
+                fps=fps,
+                duration=args.duration,
+                on_result=show_result if args.show else None
+            )
+        except IOError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            if args.show:
+                cv2.destroyAllWindows()
+        
+        print("\nProcessing complete!")
+        print(f"Model calls: {stats['batches']}, frames: {stats['frames']}, "
+              f"mean batch size: {stats['mean_batch_size']:.2f}")
+        for name, source_stats in stats['sources'].items():
+            print(f"  - {name}: {source_stats['frames_processed']} frames at "
+                  f"{source_stats['processed_fps']:.1f} fps "
+                  f"(target {source_stats['target_fps']}), "
+                  f"{source_stats['frames_dropped']} dropped, "
+                  f"latency {source_stats['mean_latency'] * 1000:.0f} ms")
 
 
 if __name__ == '__main__':
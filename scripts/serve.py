@@ -0,0 +1,91 @@
+"""
+Script to run the HTTP inference server
+"""
+import argparse
+import atexit
+import asyncio
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.detector import HelmetDetector
+from app.server import InferenceServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve helmet detection over HTTP')
+    parser.add_argument(
+        '--host',
+        type=str,
+        default=None,
+        help='Bind address (default: from config)'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=None,
+        help='Bind port (default: from config)'
+    )
+    parser.add_argument(
+        '--model',
+        type=str,
+        default=None,
+        help='Path to model weights (default: from config)'
+    )
+    parser.add_argument(
+        '--max-batch',
+        type=int,
+        default=None,
+        help='Maximum images per model call (default: from config)'
+    )
+    parser.add_argument(
+        '--max-wait-ms',
+        type=float,
+        default=None,
+        help='Time to wait for more requests before running a batch (default: from config)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown at exit'
+    )
+    
+    args = parser.parse_args()
+    
+    # Initialize detector
+    print("Loading model...")
+    detector = HelmetDetector(model_path=args.model)
+    if args.profile:
+        # Print the stage breakdown however the script exits
+        detector.profiler.enabled = True
+        atexit.register(lambda: print("\nStage breakdown:\n" + detector.profiler.report()))
+    
+    server_cfg = detector.config.get('server', {})
+    # Load and warm the model before accepting requests, also at the largest merged batch
+    max_batch = args.max_batch or server_cfg.get('max_batch', 16)
+    warmup = detector.warmup(batch_sizes=sorted({*detector.warmup_config.get('batch_sizes', [1]), max_batch}))
+    print(f"Model ready in {detector.startup_stats['import_s'] + detector.startup_stats['load_s']:.2f}s, "
+          f"warmed up in {warmup['total_s']:.2f}s")
+    
+    server = InferenceServer(
+        detector,
+        host=args.host or server_cfg.get('host', '127.0.0.1'),
+        port=args.port or server_cfg.get('port', 8000),
+        max_batch=max_batch,
+        max_wait_ms=args.max_wait_ms if args.max_wait_ms is not None else server_cfg.get('max_wait_ms', 10),
+        max_body_mb=server_cfg.get('max_body_mb', 20)
+    )
+    
+    print(f"Serving on http://{server.host}:{server.port}")
+    print("  POST /detect?conf=0.4&iou=0.7  (image bytes as body)")
+    print("  GET  /metrics, GET /health")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+
+
+if __name__ == '__main__':
+    main()
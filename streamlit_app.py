@@ -2,9 +2,6 @@
 Streamlit Web App for Helmet Detection
 """
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
 import tempfile
 import os
 from pathlib import Path
@@ -13,8 +10,7 @@ import sys
 # Add app directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.detector import HelmetDetector
-from app.utils.visualizer import Visualizer
+from app.utils.config_loader import load_config
 
 # Page config
 st.set_page_config(
@@ -24,18 +20,29 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load config
+# Load config; the detector (cv2, torch) is only imported once a tab needs it
+config = load_config()
+model_path = Path(config['model']['path'])
+error = None if model_path.exists() else f"Model not found: {model_path}"
+
 @st.cache_resource
 def load_detector():
-    """Load detector model (cached)"""
-    try:
-        detector = HelmetDetector()
-        return detector, None
-    except Exception as e:
-        return None, str(e)
+    """Create the detector (cached)"""
+    from app.detector import HelmetDetector
+    return HelmetDetector()
+
+@st.cache_resource(show_spinner="Loading model...")
+def warm_detector(_detector):
+    """Load and warm up the model once per server process, before its first real prediction"""
+    return _detector.warmup()
 
-# Initialize detector
-detector, error = load_detector()
+def get_detector():
+    """Warmed-up detector with the sidebar thresholds applied"""
+    detector = load_detector()
+    warm_detector(detector)
+    detector.conf_threshold = conf_threshold
+    detector.iou_threshold = iou_threshold
+    return detector
 
 # Custom CSS
 st.markdown("""
@@ -75,7 +82,7 @@ with st.sidebar:
         st.stop()
     
     # Model info
-    st.success("✅ Model loaded successfully!")
+    st.success("✅ Model found, it loads with the first detection")
     st.markdown("### Model Information")
     st.info("**Model:** YOLOv8n\n\n**Classes:**\n- With Helmet\n- Without Helmet\n- Rider\n- Number Plate")
     
@@ -99,10 +106,6 @@ with st.sidebar:
         help="IoU threshold for NMS"
     )
     
-    if detector:
-        detector.conf_threshold = conf_threshold
-        detector.iou_threshold = iou_threshold
-    
     st.markdown("---")
     st.markdown("### 📊 Model Performance")
     st.metric("mAP50", "94%")
@@ -128,80 +131,87 @@ with tab1:
         )
         
         if uploaded_file is not None:
-            # Display original image
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Original Image", width='stretch')
+            from app.cache import content_hash
+            from app.utils.preprocess import decode_image
             
-            # Detection button
-            if st.button("🔍 Detect", type="primary", width='stretch'):
+            data = uploaded_file.getvalue()
+            # Decode once in memory for display and drawing
+            image = decode_image(data)
+            st.image(image, channels="BGR", caption="Original Image", width='stretch')
+            
+            # Raw pre-NMS candidates are kept per image, slider changes only re-filter them
+            image_key = content_hash(data)
+            entry = st.session_state.get('candidates')
+            if entry is not None and entry['key'] != image_key:
+                entry = None
+            
+            # Detection button (or a confidence below the stored floor) runs the model
+            if st.button("🔍 Detect", type="primary", width='stretch') or (
+                entry is not None and conf_threshold < entry['floor']
+            ):
                 with st.spinner("Processing image..."):
-                    # Save uploaded file temporarily
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.name).suffix) as tmp_file:
-                        tmp_file.write(uploaded_file.getvalue())
-                        tmp_path = tmp_file.name
-                    
                     try:
-                        # Run detection using YOLO directly
-                        yolo_results = detector.model.predict(
-                            source=tmp_path,
-                            conf=conf_threshold,
-                            iou=iou_threshold,
-                            save=False,
-                            show=False
-                        )
-                        
-                        # Get result
-                        r = yolo_results[0]
-                        result = detector._parse_results(r)
-                        
-                        # Get annotated image from YOLO (already has boxes drawn)
-                        result_image = r.plot()  # YOLO's built-in plot method
-                        result_image = cv2.cvtColor(result_image, cv2.COLOR_BGR2RGB)
-                        
-                        # Clean up
-                        os.unlink(tmp_path)
-                        
-                        with col2:
-                            st.subheader("Detection Results")
-                            st.image(result_image, caption="Detected Objects", width='stretch')
-                            
-                            # Statistics
-                            st.markdown("### 📊 Statistics")
-                            col_a, col_b = st.columns(2)
-                            with col_a:
-                                st.metric("Total Detections", result['count'])
-                            with col_b:
-                                st.metric("Image Size", f"{image.size[0]}x{image.size[1]}")
-                            
-                            # Detection details
-                            if result['count'] > 0:
-                                st.markdown("### 🔍 Detection Details")
-                                details_data = []
-                                for i, (box, label, conf) in enumerate(zip(
-                                    result['boxes'],
-                                    result['labels'],
-                                    result['confidences']
-                                ), 1):
-                                    details_data.append({
-                                        "ID": i,
-                                        "Class": label,
-                                        "Confidence": f"{conf:.2%}",
-                                        "Box": f"[{int(box[0])}, {int(box[1])}, {int(box[2])}, {int(box[3])}]"
-                                    })
-                                st.dataframe(details_data, width='stretch', hide_index=True)
-                                
-                                # Class counts
-                                from collections import Counter
-                                class_counts = Counter(result['labels'])
-                                st.markdown("### 📈 Class Distribution")
-                                st.bar_chart(class_counts)
-                            else:
-                                st.info("No objects detected. Try adjusting the confidence threshold.")
-                    
+                        detector = get_detector()
+                        floor = min(detector.candidate_conf, conf_threshold)
+                        entry = {
+                            'key': image_key,
+                            'floor': floor,
+                            'candidates': detector.predict_candidates(data, conf=floor)
+                        }
+                        st.session_state['candidates'] = entry
                     except Exception as e:
                         st.error(f"Error processing image: {str(e)}")
-                        if os.path.exists(tmp_path):
-                            os.unlink(tmp_path)
+            
+            if entry is not None:
+                # Vectorized NumPy NMS on the stored candidates, no model call
+                detector = get_detector()
+                result = detector.refilter(entry['candidates'], conf=conf_threshold, iou=iou_threshold,
+                                           image_shape=image.shape)
+                
+                # The detector's visualizer lives as long as the cached detector, and so does its sprite cache
+                result_image = detector.visualizer.draw_detections(image, result)
+                
+                with col2:
+                    st.subheader("Detection Results")
+                    st.image(result_image, channels="BGR", caption="Detected Objects", width='stretch')
+                    
+                    # Statistics
+                    st.markdown("### 📊 Statistics")
+                    col_a, col_b = st.columns(2)
+                    with col_a:
+                        st.metric("Total Detections", result.count)
+                    with col_b:
+                        st.metric("Image Size", f"{image.shape[1]}x{image.shape[0]}")
+                    if detector.cache is not None:
+                        cache_stats = detector.cache.stats()
+                        st.caption(f"Prediction cache hit rate: {cache_stats['hit_rate']:.0%} "
+                                   f"({cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+                                   f"{cache_stats['misses']} misses)")
+                    
+                    # Detection details
+                    if result.count > 0:
+                        st.markdown("### 🔍 Detection Details")
+                        details_data = []
+                        for i, (box, label, conf) in enumerate(zip(
+                            result.boxes,
+                            result.labels,
+                            result.scores
+                        ), 1):
+                            details_data.append({
+                                "ID": i,
+                                "Class": label,
+                                "Confidence": f"{conf:.2%}",
+                                "Box": f"[{int(box[0])}, {int(box[1])}, {int(box[2])}, {int(box[3])}]"
+                            })
+                        st.dataframe(details_data, width='stretch', hide_index=True)
+                        
+                        # Class counts
+                        from collections import Counter
+                        class_counts = Counter(result.labels)
+                        st.markdown("### 📈 Class Distribution")
+                        st.bar_chart(class_counts)
+                    else:
+                        st.info("No objects detected. Try adjusting the confidence threshold.")
         else:
             st.info("👆 Please upload an image to start detection")
 
@@ -240,7 +250,7 @@ with tab2:
                         output_path = output_dir / f"result_{uploaded_video.name}"
                         
                         # Process video
-                        stats = detector.predict_video(
+                        stats = get_detector().predict_video(
                             video_path=tmp_video_path,
                             output_path=str(output_path),
                             show=False
@@ -290,7 +300,7 @@ with tab3:
     if st.button("🎥 Start Webcam", type="primary", width='stretch'):
         with st.spinner("Starting webcam..."):
             try:
-                detector.predict_webcam(camera_id=0, show=True)
+                get_detector().predict_webcam(camera_id=0, show=True)
                 st.success("Webcam stopped successfully!")
             except Exception as e:
                 st.error(f"Error: {str(e)}")